@@ -0,0 +1,60 @@
+# accounts/management/commands/bench_key_cache.py
+
+import statistics
+import time
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import padding
+from django.core.management.base import BaseCommand
+from accounts.services.key_cache import clear_key_cache, key_cache_stats, load_private_key, load_public_key
+from accounts.services.key_management import generate_key_pair
+
+PSS = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+
+def _time(fn, iterations):
+    # Milliseconds per call for `iterations` calls
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+class Command(BaseCommand):
+    help = "Compare per-signature and per-verification cost with and without the parsed key cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200, help="Operations per variant")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        public_pem, private_pem = generate_key_pair()
+        message = b'0x' + b'ab' * 32  # Same shape as a certificate hash
+        signature = load_private_key(private_pem).sign(message, PSS, hashes.SHA256())
+        clear_key_cache()
+
+        variants = (
+            ('sign', 'parse every time',
+             lambda: serialization.load_pem_private_key(private_pem.encode(), password=None).sign(
+                 message, PSS, hashes.SHA256())),
+            ('sign', 'key cache',
+             lambda: load_private_key(private_pem, 'bench').sign(message, PSS, hashes.SHA256())),
+            ('verify', 'parse every time',
+             lambda: serialization.load_pem_public_key(public_pem.encode()).verify(
+                 signature, message, PSS, hashes.SHA256())),
+            ('verify', 'key cache',
+             lambda: load_public_key(public_pem, 'bench').verify(signature, message, PSS, hashes.SHA256())),
+        )
+        means = {}
+        for operation, name, fn in variants:
+            samples = _time(fn, iterations)
+            means[(operation, name)] = statistics.mean(samples)
+            self.stdout.write(
+                f"{operation:>6} / {name:<16}: mean {statistics.mean(samples):.3f} ms | "
+                f"p50 {statistics.median(samples):.3f} ms | n={iterations}"
+            )
+        for operation in ('sign', 'verify'):
+            speedup = means[(operation, 'parse every time')] / means[(operation, 'key cache')]
+            self.stdout.write(f"{operation:>6} speedup: {speedup:.2f}x")
+        self.stdout.write(f"cache: {key_cache_stats()}")
@@ -0,0 +1,21 @@
+# accounts/management/commands/key_pool_stats.py
+
+from django.core.management.base import BaseCommand
+from accounts.services.key_pool import key_pool_stats, reset_key_pool_stats
+
+
+class Command(BaseCommand):
+    help = "Show the keypair pool depth, refill rate and how often saves fell back to inline generation"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them")
+
+    def handle(self, *args, **options):
+        stats = key_pool_stats()
+        self.stdout.write(f"{'depth':>14}: {stats['depth']}/{stats['target_depth']}")
+        self.stdout.write(f"{'taken':>14}: {stats['taken']}")
+        self.stdout.write(f"{'fallbacks':>14}: {stats['fallbacks']} ({stats['fallback_rate']:.1%})")
+        self.stdout.write(f"{'generated':>14}: {stats['generated']}")
+        self.stdout.write(f"{'refill rate':>14}: {stats['refill_rate']} keys/s")
+        if options['reset']:
+            reset_key_pool_stats()
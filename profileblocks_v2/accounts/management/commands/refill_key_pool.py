@@ -0,0 +1,36 @@
+# accounts/management/commands/refill_key_pool.py
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from accounts.services.key_pool import key_pool_stats, refill_pool
+
+
+class Command(BaseCommand):
+    help = "Keep the pre-generated RSA keypair pool topped up so saves do not generate keys inline"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', type=int, default=None,
+                            help="Keypairs to keep in the pool (default KEY_POOL_TARGET_DEPTH)")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Key generation processes (default KEY_POOL_REFILL_WORKERS, 0 = one per CPU)")
+        parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds between pool depth checks")
+        parser.add_argument('--once', action='store_true', help="Refill once and exit")
+
+    def handle(self, *args, **options):
+        target = options['target'] if options['target'] is not None else settings.KEY_POOL_TARGET_DEPTH
+        self.stdout.write(f"Key pool worker started (target depth {target})")
+        try:
+            while True:
+                added = refill_pool(target, options['workers'])
+                if added:
+                    stats = key_pool_stats()
+                    self.stdout.write(
+                        f"Added {added} keypair(s): depth {stats['depth']}/{target}, "
+                        f"refill rate {stats['refill_rate']} keys/s, fallbacks {stats['fallbacks']}"
+                    )
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Key pool worker stopped")
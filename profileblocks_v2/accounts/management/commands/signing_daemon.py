@@ -0,0 +1,37 @@
+# accounts/management/commands/signing_daemon.py
+
+import signal
+import threading
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from accounts.services.signing_service import SigningServer, SigningService
+
+
+class Command(BaseCommand):
+    help = "Serve batch signing requests over a Unix socket, signing on a pool of processes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=None, help="Unix socket path (default SIGNING_SOCKET_PATH)")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Signing processes (default SIGNING_WORKERS, 0 = one per CPU)")
+
+    def handle(self, *args, **options):
+        socket_path = options['socket'] or settings.SIGNING_SOCKET_PATH
+        if not socket_path:
+            raise CommandError("Set SIGNING_SOCKET_PATH or pass --socket")
+        service = SigningService(options['workers'])
+        server = SigningServer(socket_path, service)
+        # SIGTERM stops serving like Ctrl+C; shutdown() must not run on the serve_forever thread
+        signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+        self.stdout.write(f"Signing daemon listening on {socket_path} with {service.workers} worker(s)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(
+                f"Signing daemon stopped: {service.stats['signatures']} signature(s) in "
+                f"{service.stats['batches']} batch(es), {service.stats['errors']} error(s), "
+                f"{len(service.keys)} key(s) held"
+            )
@@ -46,4 +46,13 @@ class User(AbstractUser):
     class Meta:
         verbose_name = 'user'
         verbose_name_plural = 'users'
-        swappable = 'AUTH_USER_MODEL'  # Allow swapping of this user model via settings
\ No newline at end of file
+        swappable = 'AUTH_USER_MODEL'  # Allow swapping of this user model via settings
+
+class PooledKeyPair(models.Model):
+    # RSA keypair generated ahead of time by refill_key_pool; taking one deletes the row
+    public_key = models.TextField()
+    private_key = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']  # Oldest keys are handed out first
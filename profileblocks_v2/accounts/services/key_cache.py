@@ -0,0 +1,81 @@
+# accounts/services/key_cache.py
+
+import hashlib
+import threading
+from collections import OrderedDict
+from cryptography.hazmat.primitives import serialization
+from django.conf import settings
+
+# Loaded key objects: (kind, owner, PEM fingerprint) -> key, least recently used first
+_keys = OrderedDict()
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+
+def key_owner(instance):
+    # Cache owner label for a model instance holding keys, e.g. "institutions.institution:42"
+    return f"{instance._meta.label_lower}:{instance.pk}"
+
+
+def fingerprint(pem):
+    # SHA-256 of the PEM text: a rotated key never matches its predecessor's entry
+    return hashlib.sha256(pem.encode()).hexdigest()
+
+
+def _load(kind, pem, owner, loader):
+    key = (kind, owner, fingerprint(pem))
+    with _lock:
+        loaded = _keys.get(key)
+        if loaded is not None:
+            _keys.move_to_end(key)
+            _stats['hits'] += 1
+            return loaded
+        _stats['misses'] += 1
+    # Parse outside the lock so concurrent misses on different keys do not queue up
+    loaded = loader(pem.encode())
+    with _lock:
+        _keys[key] = loaded
+        _keys.move_to_end(key)
+        while len(_keys) > settings.KEY_CACHE_SIZE:
+            _keys.popitem(last=False)
+            _stats['evictions'] += 1
+    return loaded
+
+
+def load_private_key(private_key_pem, owner=None):
+    """
+    Return the private key object for an unencrypted PEM string, parsing it
+    only on the first use. `owner` (see key_owner) lets invalidate_owner drop
+    the entry as soon as the key is rotated.
+    """
+    return _load('private', private_key_pem, owner,
+                 lambda data: serialization.load_pem_private_key(data, password=None))
+
+
+def load_public_key(public_key_pem, owner=None):
+    # Public counterpart of load_private_key
+    return _load('public', public_key_pem, owner, serialization.load_pem_public_key)
+
+
+def invalidate_owner(owner):
+    # Forget every key loaded for `owner`; call whenever its keypair is replaced
+    with _lock:
+        stale = [key for key in _keys if key[1] == owner]
+        for key in stale:
+            del _keys[key]
+        _stats['invalidations'] += len(stale)
+    return len(stale)
+
+
+def clear_key_cache():
+    with _lock:
+        _keys.clear()
+
+
+def key_cache_stats():
+    # Counters since process start plus the current size and hit rate
+    with _lock:
+        stats = dict(_stats, size=len(_keys), max_size=settings.KEY_CACHE_SIZE)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+    return stats
@@ -3,7 +3,8 @@ from cryptography.hazmat.primitives import serialization  # Import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa  # Import RSA algorithm for key generation
 
 
-def generate_key_pair():
+def generate_key_pair(_=None):
+    # The ignored argument lets process pools map over it (see key_pool.refill_pool)
     # Generate a new RSA private key with a public exponent of 65537 and 2048-bit key size
     private_key = rsa.generate_private_key(
         public_exponent=65537,
@@ -0,0 +1,105 @@
+# accounts/services/key_pool.py
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from accounts.models import PooledKeyPair
+from accounts.services.key_management import generate_key_pair
+from accounts.services.signature_schemes import RSA_PSS_SHA256, generate_keypair
+from blockchain.services.counters import count, read_counters, reset_counters
+
+logger = logging.getLogger(__name__)
+
+# Pooled rows tried per take before falling back, in case concurrent takers win the oldest ones
+_CLAIM_CANDIDATES = 5
+# Keys inserted per bulk_create while refilling, so the pool is usable before a large refill ends
+_REFILL_BATCH_SIZE = 50
+_STATS_KEYS = ('taken', 'fallbacks', 'generated', 'generate_ms')
+
+
+def take_keypair(algorithm=RSA_PSS_SHA256):
+    """
+    Return a (public PEM, private PEM) keypair for a new key holder.
+    Only RSA keys are pooled; other algorithms are cheap to generate inline.
+    For RSA the oldest pooled keypair is claimed with a conditional delete, so two
+    concurrent saves never get the same key; inside a transaction that later
+    rolls back, the key simply returns to the pool. When the pool is empty the
+    pair is generated inline, as before, and counted as a fallback.
+    """
+    if algorithm != RSA_PSS_SHA256:
+        return generate_keypair(algorithm)
+    candidates = PooledKeyPair.objects.order_by('id').values_list('id', 'public_key', 'private_key')[:_CLAIM_CANDIDATES]
+    for keypair_id, public_key, private_key in candidates:
+        deleted, _ = PooledKeyPair.objects.filter(id=keypair_id).delete()
+        if deleted:
+            count('key_pool', 'taken')
+            return public_key, private_key
+    count('key_pool', 'fallbacks')
+    logger.info("Key pool empty, generating a keypair inline (run refill_key_pool)")
+    return generate_key_pair()
+
+
+def pool_depth():
+    return PooledKeyPair.objects.count()
+
+
+def refill_pool(target=None, workers=None):
+    """
+    Top the pool up to `target` keypairs (default KEY_POOL_TARGET_DEPTH),
+    generating them on `workers` processes (default KEY_POOL_REFILL_WORKERS,
+    0 meaning one per CPU). Returns the number of keypairs added.
+    """
+    target = settings.KEY_POOL_TARGET_DEPTH if target is None else target
+    workers = workers if workers is not None else settings.KEY_POOL_REFILL_WORKERS
+    missing = target - pool_depth()
+    if missing <= 0:
+        return 0
+
+    started = time.perf_counter()
+    added = 0
+
+    def store(keypairs):
+        nonlocal added
+        PooledKeyPair.objects.bulk_create(
+            [PooledKeyPair(public_key=public_key, private_key=private_key) for public_key, private_key in keypairs]
+        )
+        added += len(keypairs)
+
+    # RSA key generation is CPU-bound: spread it over processes rather than threads
+    if missing == 1 or workers == 1:
+        for _ in range(missing):
+            store([generate_key_pair()])
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            batch = []
+            for keypair in pool.map(generate_key_pair, range(missing), chunksize=max(1, missing // 64)):
+                batch.append(keypair)
+                if len(batch) >= _REFILL_BATCH_SIZE:
+                    store(batch)
+                    batch = []
+            if batch:
+                store(batch)
+
+    count('key_pool', 'generated', added)
+    count('key_pool', 'generate_ms', round((time.perf_counter() - started) * 1000))
+    return added
+
+
+def key_pool_stats():
+    # Current depth plus counters shared by every process since the cache was last cleared
+    stats = {
+        'depth': pool_depth(),
+        'target_depth': settings.KEY_POOL_TARGET_DEPTH,
+        **read_counters('key_pool', _STATS_KEYS),
+    }
+    requests = stats['taken'] + stats['fallbacks']
+    stats['fallback_rate'] = round(stats['fallbacks'] / requests, 3) if requests else 0.0
+    # Refill throughput while generating, in keypairs per second
+    stats['refill_rate'] = round(stats['generated'] * 1000 / stats['generate_ms'], 1) if stats['generate_ms'] else 0.0
+    return stats
+
+
+def reset_key_pool_stats():
+    reset_counters('key_pool', _STATS_KEYS)
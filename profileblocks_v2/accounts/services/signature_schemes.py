@@ -0,0 +1,115 @@
+# accounts/services/signature_schemes.py
+
+import binascii
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519, padding, rsa
+from accounts.services.key_cache import load_private_key, load_public_key
+from accounts.services.key_management import generate_key_pair
+
+RSA_PSS_SHA256 = 'rsa-pss-sha256'
+ED25519 = 'ed25519'
+# Choices for the algorithm fields on key holders and certificates
+SIGNATURE_ALGORITHMS = (
+    (RSA_PSS_SHA256, 'RSA-2048 PSS / SHA-256'),
+    (ED25519, 'Ed25519'),
+)
+
+
+class RsaPssScheme:
+    # The original scheme: RSA-2048 keys, PSS padding with maximum salt, SHA-256
+    name = RSA_PSS_SHA256
+    key_type = rsa.RSAPrivateKey, rsa.RSAPublicKey
+    _padding = padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=padding.PSS.MAX_LENGTH)
+
+    def generate_keypair(self):
+        return generate_key_pair()
+
+    def sign(self, private_key, message):
+        return private_key.sign(message, self._padding, hashes.SHA256())
+
+    def verify(self, public_key, signature, message):
+        public_key.verify(signature, message, self._padding, hashes.SHA256())
+
+
+class Ed25519Scheme:
+    # 64-byte signatures, 32-byte keys; signing and key generation are far cheaper than RSA
+    name = ED25519
+    key_type = ed25519.Ed25519PrivateKey, ed25519.Ed25519PublicKey
+
+    def generate_keypair(self):
+        private_key = ed25519.Ed25519PrivateKey.generate()
+        public_pem = private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        )
+        private_pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        return public_pem.decode(), private_pem.decode()
+
+    def sign(self, private_key, message):
+        return private_key.sign(message)
+
+    def verify(self, public_key, signature, message):
+        public_key.verify(signature, message)
+
+
+SCHEMES = {scheme.name: scheme for scheme in (RsaPssScheme(), Ed25519Scheme())}
+
+
+def get_scheme(algorithm):
+    try:
+        return SCHEMES[algorithm or RSA_PSS_SHA256]  # Rows predating the algorithm fields are RSA
+    except KeyError:
+        raise ValueError(f"Unknown signature algorithm: {algorithm}")
+
+
+def generate_keypair(algorithm):
+    # (public PEM, private PEM) for a new key holder using `algorithm`
+    return get_scheme(algorithm).generate_keypair()
+
+
+def algorithm_of(key):
+    # Scheme name of a loaded key object, or None for key types no scheme handles
+    for scheme in SCHEMES.values():
+        if isinstance(key, scheme.key_type):
+            return scheme.name
+    return None
+
+
+def sign(message, private_key_pem, algorithm=RSA_PSS_SHA256, owner=None):
+    """
+    Sign `message` (str or bytes) with a PEM private key under `algorithm`.
+    The parsed key comes from the key cache under `owner` (see key_owner).
+    Returns the signature as a hex string.
+    """
+    if isinstance(message, str):
+        message = message.encode()
+    scheme = get_scheme(algorithm)
+    private_key = load_private_key(private_key_pem, owner)
+    if not isinstance(private_key, scheme.key_type):
+        raise ValueError(f"Private key does not match signature algorithm {scheme.name}")
+    return scheme.sign(private_key, message).hex()
+
+
+def verify(message, signature_hex, public_key_pem, algorithm=None, owner=None):
+    """
+    True if `signature_hex` is a valid signature of `message` under the PEM
+    public key. `algorithm` is the one recorded with the signature; when it is
+    None it is inferred from the key type, so signatures made before the
+    algorithm was recorded still verify.
+    """
+    if isinstance(message, str):
+        message = message.encode()
+    try:
+        public_key = load_public_key(public_key_pem, owner)
+        scheme = get_scheme(algorithm or algorithm_of(public_key))
+        if not isinstance(public_key, scheme.key_type):
+            return False  # E.g. an RSA signature checked against a rotated Ed25519 key
+        scheme.verify(public_key, binascii.unhexlify(signature_hex), message)
+        return True
+    except (InvalidSignature, ValueError, TypeError, binascii.Error):
+        return False
@@ -0,0 +1,71 @@
+# accounts/services/signing_client.py
+
+import logging
+import socket
+from django.conf import settings
+from accounts.services.key_cache import fingerprint, key_owner
+from accounts.services.signature_schemes import sign
+from accounts.services.signing_protocol import recv_frame, send_frame
+
+logger = logging.getLogger(__name__)
+
+
+def _sign_inline(items):
+    # Previous behaviour: sign in this process with the holder's private key
+    return [
+        sign(message, holder.private_key, holder.key_algorithm, owner=key_owner(holder))
+        for holder, message in items
+    ]
+
+
+def _request(requests):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(settings.SIGNING_TIMEOUT)
+        sock.connect(settings.SIGNING_SOCKET_PATH)
+        send_frame(sock, {'requests': requests})
+        response = recv_frame(sock)
+    if response is None:
+        raise ConnectionError("Signing daemon closed the connection without replying")
+    return response
+
+
+def sign_many(items):
+    """
+    Sign (key holder, message) pairs and return the hex signatures in order.
+    Key holders are Institution, InstitutionUser or Student instances; each
+    message is signed under the holder's key_algorithm. With SIGNING_SOCKET_PATH
+    set, the whole batch goes to the signing_daemon in one round trip and this
+    process never touches the private keys. Otherwise, or when the daemon is
+    unreachable and SIGNING_FALLBACK_INLINE is on, messages are signed inline.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if not settings.SIGNING_SOCKET_PATH:
+        return _sign_inline(items)
+
+    requests = [
+        {'key_id': key_owner(holder), 'fingerprint': fingerprint(holder.public_key), 'message': message}
+        for holder, message in items
+    ]
+    try:
+        response = _request(requests)
+    except OSError as e:  # Includes ConnectionError and socket timeouts
+        if not settings.SIGNING_FALLBACK_INLINE:
+            raise ConnectionError(f"Signing daemon unavailable at {settings.SIGNING_SOCKET_PATH}: {e}") from e
+        logger.warning("Signing daemon unavailable (%s), signing %d message(s) inline", e, len(items))
+        return _sign_inline(items)
+
+    if 'error' in response:
+        raise RuntimeError(f"Signing daemon failed: {response['error']}")
+    signatures = []
+    for (holder, _), result in zip(items, response['results']):
+        if 'error' in result:
+            raise RuntimeError(f"Signing daemon could not sign for {key_owner(holder)}: {result['error']}")
+        signatures.append(result['signature'])
+    return signatures
+
+
+def sign_for(holder, message):
+    # Hex signature of a single message with `holder`'s key
+    return sign_many([(holder, message)])[0]
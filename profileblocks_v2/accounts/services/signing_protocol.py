@@ -0,0 +1,37 @@
+# accounts/services/signing_protocol.py
+
+import json
+import struct
+
+# Frames between signing_client and the signing daemon: 4-byte big-endian length, then UTF-8 JSON
+_HEADER = struct.Struct('>I')
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+def send_frame(sock, payload):
+    data = json.dumps(payload).encode()
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _read_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("Signing socket closed mid-frame")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def recv_frame(sock):
+    # Next frame as a dict, or None when the peer closed the connection between frames
+    header = sock.recv(_HEADER.size)
+    if not header:
+        return None
+    if len(header) < _HEADER.size:
+        header += _read_exactly(sock, _HEADER.size - len(header))
+    (size,) = _HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise ValueError(f"Signing frame of {size} bytes exceeds the limit")
+    return json.loads(_read_exactly(sock, size))
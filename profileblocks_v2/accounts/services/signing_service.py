@@ -0,0 +1,168 @@
+# accounts/services/signing_service.py
+
+import logging
+import os
+import signal
+import socketserver
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections
+from accounts.services.key_cache import fingerprint
+from accounts.services.signature_schemes import sign
+from accounts.services.signing_protocol import recv_frame, send_frame
+
+logger = logging.getLogger(__name__)
+
+# Models whose private keys the daemon will sign with (key ids are key_owner labels)
+KEY_HOLDERS = ('institutions.institution', 'institutions.institutionuser', 'certificates.student')
+
+
+def sign_chunk(private_key_pem, algorithm, owner, messages):
+    # Runs in a pool worker (here or in resigning); its key cache keeps the parsed key between chunks
+    return [sign(message, private_key_pem, algorithm, owner=owner) for message in messages]
+
+
+def _init_worker():
+    # Ctrl+C and service managers signal the whole process group: let the daemon shut workers down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+def _ready(_=None):
+    return os.getpid()
+
+
+class KeyStore:
+    """
+    Private keys of key holders, read from the DB on first use and then held
+    in memory. A request naming a different public key fingerprint than the
+    one held (the key was rotated) reloads it.
+    """
+    def __init__(self):
+        self._keys = {}  # key id -> (public key fingerprint, private key PEM, algorithm)
+        self._lock = threading.Lock()
+
+    def get(self, key_id, public_fingerprint=None):
+        with self._lock:
+            entry = self._keys.get(key_id)
+        if entry is None or (public_fingerprint and entry[0] != public_fingerprint):
+            entry = self._load(key_id)
+            with self._lock:
+                self._keys[key_id] = entry
+        if public_fingerprint and entry[0] != public_fingerprint:
+            raise ValueError(f"{key_id}: stored key does not match the requested public key")
+        return entry
+
+    def _load(self, key_id):
+        label, _, pk = key_id.rpartition(':')
+        if label not in KEY_HOLDERS:
+            raise ValueError(f"{key_id}: not a signing key holder")
+        row = apps.get_model(label).objects.filter(pk=pk).values_list(
+            'public_key', 'private_key', 'key_algorithm'
+        ).first()
+        if not row or not row[1]:
+            raise ValueError(f"{key_id}: no private key")
+        return fingerprint(row[0]), row[1], row[2]
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class SigningService:
+    """
+    Signs batches of {'key_id', 'fingerprint', 'message'} requests on a pool
+    of `workers` processes (default SIGNING_WORKERS, 0 meaning one per CPU).
+    Requests for the same key are split into chunks so one large batch still
+    spreads over every worker.
+    """
+    def __init__(self, workers=None):
+        self.workers = workers or settings.SIGNING_WORKERS or os.cpu_count()
+        self.keys = KeyStore()
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker)
+        self.stats = {'batches': 0, 'signatures': 0, 'errors': 0}
+        # Start every worker now, before request threads exist, rather than forking later
+        list(self.pool.map(_ready, range(self.workers)))
+
+    def sign_batch(self, requests):
+        # One {'signature': hex} or {'error': message} per request, in request order
+        results = [None] * len(requests)
+        groups = {}  # key id -> (private key PEM, algorithm, [(index, message)])
+        for index, request in enumerate(requests):
+            try:
+                _, private_key_pem, algorithm = self.keys.get(request['key_id'], request.get('fingerprint'))
+            except (KeyError, ValueError) as e:
+                results[index] = {'error': str(e)}
+                continue
+            groups.setdefault(request['key_id'], (private_key_pem, algorithm, []))[2].append(
+                (index, request['message'])
+            )
+
+        futures = []
+        for key_id, (private_key_pem, algorithm, items) in groups.items():
+            chunk_size = max(1, min(settings.SIGNING_CHUNK_SIZE, -(-len(items) // self.workers)))
+            for start in range(0, len(items), chunk_size):
+                chunk = items[start:start + chunk_size]
+                futures.append((chunk, self.pool.submit(
+                    sign_chunk, private_key_pem, algorithm, key_id, [message for _, message in chunk]
+                )))
+        for chunk, future in futures:
+            try:
+                signatures = future.result()
+            except Exception as e:
+                for index, _ in chunk:
+                    results[index] = {'error': str(e)}
+                continue
+            for (index, _), signature in zip(chunk, signatures):
+                results[index] = {'signature': signature}
+
+        errors = sum(1 for result in results if 'error' in result)
+        self.stats['batches'] += 1
+        self.stats['signatures'] += len(results) - errors
+        self.stats['errors'] += errors
+        return results
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    # One client connection; it may send any number of request frames
+    def handle(self):
+        while True:
+            try:
+                frame = recv_frame(self.request)
+            except (OSError, ValueError) as e:
+                logger.warning("Dropping signing client: %s", e)
+                return
+            if frame is None:
+                return
+            close_old_connections()  # Key loads run on this thread's DB connection
+            try:
+                response = {'results': self.server.service.sign_batch(frame.get('requests', []))}
+            except Exception as e:
+                logger.exception("Signing batch failed")
+                response = {'error': str(e)}
+            try:
+                send_frame(self.request, response)
+            except OSError:
+                return
+
+
+class SigningServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, service):
+        self.socket_path = socket_path
+        self.service = service
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # Left behind by a daemon that did not shut down cleanly
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o600)  # Only processes running as the daemon's user may request signatures
+
+    def server_close(self):
+        super().server_close()
+        self.service.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
@@ -1,3 +1,270 @@
-from django.test import TestCase
+# accounts/tests.py
 
-# Create your tests here.
+import os
+import socket
+import struct
+import tempfile
+import threading
+from unittest import mock
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from accounts.models import PooledKeyPair
+from accounts.services import key_cache, key_pool, signing_protocol
+from accounts.services.signature_schemes import ED25519, RSA_PSS_SHA256, generate_keypair, sign, verify
+from accounts.services.signing_client import sign_for, sign_many
+from accounts.services.signing_protocol import recv_frame, send_frame
+from accounts.services.signing_service import SigningServer, SigningService
+from institutions.models import Institution, InstitutionType
+
+
+class SigningProtocolTest(SimpleTestCase):
+    def setUp(self):
+        self.client_sock, self.server_sock = socket.socketpair()
+        self.addCleanup(self.client_sock.close)
+        self.addCleanup(self.server_sock.close)
+
+    def test_frame_round_trip(self):
+        """A frame sent by one end is read back whole by the other"""
+        payload = {'requests': [{'key_id': 'institutions.institution:1', 'message': 'abc'}]}
+        send_frame(self.client_sock, payload)
+        self.assertEqual(recv_frame(self.server_sock), payload)
+
+    def test_partial_frame_is_reassembled(self):
+        """Header and body arriving a few bytes at a time still make one frame"""
+        data = b'{"requests": []}'
+        raw = struct.pack('>I', len(data)) + data
+
+        def trickle():
+            for start in range(0, len(raw), 3):
+                self.client_sock.sendall(raw[start:start + 3])
+
+        writer = threading.Thread(target=trickle)
+        writer.start()
+        self.assertEqual(recv_frame(self.server_sock), {'requests': []})
+        writer.join()
+
+    def test_oversized_frame_is_rejected(self):
+        """A length above MAX_FRAME_BYTES is refused before the body is read"""
+        self.client_sock.sendall(struct.pack('>I', signing_protocol.MAX_FRAME_BYTES + 1))
+        with self.assertRaisesMessage(ValueError, 'exceeds the limit'):
+            recv_frame(self.server_sock)
+
+    def test_close_between_and_within_frames(self):
+        """A close between frames ends the stream; a close mid-frame is an error"""
+        self.client_sock.sendall(struct.pack('>I', 10) + b'{"a"')
+        self.client_sock.shutdown(socket.SHUT_WR)
+        with self.assertRaises(ConnectionError):
+            recv_frame(self.server_sock)
+        self.assertIsNone(recv_frame(self.server_sock))
+
+
+class SignatureSchemeTest(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.rsa_public, cls.rsa_private = generate_keypair(RSA_PSS_SHA256)
+        cls.ed_public, cls.ed_private = generate_keypair(ED25519)
+
+    def test_ed25519_sign_and_verify(self):
+        """Ed25519 signatures are 64 bytes and verify only for the signed message"""
+        signature = sign('0xabc', self.ed_private, ED25519)
+        self.assertEqual(len(bytes.fromhex(signature)), 64)
+        self.assertTrue(verify('0xabc', signature, self.ed_public, algorithm=ED25519))
+        self.assertFalse(verify('0xabd', signature, self.ed_public, algorithm=ED25519))
+
+    def test_algorithm_is_inferred_from_the_key_when_not_recorded(self):
+        """Signatures without a recorded algorithm verify under the scheme of the key"""
+        self.assertTrue(verify('0xabc', sign('0xabc', self.rsa_private), self.rsa_public, algorithm=None))
+        self.assertTrue(verify('0xabc', sign('0xabc', self.ed_private, ED25519), self.ed_public, algorithm=None))
+
+    def test_mismatched_key_and_algorithm(self):
+        """A key of the other scheme fails verification, and signing with it is refused"""
+        rsa_signature = sign('0xabc', self.rsa_private, RSA_PSS_SHA256)
+        self.assertFalse(verify('0xabc', rsa_signature, self.ed_public, algorithm=RSA_PSS_SHA256))
+        with self.assertRaisesMessage(ValueError, 'does not match signature algorithm'):
+            sign('0xabc', self.ed_private, RSA_PSS_SHA256)
+
+
+class SigningDaemonTest(TransactionTestCase):
+    def setUp(self):
+        kind = InstitutionType.objects.create(name='tertiary level', allowed_certificate_types=['certificate'])
+        self.institution = Institution.objects.create(name='HKU', full_name='The University', institution_type=kind)
+        self.other = Institution.objects.create(name='CUHK', full_name='Another University', institution_type=kind)
+
+    def _start_daemon(self):
+        # SigningService and SigningServer in this process, serving on a temporary socket
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        socket_path = os.path.join(directory.name, 'signing.sock')
+        server = SigningServer(socket_path, SigningService(workers=1))
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return socket_path, server.service
+
+    def _assert_signed(self, holder, message, signature):
+        self.assertTrue(verify(message, signature, holder.public_key, algorithm=holder.key_algorithm))
+
+    def test_daemon_signs_batches_for_several_holders(self):
+        """One round trip returns valid signatures in request order for every key holder"""
+        socket_path, service = self._start_daemon()
+        items = [(self.institution, 'a'), (self.other, 'b'), (self.institution, 'c')]
+        with override_settings(SIGNING_SOCKET_PATH=socket_path):
+            signatures = sign_many(items)
+            self._assert_signed(self.other, 'd', sign_for(self.other, 'd'))
+        for (holder, message), signature in zip(items, signatures):
+            self._assert_signed(holder, message, signature)
+        self.assertEqual(service.stats['batches'], 2)
+        self.assertEqual(len(service.keys), 2)
+
+    def test_daemon_reloads_rotated_key(self):
+        """After a key rotation the daemon signs with the new key, not the one it holds"""
+        socket_path, _ = self._start_daemon()
+        with override_settings(SIGNING_SOCKET_PATH=socket_path):
+            sign_for(self.institution, 'before')
+            self.institution.regenerate_keypair()
+            self._assert_signed(self.institution, 'after', sign_for(self.institution, 'after'))
+
+    def test_daemon_reports_unknown_holder(self):
+        """A holder without a stored key is an error, not a bad signature"""
+        socket_path, _ = self._start_daemon()
+        stale = Institution.objects.get(pk=self.other.pk)
+        Institution.objects.filter(pk=self.other.pk).delete()
+        with override_settings(SIGNING_SOCKET_PATH=socket_path):
+            with self.assertRaisesMessage(RuntimeError, 'could not sign'):
+                sign_many([(self.institution, 'a'), (stale, 'b')])
+
+    def test_inline_fallback_when_daemon_is_down(self):
+        """An unreachable daemon falls back to inline signing, or fails when the fallback is off"""
+        missing = os.path.join(tempfile.gettempdir(), f'no-signing-daemon-{os.getpid()}.sock')
+        with override_settings(SIGNING_SOCKET_PATH=missing, SIGNING_FALLBACK_INLINE=True):
+            self._assert_signed(self.institution, 'a', sign_for(self.institution, 'a'))
+        with override_settings(SIGNING_SOCKET_PATH=missing, SIGNING_FALLBACK_INLINE=False):
+            with self.assertRaisesMessage(ConnectionError, 'Signing daemon unavailable'):
+                sign_for(self.institution, 'a')
+
+    def test_inline_signing_without_socket(self):
+        """With no SIGNING_SOCKET_PATH messages are signed in this process"""
+        with override_settings(SIGNING_SOCKET_PATH=''):
+            self.assertEqual(sign_many([]), [])
+            self._assert_signed(self.institution, 'a', sign_for(self.institution, 'a'))
+
+
+@override_settings(KEY_CACHE_SIZE=2)
+class KeyCacheTest(SimpleTestCase):
+    def setUp(self):
+        key_cache.clear_key_cache()
+        self.addCleanup(key_cache.clear_key_cache)
+        self.keys = [generate_keypair(ED25519) for _ in range(3)]
+
+    def _cached(self, pem):
+        return {key for key in key_cache._keys if key[2] == key_cache.fingerprint(pem)}
+
+    def test_least_recently_used_key_is_evicted(self):
+        """Past KEY_CACHE_SIZE the entry used longest ago goes, and a re-used entry is kept"""
+        (_, first), (_, second), (_, third) = self.keys
+        before = key_cache.key_cache_stats()
+        loaded = key_cache.load_private_key(first, 'a')
+        key_cache.load_private_key(second, 'b')
+        self.assertIs(key_cache.load_private_key(first, 'a'), loaded)
+        key_cache.load_private_key(third, 'c')
+        stats = key_cache.key_cache_stats()
+        self.assertEqual((stats['size'], stats['max_size']), (2, 2))
+        self.assertEqual(stats['evictions'] - before['evictions'], 1)
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+        self.assertTrue(self._cached(first))
+        self.assertFalse(self._cached(second))
+
+    def test_invalidate_owner_drops_only_that_owner(self):
+        """Both the private and public entries of the owner go; other owners stay cached"""
+        (public, private), (_, other), _ = self.keys
+        key_cache.load_private_key(private, 'a')
+        key_cache.load_public_key(public, 'a')
+        with override_settings(KEY_CACHE_SIZE=3):
+            key_cache.load_private_key(other, 'b')
+            self.assertEqual(key_cache.invalidate_owner('a'), 2)
+        self.assertEqual([key[1] for key in key_cache._keys], ['b'])
+        self.assertEqual(key_cache.invalidate_owner('a'), 0)
+
+
+@override_settings(SIGNATURE_ALGORITHM=ED25519, SIGNING_SOCKET_PATH='')
+class KeyRotationCacheTest(TransactionTestCase):
+    def setUp(self):
+        key_cache.clear_key_cache()
+        self.addCleanup(key_cache.clear_key_cache)
+        kind = InstitutionType.objects.create(name='tertiary level', allowed_certificate_types=['certificate'])
+        self.institution = Institution.objects.create(name='HKU', full_name='The University', institution_type=kind)
+
+    def test_rotation_drops_the_cached_private_key(self):
+        """After regenerate_keypair nothing signs with the old key, even though it was cached"""
+        old_public, old_private = self.institution.public_key, self.institution.private_key
+        sign_for(self.institution, 'before')
+        owner = key_cache.key_owner(self.institution)
+        self.assertIn(('private', owner, key_cache.fingerprint(old_private)), key_cache._keys)
+        self.institution.regenerate_keypair()
+        self.assertFalse([key for key in key_cache._keys if key[2] == key_cache.fingerprint(old_private)])
+        signature = sign_for(Institution.objects.get(pk=self.institution.pk), 'after')
+        self.assertTrue(verify('after', signature, self.institution.public_key, algorithm=ED25519))
+        self.assertFalse(verify('after', signature, old_public, algorithm=ED25519))
+
+
+class KeyPoolTest(TransactionTestCase):
+    def setUp(self):
+        key_pool.reset_key_pool_stats()
+        self.addCleanup(key_pool.reset_key_pool_stats)
+        self.generated = 0
+        patcher = mock.patch.object(key_pool, 'generate_key_pair', side_effect=self._fake_keypair)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fake_keypair(self, _=None):
+        # Stand-in for RSA generation: distinct placeholder PEMs, since take_keypair never parses them
+        self.generated += 1
+        return f'public {self.generated}', f'private {self.generated}'
+
+    def _fill(self, count):
+        PooledKeyPair.objects.bulk_create(
+            [PooledKeyPair(public_key=f'pooled public {i}', private_key=f'pooled private {i}') for i in range(count)]
+        )
+
+    def test_each_pooled_key_is_handed_out_once(self):
+        """Keys come out oldest first, each exactly once, and an empty pool falls back to inline generation"""
+        self._fill(3)
+        taken = [key_pool.take_keypair() for _ in range(4)]
+        self.assertEqual(taken[:3], [(f'pooled public {i}', f'pooled private {i}') for i in range(3)])
+        self.assertEqual(taken[3], ('public 1', 'private 1'))
+        stats = key_pool.key_pool_stats()
+        self.assertEqual((stats['depth'], stats['taken'], stats['fallbacks']), (0, 3, 1))
+        self.assertEqual(stats['fallback_rate'], 0.25)
+
+    def test_claim_skips_keys_taken_by_a_concurrent_caller(self):
+        """A candidate deleted by another taker after it was listed is passed over, not returned twice"""
+        self._fill(3)
+        candidates = list(PooledKeyPair.objects.order_by('id').values_list('id', 'public_key', 'private_key'))
+        PooledKeyPair.objects.filter(id=candidates[0][0]).delete()
+        with mock.patch.object(PooledKeyPair.objects, 'order_by') as order_by:
+            order_by.return_value.values_list.return_value.__getitem__.return_value = candidates
+            self.assertEqual(key_pool.take_keypair(), ('pooled public 1', 'pooled private 1'))
+        self.assertEqual(key_pool.pool_depth(), 1)
+        self.assertEqual(key_pool.key_pool_stats()['fallbacks'], 0)
+
+    def test_rolled_back_take_returns_the_key_to_the_pool(self):
+        """The claim is part of the caller's transaction"""
+        self._fill(1)
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            key_pool.take_keypair()
+            raise RuntimeError('save failed')
+        self.assertEqual(key_pool.take_keypair(), ('pooled public 0', 'pooled private 0'))
+
+    def test_only_rsa_is_pooled(self):
+        """Ed25519 keys are generated inline without touching the pool, which refills with RSA keys only"""
+        self._fill(1)
+        public_key, private_key = key_pool.take_keypair(ED25519)
+        self.assertTrue(verify('m', sign('m', private_key, ED25519), public_key, algorithm=ED25519))
+        self.assertEqual((key_pool.pool_depth(), self.generated), (1, 0))
+        self.assertEqual(key_pool.refill_pool(target=3, workers=1), 2)
+        self.assertEqual(key_pool.refill_pool(target=3, workers=1), 0)
+        self.assertEqual(self.generated, 2)
+        self.assertEqual(key_pool.key_pool_stats()['generated'], 2)
+        self.assertEqual(key_pool.take_keypair(RSA_PSS_SHA256), ('pooled public 0', 'pooled private 0'))
@@ -0,0 +1,59 @@
+# blockchain/management/commands/bench_contract_gas.py
+
+import json
+from django.core.management.base import BaseCommand, CommandError
+from blockchain.services.gas_benchmark import WORKLOADS, compare_to_baseline, run_gas_benchmark
+
+
+class Command(BaseCommand):
+    help = "Measure gas and wall time per operation of a compiled CertificateRegistry on a local py-evm chain"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--artifact', action='append',
+                            help="Hardhat artifact JSON to benchmark (repeatable; default: the configured registry)")
+        parser.add_argument('--sizes', default='1,100,10000', help="Comma-separated workload sizes")
+        parser.add_argument('--workload', action='append', choices=WORKLOADS, help="Only run this workload (repeatable)")
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Items per batched call (default CHAIN_BATCH_CHUNK_SIZE)")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+        parser.add_argument('--baseline', help="Previous JSON report; exit with an error on regressions")
+        parser.add_argument('--gas-tolerance', type=float, default=2.0, help="Allowed gas increase in percent")
+        parser.add_argument('--time-tolerance', type=float, default=None,
+                            help="Allowed wall time increase in percent (not checked by default)")
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        workloads = options['workload'] or WORKLOADS
+
+        def progress(result):
+            # Progress goes to stderr so stdout carries only the JSON report
+            self.stderr.write(
+                f"{result['contract']} {result['workload']:<15} n={result['size']:<6} "
+                f"{result['gas_per_item']:>10} gas/item {result['ms_per_item']:>9} ms/item"
+            )
+
+        reports = [
+            run_gas_benchmark(artifact, sizes, workloads, options['chunk_size'], progress=progress)
+            for artifact in options['artifact'] or [None]
+        ]
+        output = json.dumps({'reports': reports}, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baselines = {report['contract']: report for report in json.load(f)['reports']}
+            regressions = []
+            for report in reports:
+                if report['contract'] in baselines:
+                    regressions.extend(compare_to_baseline(
+                        report, baselines[report['contract']],
+                        gas_tolerance=options['gas_tolerance'] / 100,
+                        time_tolerance=options['time_tolerance'] / 100 if options['time_tolerance'] is not None else None,
+                    ))
+            if regressions:
+                raise CommandError("Regressions against baseline:\n  " + "\n  ".join(regressions))
+            self.stderr.write(self.style.SUCCESS("No regressions against baseline"))
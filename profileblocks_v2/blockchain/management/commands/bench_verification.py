@@ -0,0 +1,51 @@
+# blockchain/management/commands/bench_verification.py
+
+import statistics
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from web3 import Web3
+from blockchain.services.contract_service import get_contract, reset_client
+
+
+def _percentile(samples, pct):
+    # Nearest-rank percentile of a list of samples
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Compare on-chain verification latency: per-call Web3 construction vs the pooled client"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50, help="Calls per variant")
+        parser.add_argument('--hash', default='0x' + '00' * 32, help="bytes32 hex to look up with verifySignedHash")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        signed_hash = Web3.to_bytes(hexstr=options['hash'])
+
+        def per_call():
+            # Previous behaviour: new provider, new connection and ABI parse on every call
+            w3 = Web3(Web3.HTTPProvider(settings.WEB3_PROVIDER_URL))
+            contract = w3.eth.contract(address=settings.CONTRACT_ADDRESS, abi=settings.CONTRACT_ABI)
+            return contract.functions.verifySignedHash(signed_hash).call()
+
+        def pooled():
+            return get_contract().functions.verifySignedHash(signed_hash).call()
+
+        reset_client()
+        pooled()  # Warm up the pool so the first connection is not measured
+
+        for name, fn in (('per-call', per_call), ('pooled', pooled)):
+            samples = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                fn()
+                samples.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(
+                f"{name:>8}: mean {statistics.mean(samples):.1f} ms | "
+                f"p50 {_percentile(samples, 50):.1f} ms | p99 {_percentile(samples, 99):.1f} ms | "
+                f"n={iterations}"
+            )
@@ -0,0 +1,16 @@
+# blockchain/management/commands/chain_cache_stats.py
+
+from django.core.management.base import BaseCommand
+from blockchain.services.contract_service import chain_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit / miss counters of the on-chain verification cache"
+
+    def handle(self, *args, **options):
+        stats = chain_cache_stats()
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        hit_rate = (stats['hits'] + stats['coalesced']) / lookups * 100 if lookups else 0.0
+        for name, value in stats.items():
+            self.stdout.write(f"{name:>10}: {value}")
+        self.stdout.write(f"{'hit rate':>10}: {hit_rate:.1f}%")
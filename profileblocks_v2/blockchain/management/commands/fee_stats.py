@@ -0,0 +1,16 @@
+# blockchain/management/commands/fee_stats.py
+
+from django.core.management.base import BaseCommand
+from blockchain.services.fees import fee_stats
+
+
+class Command(BaseCommand):
+    help = "Show time-to-inclusion and cost per anchored hash of mined anchoring transactions"
+
+    def handle(self, *args, **options):
+        stats = fee_stats()
+        self.stdout.write(f"{'transactions':>22}: {stats['transactions']}")
+        self.stdout.write(f"{'hashes anchored':>22}: {stats['hashes']}")
+        self.stdout.write(f"{'replacements':>22}: {stats['replacements']}")
+        self.stdout.write(f"{'avg time-to-inclusion':>22}: {stats['avg_inclusion_seconds']:.1f}s")
+        self.stdout.write(f"{'avg cost per hash':>22}: {stats['avg_cost_per_hash_gwei']:.1f} gwei")
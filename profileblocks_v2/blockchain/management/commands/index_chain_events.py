@@ -0,0 +1,33 @@
+# blockchain/management/commands/index_chain_events.py
+
+import time
+from django.core.management.base import BaseCommand
+from blockchain.services.event_indexer import index_events
+
+
+class Command(BaseCommand):
+    help = "Index CertificateRegistry anchoring events into the local AnchoredHash table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-block', type=int, default=None, help="Re-scan from this block instead of the checkpoint")
+        parser.add_argument('--page-size', type=int, default=None, help="Blocks per eth_getLogs request")
+        parser.add_argument('--confirmations', type=int, default=None, help="Blocks to stay behind the head")
+        parser.add_argument('--follow', action='store_true', help="Keep polling for new blocks")
+        parser.add_argument('--interval', type=float, default=15.0, help="Seconds between polls with --follow")
+
+    def handle(self, *args, **options):
+        from_block = options['from_block']
+        try:
+            while True:
+                stored = index_events(
+                    page_size=options['page_size'],
+                    confirmations=options['confirmations'],
+                    from_block=from_block,
+                )
+                from_block = None  # Only the first pass honours --from-block
+                self.stdout.write(f"Indexed {stored} event(s)")
+                if not options['follow']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Indexer stopped")
@@ -0,0 +1,25 @@
+# blockchain/management/commands/rpc_endpoints.py
+
+from django.core.management.base import BaseCommand
+from blockchain.services.contract_service import get_w3
+from blockchain.services.rpc_routing import RoutingProvider
+
+
+class Command(BaseCommand):
+    help = "Probe the configured RPC endpoints and show their latency, error rate and circuit state"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--probes', type=int, default=20, help="eth_blockNumber calls sent to each endpoint")
+
+    def handle(self, *args, **options):
+        provider = get_w3().provider
+        if not isinstance(provider, RoutingProvider):
+            self.stdout.write(f"Single endpoint: {provider}")
+            return
+        provider.probe(options['probes'])
+        self.stdout.write(f"{'endpoint':<40} {'requests':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}  state")
+        for stats in provider.endpoint_stats():
+            self.stdout.write(
+                f"{stats['url']:<40} {stats['requests']:>8} {stats['p50_ms']:>8} {stats['p99_ms']:>8} "
+                f"{stats['error_rate']:>7.1%}  {stats['state']}"
+            )
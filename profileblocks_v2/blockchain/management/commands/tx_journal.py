@@ -0,0 +1,107 @@
+# blockchain/management/commands/tx_journal.py
+
+import json
+import os
+import time
+from collections import deque
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from blockchain.services.tx_journal import journal_files, read_journal
+
+
+class Command(BaseCommand):
+    help = "Query the transaction journal, or tail it with --follow"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tx', help="Transaction hash (also matches the transactions it replaced)")
+        parser.add_argument('--hash', dest='value', help="Signed hash or Merkle root passed to the contract")
+        parser.add_argument('--address', help="Sending address")
+        parser.add_argument('--nonce', type=int, help="Nonce (use with --address)")
+        parser.add_argument('--event', action='append', help="Event type: sent, replaced, mined, timeout, send_failed")
+        parser.add_argument('--since', help="Only records at or after this ISO timestamp, e.g. 2025-01-31T12:00")
+        parser.add_argument('--limit', type=int, default=50, help="Show the last N matching records (0 = all)")
+        parser.add_argument('--follow', '-f', action='store_true', help="Keep printing new matching records")
+
+    def handle(self, *args, **options):
+        if not settings.TX_JOURNAL_PATH:
+            raise CommandError("The transaction journal is disabled (TX_JOURNAL_PATH is blank)")
+        matches = self._matcher(options)
+
+        records = (record for record in read_journal() if matches(record))
+        limit = options['limit']
+        for record in deque(records, maxlen=limit) if limit else records:
+            self._write(record)
+
+        if options['follow']:
+            try:
+                self._follow(matches)
+            except KeyboardInterrupt:
+                pass
+
+    def _matcher(self, options):
+        tx = options['tx'] and options['tx'].lower()
+        value = options['value'] and options['value'].lower().removeprefix('0x')
+        address = options['address'] and options['address'].lower()
+        # Only 'sent' records carry call arguments; later events are tied to them by (sender, nonce)
+        value_nonces = set()
+
+        def matches(record):
+            if tx and tx not in (str(record.get('tx_hash')).lower(), str(record.get('replaces')).lower()):
+                return False
+            if value:
+                key = (record.get('sender'), record.get('nonce'))
+                if any(value in json.dumps(arg).lower() for arg in record.get('args', [])):
+                    value_nonces.add(key)
+                elif key not in value_nonces:
+                    return False
+            if address and str(record.get('sender')).lower() != address:
+                return False
+            if options['nonce'] is not None and record.get('nonce') != options['nonce']:
+                return False
+            if options['event'] and record.get('event') not in options['event']:
+                return False
+            # ISO timestamps in UTC compare correctly as strings
+            return not options['since'] or record.get('ts', '') >= options['since']
+        return matches
+
+    def _write(self, record):
+        self.stdout.write(json.dumps(record))
+        self.stdout.flush()
+
+    def _emit_line(self, line, matches):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            return
+        if matches(record):
+            self._write(record)
+
+    def _follow(self, matches):
+        # Poll the live file like `tail -F`, reopening it after a rotation
+        path = settings.TX_JOURNAL_PATH
+        handle, inode, partial = None, None, ''
+        if path in journal_files():
+            handle = open(path)
+            handle.seek(0, os.SEEK_END)
+            inode = os.fstat(handle.fileno()).st_ino
+        while True:
+            line = handle.readline() if handle else ''
+            if line:
+                partial += line
+                if partial.endswith('\n'):
+                    self._emit_line(partial, matches)
+                    partial = ''
+                continue
+            time.sleep(0.5)
+            try:
+                current = os.stat(path).st_ino
+            except FileNotFoundError:
+                continue
+            if current != inode:
+                if handle:
+                    # Drain what was written before the rotation, then switch files
+                    for rest in handle:
+                        self._emit_line(partial + rest, matches)
+                        partial = ''
+                    handle.close()
+                handle, inode, partial = open(path), current, ''
@@ -1,3 +1,57 @@
+# blockchain/models.py
+
 from django.db import models
 
-# Create your models here.
+
+class SenderNonce(models.Model):
+    """
+    Next transaction nonce to hand out for a sending Ethereum address.
+    Shared by every thread and process so concurrent senders never reuse a nonce.
+    """
+    address = models.CharField(max_length=42, unique=True)  # Checksummed sender address
+    next_nonce = models.PositiveBigIntegerField(default=0)  # Next nonce to allocate
+    updated_at = models.DateTimeField(auto_now=True)  # Time of the last allocation or resync
+
+    def __str__(self):
+        return f"{self.address} -> {self.next_nonce}"
+
+
+class SyncCheckpoint(models.Model):
+    """
+    Named resume position for long-running chain jobs (e.g. last indexed block).
+    """
+    name = models.CharField(max_length=100, unique=True)  # Job name, e.g. "events:CertificateRegistry"
+    position = models.BigIntegerField(default=0)  # Last fully processed position (block number, row id, ...)
+    updated_at = models.DateTimeField(auto_now=True)  # Time the checkpoint last advanced
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class AnchoredHash(models.Model):
+    """
+    Local index of hashes anchored on-chain, built from contract events so
+    verification can be answered without an RPC call.
+    """
+    KIND_CHOICES = (
+        ('signed_hash', 'Signed Hash'),
+        ('merkle_root', 'Merkle Root'),
+    )
+
+    value = models.CharField(max_length=66)  # Anchored bytes32 as lowercase 0x-hex
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='signed_hash')  # Which contract mapping it was added to
+    institution_address = models.CharField(max_length=42)  # Address that anchored it (event's institution)
+    block_number = models.BigIntegerField(db_index=True)  # Block containing the event
+    block_hash = models.CharField(max_length=66)  # Hash of that block, for reorg audits
+    tx_hash = models.CharField(max_length=66)  # Anchoring transaction
+    log_index = models.PositiveIntegerField()  # Position of the event within the block
+    anchored_at = models.DateTimeField()  # Block timestamp
+
+    def __str__(self):
+        return f"{self.kind} {self.value[:10]} @ block {self.block_number}"
+
+    class Meta:
+        constraints = [
+            # value first, so find_anchor's lookups by value alone can use the index too
+            models.UniqueConstraint(fields=['value', 'kind'], name='unique_anchored_hash')
+        ]
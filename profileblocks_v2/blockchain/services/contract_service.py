@@ -1,129 +1,516 @@
 # blockchain/services/contract_service.py
 from web3 import Web3
+from web3.exceptions import TimeExhausted, Web3TypeError
 from django.conf import settings
-import datetime
+from django.core.cache import caches
+from requests.adapters import HTTPAdapter
+from blockchain.services.counters import count, read_counters
+from blockchain.services.fees import (
+    FEE_FIELDS, bump_fees, estimate_gas, fee_params, record_inclusion, record_replacement, reset_fee_cache
+)
+from blockchain.services.nonce_manager import allocate_nonce, release_nonce, resync_nonce
+from blockchain.services.receipt_tracker import wait_for_receipt
+from blockchain.services.rpc_routing import RoutingProvider
+from blockchain.services.tx_journal import journal
+import requests
+import threading
+import time
 import os
 import logging
 
 
+# Process-wide client state: (pid, Web3 instance, contract object, simulated owner account or None)
+# The pid is recorded so a forked child never reuses the parent's sockets.
+_client = None
+_client_lock = threading.Lock()
+
+
+def _build_session():
+    # Create a requests session backed by a keep-alive connection pool
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=settings.WEB3_POOL_CONNECTIONS,
+        pool_maxsize=settings.WEB3_POOL_MAXSIZE,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _build_provider():
+    # A plain HTTP provider for one endpoint, the latency-aware router for several
+    urls = settings.WEB3_PROVIDER_URLS
+    if len(urls) > 1:
+        return RoutingProvider(
+            urls,
+            request_timeout=settings.WEB3_REQUEST_TIMEOUT,
+            session_factory=_build_session,
+            window=settings.WEB3_LATENCY_WINDOW,
+            failure_threshold=settings.WEB3_BREAKER_FAILURES,
+            cooldown=settings.WEB3_BREAKER_COOLDOWN,
+            hedge_after=settings.WEB3_HEDGE_AFTER_MS / 1000 if settings.WEB3_HEDGE_AFTER_MS else None,
+        )
+    return Web3.HTTPProvider(
+        urls[0] if urls else settings.WEB3_PROVIDER_URL,
+        request_kwargs={'timeout': settings.WEB3_REQUEST_TIMEOUT},
+        session=_build_session(),
+    )
+
+
+def _build_client():
+    # Build the shared Web3 instance and parse the contract ABI exactly once
+    if settings.CHAIN_BACKEND == 'simulated':
+        # In-process EVM with a freshly deployed registry, for load tests and CI (needs eth-tester)
+        from blockchain.services.simulated_chain import build_simulated_chain
+        w3, address, owner = build_simulated_chain()
+    else:
+        w3, address, owner = Web3(_build_provider()), settings.CONTRACT_ADDRESS, None
+    contract = w3.eth.contract(address=address, abi=settings.CONTRACT_ABI)
+    return os.getpid(), w3, contract, owner
+
+
+def _get_client():
+    global _client
+    client = _client
+    # Rebuild lazily on first use and after a fork (pid mismatch)
+    if client is None or client[0] != os.getpid():
+        with _client_lock:
+            client = _client
+            if client is None or client[0] != os.getpid():
+                client = _build_client()
+                _client = client
+    return client
+
+
+def reset_client():
+    """
+    Drop the pooled Web3 client so the next call rebuilds it.
+    Call from gunicorn's post_fork hook (or after changing provider settings).
+    """
+    global _client
+    with _client_lock:
+        _client = None
+    reset_fee_cache()  # Fees and gas estimates may belong to another chain
+
+
+# Children created by os.fork() (e.g. gunicorn workers) must not share the parent's connections
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reset_client)
+
+
 def get_w3():
-    # Initialize and return a Web3 instance connected to the configured HTTP provider
-    return Web3(Web3.HTTPProvider(settings.WEB3_PROVIDER_URL))
+    # Return the process-wide Web3 instance connected to the configured HTTP provider
+    return _get_client()[1]
 
 
 def get_contract():
-    # Get Web3 instance and return the contract object using address and ABI from settings
-    w3 = get_w3()
-    return w3.eth.contract(address=settings.CONTRACT_ADDRESS, abi=settings.CONTRACT_ABI)
+    # Return the process-wide contract object (address and ABI from settings, parsed once)
+    return _get_client()[2]
+
+
+def contract_owner():
+    # (address, private key) that signs owner and anchoring transactions: the simulated chain's own account, or from settings
+    owner = _get_client()[3]
+    if owner is not None:
+        return owner.address, owner.key.to_0x_hex()
+    return settings.CONTRACT_OWNER_ADDRESS, settings.CONTRACT_OWNER_PRIVATE_KEY
+
+
+def contract_has_function(name):
+    # True if the configured ABI exposes `name` (older deployments may predate newer functions)
+    return any(item.get('type') == 'function' and item.get('name') == name for item in settings.CONTRACT_ABI)
+
+
+def send_contract_transaction(w3, contract_function, sender, private_key, logger=None):
+    """
+    Build, sign and broadcast a contract call from `sender`, taking the nonce
+    from the shared nonce manager so concurrent senders never collide, the gas
+    limit from the estimate cache and the fees from the fee oracle.
+    Returns (tx hash, transaction dict) without waiting for it to be mined.
+    """
+    gas = estimate_gas(w3, contract_function, sender)  # Cached per function; may raise before a nonce is taken
+    nonce = allocate_nonce(w3, sender)  # Reserve the next nonce for this sender
+    if logger:
+        logger.debug(f"Nonce: {nonce}")
+    try:
+        # Build and sign the transaction locally
+        txn = contract_function.build_transaction({
+            'from': sender,
+            'nonce': nonce,
+            'gas': gas,
+            **fee_params(w3)
+        })
+        if logger:
+            logger.debug(f"Transaction dict: {txn}")
+        signed = w3.eth.account.sign_transaction(txn, private_key=private_key)
+    except Exception:
+        # Nothing reached the node, so hand the nonce back
+        release_nonce(w3, sender, nonce)
+        raise
+
+    try:
+        # Send the signed transaction raw bytes to the network
+        tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
+    except Exception as e:
+        # The node rejected or never saw it: resync from its pending count
+        resync_nonce(w3, sender)
+        journal('send_failed', sender=sender, nonce=nonce, function=_function_name(contract_function),
+                args=_journal_args(contract_function), error=str(e))
+        raise
+    journal('sent', tx_hash=tx_hash.to_0x_hex(), sender=sender, nonce=nonce,
+            function=_function_name(contract_function), args=_journal_args(contract_function),
+            gas=gas, **_fee_fields(txn))
+    return tx_hash, txn
+
+
+def _function_name(contract_function):
+    return getattr(contract_function, 'fn_name', None)
+
+
+def _journal_args(contract_function):
+    # Call arguments in JSON-friendly form: bytes as 0x hex, arrays element-wise
+    def convert(value):
+        if isinstance(value, (bytes, bytearray)):
+            return Web3.to_hex(value)
+        if isinstance(value, (list, tuple)):
+            return [convert(item) for item in value]
+        return value
+    return [convert(arg) for arg in getattr(contract_function, 'args', ())]
+
+
+def _fee_fields(txn):
+    return {field: txn[field] for field in FEE_FIELDS if field in txn}
+
+
+def wait_for_inclusion(w3, tx_hash, txn, private_key, hash_count=1, logger=None):
+    """
+    Wait for a transaction sent by send_contract_transaction to be mined,
+    through the shared receipt tracker. If it is still pending after
+    FEE_STUCK_TIMEOUT seconds it is replaced with the same nonce and bumped
+    fees, up to FEE_MAX_REPLACEMENTS times. Returns the receipt of whichever
+    version lands, recording its time-to-inclusion and cost per anchored hash
+    when `hash_count` is set. Raises TimeExhausted if none does.
+    """
+    logger = logger or logging.getLogger(__name__)
+    submitted_at = time.monotonic()
+    sent = [tx_hash]
+    replacements = 0
+    while True:
+        try:
+            # Any version of the transaction may be the one mined, so wait on all of them
+            receipt = wait_for_receipt(w3, sent, settings.FEE_STUCK_TIMEOUT)
+            break
+        except TimeExhausted:
+            pass
+        if replacements >= settings.FEE_MAX_REPLACEMENTS:
+            journal('timeout', tx_hash=sent[-1].to_0x_hex(), sender=txn['from'], nonce=txn['nonce'],
+                    latency_ms=int((time.monotonic() - submitted_at) * 1000), replacements=len(sent) - 1)
+            raise TimeExhausted(f"Nonce {txn['nonce']} not mined after {replacements} replacement(s)")
+        replacements += 1
+
+        fees = bump_fees(w3, txn)
+        if fees is None:
+            logger.warning(f"Nonce {txn['nonce']} stuck but FEE_MAX_FEE_GWEI prevents a fee bump")
+            continue
+        replacement = {**txn, **fees}
+        try:
+            signed = w3.eth.account.sign_transaction(replacement, private_key=private_key)
+            sent.append(w3.eth.send_raw_transaction(signed.raw_transaction))
+        except Exception as e:
+            # Usually "nonce too low": a previous version was mined in the meantime
+            logger.warning(f"Replacing nonce {txn['nonce']} failed: {e}")
+            continue
+        txn = replacement
+        record_replacement()
+        journal('replaced', tx_hash=sent[-1].to_0x_hex(), replaces=sent[-2].to_0x_hex(),
+                sender=txn['from'], nonce=txn['nonce'], **fees)
+        logger.info(f"Replaced stuck nonce {txn['nonce']} with {sent[-1].to_0x_hex()} ({fees})")
+
+    latency = time.monotonic() - submitted_at
+    journal('mined', tx_hash=receipt['transactionHash'].to_0x_hex(), sender=txn['from'], nonce=txn['nonce'],
+            status=receipt['status'], block_number=receipt['blockNumber'], gas_used=receipt['gasUsed'],
+            effective_gas_price=receipt.get('effectiveGasPrice'), latency_ms=int(latency * 1000),
+            replacements=len(sent) - 1)
+    if hash_count:
+        record_inclusion(receipt, latency, hash_count)
+    return receipt
 
 
 def authorize_institution_on_chain(institution_eth_address):
     # Authorize an institution on the blockchain contract by sending a transaction
     w3 = get_w3()
     contract = get_contract()
-    nonce = w3.eth.get_transaction_count(settings.CONTRACT_OWNER_ADDRESS)  # Get nonce for transaction ordering
-
-    # Build transaction to call authorizeInstitution function on contract
-    txn = contract.functions.authorizeInstitution(institution_eth_address).build_transaction({
-        'from': settings.CONTRACT_OWNER_ADDRESS,
-        'nonce': nonce,
-        'gas': 150000,
-        'gasPrice': w3.eth.gas_price
-    })
-
-    # Sign the transaction using contract owner private key
-    signed = w3.eth.account.sign_transaction(txn, settings.CONTRACT_OWNER_PRIVATE_KEY)
-    # Send the signed transaction to the blockchain network
-    tx_hash = w3.eth.send_raw_transaction(signed.raw_transaction)
-    # Wait for transaction to be mined and get receipt
-    receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
+    owner_address, owner_private_key = contract_owner()
+
+    # Send a transaction calling authorizeInstitution, signed by the contract owner
+    tx_hash, txn = send_contract_transaction(
+        w3,
+        contract.functions.authorizeInstitution(institution_eth_address),
+        owner_address,
+        owner_private_key
+    )
+    # Wait for transaction to be mined (replacing it if it gets stuck) and get receipt
+    receipt = wait_for_inclusion(w3, tx_hash, txn, owner_private_key, hash_count=0)
     return receipt
 
 
+def authorize_institutions_on_chain(institution_eth_addresses, chunk_size=None):
+    """
+    Authorize many institution addresses with as few mined blocks as possible.
+    Uses authorizeInstitutions(address[]) in chunks of CHAIN_AUTHORIZE_CHUNK_SIZE
+    when the deployed ABI has it, otherwise one authorizeInstitution call per
+    address. All transactions are sent before any receipt is awaited, so they
+    can be mined together. Returns the receipts in sending order.
+    """
+    w3 = get_w3()
+    contract = get_contract()
+    owner_address, owner_private_key = contract_owner()
+    addresses = list(dict.fromkeys(institution_eth_addresses))  # De-duplicate, keep order
+    if contract_has_function('authorizeInstitutions'):
+        chunk_size = chunk_size or settings.CHAIN_AUTHORIZE_CHUNK_SIZE
+        calls = [
+            contract.functions.authorizeInstitutions(addresses[start:start + chunk_size])
+            for start in range(0, len(addresses), chunk_size)
+        ]
+    else:
+        calls = [contract.functions.authorizeInstitution(address) for address in addresses]
+
+    # Pipeline: the nonce manager hands out consecutive nonces, so nothing waits between sends
+    pending = [
+        send_contract_transaction(w3, call, owner_address, owner_private_key)
+        for call in calls
+    ]
+    return [
+        wait_for_inclusion(w3, tx_hash, txn, owner_private_key, hash_count=0)
+        for tx_hash, txn in pending
+    ]
+
+
 def add_signed_hash_to_chain(institution_private_key, institution_eth_address, signed_hash):
-    from web3.exceptions import TransactionNotFound
+    """
+    Anchor one signed hash with addSignedHash and wait for it to be mined.
+    Every step is recorded in the transaction journal. Returns the receipt,
+    or None if none arrived.
+    """
+    logger = logging.getLogger(__name__)
 
     # Validate provided private key length (basic check)
     if not institution_private_key or len(institution_private_key) < 64:
         raise ValueError("Institution ETH private key is empty or invalid!")
     
     # NOTE: For proof of concept, override institution's private key and address with test account
-    institution_eth_address_override = os.getenv('CONTRACT_OWNER_ADDRESS')
-    institution_private_key_override = os.getenv('CONTRACT_OWNER_PRIVATE_KEY')
+    institution_eth_address_override, institution_private_key_override = contract_owner()
 
-    # Prepare logging path as logs/cert_issues/institution_eth_address/date/signed_hash.log
-    today_str = datetime.utcnow().strftime('%Y-%m-%d')
-    log_dir = os.path.join(
-        'logs', 'cert_issues',
+    w3 = get_w3()
+    contract = get_contract()
+
+    # Send a transaction calling addSignedHash with signed hash as bytes, signed by the institution
+    tx_hash, txn = send_contract_transaction(
+        w3,
+        contract.functions.addSignedHash(Web3.to_bytes(hexstr=signed_hash)),
         institution_eth_address_override,
-        today_str
+        institution_private_key_override,
+        logger=logger
     )
-    os.makedirs(log_dir, exist_ok=True)
-    log_filename = os.path.join(log_dir, f"{signed_hash}.log")
-
-    logger = logging.getLogger(f"cert_issues.{institution_eth_address_override}.{signed_hash}")
-    logger.setLevel(logging.DEBUG)
-    # Remove old handlers to prevent duplicate logs if function is called repeatedly
-    if logger.hasHandlers():
-        logger.handlers.clear()
-    file_handler = logging.FileHandler(log_filename, mode='a')
-    formatter = logging.Formatter(
-        fmt="%(asctime)s | %(levelname)s | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
+    logger.debug(f"Sent signed hash {signed_hash} in transaction {tx_hash.to_0x_hex()}")
 
-    w3 = get_w3()
+    try:
+        # Wait for the transaction to be mined (replacing it if it gets stuck) and get receipt
+        return wait_for_inclusion(w3, tx_hash, txn, institution_private_key_override, logger=logger)
+    except Exception as e:
+        logger.error(f"Exception while waiting for receipt of {signed_hash}: {e}")
+        return None
+
+
+def verify_signed_hash_on_chain(signed_hash_keccak):
+    # Call the contract's verifySignedHash function with the keccak hash (in bytes)
     contract = get_contract()
-    nonce = w3.eth.get_transaction_count(institution_eth_address_override)  # Get current nonce for the address
-
-    logger.debug("Preparing to add signed hash to chain")
-    logger.debug(f"Institution ETH Address: {institution_eth_address_override}")
-    logger.debug(f"Signed hash (hex): {signed_hash}")
-    logger.debug(f"Nonce: {nonce}")
-
-    # Build transaction calling addSignedHash function with signed hash as bytes
-    txn = contract.functions.addSignedHash(Web3.to_bytes(hexstr=signed_hash)).build_transaction({
-        'from': institution_eth_address_override,
-        'nonce': nonce,
-        'gas': 150000,
-        'gasPrice': w3.eth.gas_price
-    })
-
-    logger.debug(f"Transaction dict: {txn}")
-
-    # Sign the transaction with institution's private key
-    signed = w3.eth.account.sign_transaction(txn, private_key=institution_private_key_override)
-    raw_tx = signed.raw_transaction
-    # Send the signed transaction raw bytes to the network
-    tx_hash = w3.eth.send_raw_transaction(raw_tx)
-    logger.info(f"Sent transaction hash: {tx_hash.hex()}")
+    return contract.functions.verifySignedHash(Web3.to_bytes(hexstr=signed_hash_keccak)).call()
+
 
+def _verify_chunk_with_rpc_batch(hashes):
+    # One JSON-RPC batch of verifySignedHash eth_calls; sequential calls if the provider cannot batch
+    w3 = get_w3()
+    contract = get_contract()
+    calls = [contract.functions.verifySignedHash(Web3.to_bytes(hexstr=h)) for h in hashes]
     try:
-        logger.debug("Waiting for transaction receipt...")
-        # Wait for the transaction to be mined and get receipt
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash)
-        logger.info(f"Transaction receipt: {receipt}")
-        if receipt.status == 1:
-            logger.info("Transaction SUCCESSFUL")
+        with w3.batch_requests() as batch:
+            for call in calls:
+                batch.add(call)
+            return list(batch.execute())
+    except (Web3TypeError, NotImplementedError):
+        return [call.call() for call in calls]
+
+
+def verify_signed_hashes_on_chain(signed_hash_keccaks, chunk_size=None):
+    """
+    Check many signed hashes in a few round trips.
+    Uses the contract's verifySignedHashes view when deployed, otherwise
+    JSON-RPC batch requests; large inputs are split into chunks.
+    Returns a dict mapping each input hash to True/False.
+    """
+    chunk_size = chunk_size or settings.CHAIN_BATCH_CHUNK_SIZE
+    hashes = list(dict.fromkeys(signed_hash_keccaks))  # De-duplicate, keep order
+    use_view = contract_has_function('verifySignedHashes')
+    results = {}
+    for start in range(0, len(hashes), chunk_size):
+        chunk = hashes[start:start + chunk_size]
+        if use_view:
+            flags = get_contract().functions.verifySignedHashes(
+                [Web3.to_bytes(hexstr=h) for h in chunk]
+            ).call()
         else:
-            logger.warning("Transaction FAILED")
-    except TransactionNotFound:
-        logger.error("Transaction not found in mempool after sending.")
-        receipt = None
-    except Exception as e:
-        logger.error(f"Exception while waiting for receipt: {e}")
-        receipt = None
+            flags = _verify_chunk_with_rpc_batch(chunk)
+        results.update(zip(chunk, flags))
+    return results
 
-    # Clean up handler to avoid handler accumulation in repeated calls
-    logger.removeHandler(file_handler)
-    file_handler.close()
 
-    return receipt
+def add_merkle_root_to_chain(institution_private_key, institution_eth_address, merkle_root, hash_count=1):
+    """
+    Anchor the Merkle root of a batch of signed hashes in a single transaction.
+    Uses anchorMerkleRoot when the deployed ABI has it, otherwise stores the
+    root through addSignedHash. `hash_count` (the number of leaves) is used for
+    cost-per-hash stats. Returns the receipt, or None if none arrived.
+    """
+    logger = logging.getLogger(__name__)
 
+    # Validate provided private key length (basic check)
+    if not institution_private_key or len(institution_private_key) < 64:
+        raise ValueError("Institution ETH private key is empty or invalid!")
 
-def verify_signed_hash_on_chain(signed_hash_keccak):
-    # Call the contract's verifySignedHash function with the keccak hash (in bytes)
+    # NOTE: For proof of concept, override institution's private key and address with test account
+    institution_eth_address_override, institution_private_key_override = contract_owner()
+
+    w3 = get_w3()
+    contract = get_contract()
+    root_bytes = Web3.to_bytes(hexstr=merkle_root)
+    if contract_has_function('anchorMerkleRoot'):
+        contract_function = contract.functions.anchorMerkleRoot(root_bytes)
+    else:
+        contract_function = contract.functions.addSignedHash(root_bytes)
+
+    tx_hash, txn = send_contract_transaction(
+        w3, contract_function, institution_eth_address_override, institution_private_key_override
+    )
+    logger.info(f"Sent Merkle root {merkle_root} in transaction {tx_hash.to_0x_hex()}")
+    try:
+        # Wait for the transaction to be mined (replacing it if it gets stuck) and get receipt
+        return wait_for_inclusion(w3, tx_hash, txn, institution_private_key_override,
+                                  hash_count=hash_count, logger=logger)
+    except Exception as e:
+        logger.error(f"Exception while waiting for Merkle root receipt: {e}")
+        return None
+
+
+def verify_merkle_root_on_chain(merkle_root):
+    # Check that a Merkle root is anchored, via verifyMerkleRoot or the addSignedHash fallback
     contract = get_contract()
-    return contract.functions.verifySignedHash(Web3.to_bytes(hexstr=signed_hash_keccak)).call()
\ No newline at end of file
+    root_bytes = Web3.to_bytes(hexstr=merkle_root)
+    return bool(
+        contract_has_function('verifyMerkleRoot') and contract.functions.verifyMerkleRoot(root_bytes).call()
+    ) or contract.functions.verifySignedHash(root_bytes).call()
+
+
+# Verification result cache: an anchored hash never becomes un-anchored, so positive
+# results are cached forever; negative results may flip shortly after issuance and
+# expire after CHAIN_CACHE_NEGATIVE_TTL seconds. Entries live in the Django cache
+# named by CHAIN_CACHE_ALIAS, so workers share them when a shared backend is configured.
+_STATS_KEYS = ('hits', 'misses', 'coalesced')
+# Striped in-process locks: the same key always maps to the same lock
+_flight_locks = [threading.Lock() for _ in range(64)]
+
+
+def _chain_cache():
+    return caches[settings.CHAIN_CACHE_ALIAS]
+
+
+def _cache_key(kind, value):
+    return f"chain:{kind}:{Web3.to_hex(hexstr=value).lower()}"
+
+
+def chain_cache_stats():
+    # Return the shared hit / miss / coalesced counters
+    return read_counters('chain', _STATS_KEYS)
+
+
+def _store_result(key, result):
+    # Positive results never expire, negative ones only briefly
+    _chain_cache().set(key, result, timeout=None if result else settings.CHAIN_CACHE_NEGATIVE_TTL)
+
+
+def _cached_lookup(kind, value, fetch):
+    """
+    Return fetch(value) through the cache. Concurrent misses for the same
+    value are coalesced: threads share an in-process lock, and processes
+    wait on a short cache lock while the first caller does the RPC.
+    """
+    store = _chain_cache()
+    key = _cache_key(kind, value)
+    cached = store.get(key)
+    if cached is not None:
+        count('chain', 'hits')
+        return cached
+
+    with _flight_locks[hash(key) % len(_flight_locks)]:
+        cached = store.get(key)
+        if cached is not None:
+            count('chain', 'coalesced')
+            return cached
+
+        # Cross-process: only the holder of the lock key calls the node
+        lock_key = f"{key}:lock"
+        deadline = time.monotonic() + settings.CHAIN_CACHE_LOCK_TIMEOUT
+        acquired = store.add(lock_key, 1, timeout=settings.CHAIN_CACHE_LOCK_TIMEOUT)
+        while not acquired:
+            if time.monotonic() >= deadline:
+                break  # Give up waiting and call the node ourselves, leaving the holder's lock alone
+            time.sleep(0.05)
+            cached = store.get(key)
+            if cached is not None:
+                count('chain', 'coalesced')
+                return cached
+            acquired = store.add(lock_key, 1, timeout=settings.CHAIN_CACHE_LOCK_TIMEOUT)
+
+        count('chain', 'misses')
+        try:
+            result = fetch(value)
+            _store_result(key, result)
+        finally:
+            if acquired:
+                store.delete(lock_key)
+        return result
+
+
+def cached_verify_signed_hash(signed_hash_keccak):
+    # verify_signed_hash_on_chain through the shared result cache
+    return _cached_lookup('signed-hash', signed_hash_keccak, verify_signed_hash_on_chain)
+
+
+def cached_verify_merkle_root(merkle_root):
+    # verify_merkle_root_on_chain through the shared result cache
+    return _cached_lookup('merkle-root', merkle_root, verify_merkle_root_on_chain)
+
+
+def cached_verify_signed_hashes(signed_hash_keccaks):
+    """
+    verify_signed_hashes_on_chain through the shared result cache: one
+    get_many for all hashes, one batched lookup for the misses.
+    """
+    keys = {h: _cache_key('signed-hash', h) for h in signed_hash_keccaks}
+    found = _chain_cache().get_many(list(keys.values()))
+    results = {h: found[key] for h, key in keys.items() if key in found}
+    missing = [h for h in keys if h not in results]
+    if results:
+        count('chain', 'hits', len(results))
+    if missing:
+        count('chain', 'misses', len(missing))
+        fetched = verify_signed_hashes_on_chain(missing)
+        for h, result in fetched.items():
+            _store_result(keys[h], result)
+        results.update(fetched)
+    return results
+
+
+def remember_anchored(kind, value):
+    # Record a freshly confirmed anchor so a cached negative result cannot linger
+    _chain_cache().set(_cache_key(kind, value), True, timeout=None)
@@ -0,0 +1,33 @@
+# blockchain/services/counters.py
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Statistics counters shared by every process. They live in the Django cache
+# named by CHAIN_CACHE_ALIAS, so all workers add to the same totals when a
+# shared backend (e.g. Redis or Memcached) is configured.
+
+def counter_cache():
+    return caches[settings.CHAIN_CACHE_ALIAS]
+
+
+def count(prefix, stat, amount=1):
+    # Add `amount` to the counter; add() seeds the key so incr() works on every backend
+    key = f"{prefix}:stats:{stat}"
+    store = counter_cache()
+    store.add(key, 0, timeout=None)
+    try:
+        store.incr(key, amount)
+    except ValueError:
+        store.set(key, amount, timeout=None)
+
+
+def read_counters(prefix, stats):
+    # {stat: value} for the named counters, 0 for those never counted
+    values = counter_cache().get_many([f"{prefix}:stats:{stat}" for stat in stats])
+    return {stat: values.get(f"{prefix}:stats:{stat}", 0) for stat in stats}
+
+
+def reset_counters(prefix, stats):
+    counter_cache().delete_many([f"{prefix}:stats:{stat}" for stat in stats])
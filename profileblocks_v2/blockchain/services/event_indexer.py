@@ -0,0 +1,114 @@
+# blockchain/services/event_indexer.py
+
+import logging
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from eth_utils import event_abi_to_log_topic
+from web3 import Web3
+from blockchain.models import AnchoredHash, SyncCheckpoint
+from blockchain.services.contract_service import get_contract, get_w3
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = 'events:CertificateRegistry'
+
+# Contract events to index: event name -> (AnchoredHash kind, name of the bytes32 argument)
+INDEXED_EVENTS = {
+    'SignedHashAdded': ('signed_hash', 'signedHash'),
+    'MerkleRootAnchored': ('merkle_root', 'root'),
+}
+
+
+def _event_topics(contract):
+    # topic0 -> event name for every indexed event present in the deployed ABI
+    topics = {}
+    for item in contract.abi:
+        if item.get('type') == 'event' and item.get('name') in INDEXED_EVENTS:
+            topics[Web3.to_hex(event_abi_to_log_topic(item))] = item['name']
+    return topics
+
+
+def _fetch_page(w3, contract, topics, from_block, to_block):
+    # Pull and decode one block range of logs, then attach block timestamps
+    logs = w3.eth.get_logs({
+        'address': contract.address,
+        'fromBlock': from_block,
+        'toBlock': to_block,
+        'topics': [list(topics)],
+    })
+    decoded = []
+    for log in logs:
+        event_name = topics.get(Web3.to_hex(log['topics'][0]))
+        if event_name:
+            decoded.append((event_name, getattr(contract.events, event_name)().process_log(log)))
+
+    # One block fetch per block that actually contains events
+    timestamps = {
+        number: datetime.fromtimestamp(w3.eth.get_block(number)['timestamp'], tz=dt_timezone.utc)
+        for number in {event.blockNumber for _, event in decoded}
+    }
+
+    rows = []
+    for event_name, event in decoded:
+        kind, argument = INDEXED_EVENTS[event_name]
+        rows.append(AnchoredHash(
+            value=Web3.to_hex(event.args[argument]).lower(),
+            kind=kind,
+            institution_address=event.args['institution'],
+            block_number=event.blockNumber,
+            block_hash=event.blockHash.to_0x_hex(),
+            tx_hash=event.transactionHash.to_0x_hex(),
+            log_index=event.logIndex,
+            anchored_at=timestamps[event.blockNumber],
+        ))
+    return rows
+
+
+def index_events(page_size=None, confirmations=None, from_block=None):
+    """
+    Index anchoring events from the last checkpoint up to the head minus
+    `confirmations` blocks, so shallow reorgs never reach the local table.
+    Pages through eth_getLogs, halving the page when the node rejects a range.
+    Returns the number of events stored.
+    """
+    page_size = page_size or settings.CHAIN_INDEX_PAGE_SIZE
+    confirmations = settings.CHAIN_INDEX_CONFIRMATIONS if confirmations is None else confirmations
+    w3 = get_w3()
+    contract = get_contract()
+    topics = _event_topics(contract)
+
+    checkpoint, _ = SyncCheckpoint.objects.get_or_create(
+        name=CHECKPOINT_NAME, defaults={'position': settings.CHAIN_INDEX_START_BLOCK - 1}
+    )
+    start = checkpoint.position + 1 if from_block is None else from_block
+    safe_head = w3.eth.block_number - confirmations
+
+    stored = 0
+    while start <= safe_head:
+        end = min(start + page_size - 1, safe_head)
+        try:
+            rows = _fetch_page(w3, contract, topics, start, end)
+        except Exception as e:
+            if page_size == 1:
+                raise
+            # Providers cap log ranges / result sizes: retry with a smaller page
+            page_size = max(1, page_size // 2)
+            logger.warning("eth_getLogs %s-%s failed (%s), page size now %s", start, end, e, page_size)
+            continue
+
+        with transaction.atomic():
+            AnchoredHash.objects.bulk_create(rows, ignore_conflicts=True)
+            checkpoint.position = end
+            checkpoint.save(update_fields=['position', 'updated_at'])
+        stored += len(rows)
+        start = end + 1
+    return stored
+
+
+def find_anchor(value, kind=None):
+    # Look up an indexed anchoring event for a bytes32 hex value (with or without 0x), or None
+    records = AnchoredHash.objects.filter(value=Web3.to_hex(hexstr=value).lower())
+    if kind:
+        records = records.filter(kind=kind)
+    return records.order_by('block_number').first()
@@ -0,0 +1,164 @@
+# blockchain/services/fees.py
+
+import logging
+import threading
+import time
+from django.conf import settings
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+from blockchain.services.counters import count, read_counters
+
+logger = logging.getLogger(__name__)
+
+# Fee strategies: multiplier on the node's suggested priority fee, and how many base fees
+# of headroom maxFeePerGas keeps so the transaction survives base-fee rises while pending
+FEE_STRATEGIES = {
+    'latency': {'priority_multiplier': 1.5, 'base_fee_multiplier': 2.0},
+    'cost': {'priority_multiplier': 1.0, 'base_fee_multiplier': 1.25},
+}
+# Nodes only accept a same-nonce replacement whose fees rise by at least this fraction
+MIN_REPLACEMENT_BUMP = 0.125
+FEE_FIELDS = ('maxFeePerGas', 'maxPriorityFeePerGas', 'gasPrice')
+_STATS_KEYS = ('transactions', 'hashes', 'inclusion_ms', 'cost_gwei', 'replacements')
+
+# Fee oracle state: (fetched_at, base fee or None on pre-London chains, priority fee or gas price)
+_oracle = None
+_oracle_lock = threading.Lock()
+# Gas estimates: cache key -> (fetched_at, gas limit)
+_gas_estimates = {}
+_gas_lock = threading.Lock()
+
+
+def current_fees(w3):
+    """
+    Return (base_fee, priority_fee) in wei, refreshed at most every FEE_ORACLE_TTL
+    seconds. base_fee is None on chains without EIP-1559, where priority_fee
+    holds the legacy gas price instead.
+    """
+    global _oracle
+    with _oracle_lock:
+        if _oracle is None or time.monotonic() - _oracle[0] >= settings.FEE_ORACLE_TTL:
+            base_fee = w3.eth.get_block('latest').get('baseFeePerGas')
+            priority_fee = w3.eth.max_priority_fee if base_fee is not None else w3.eth.gas_price
+            _oracle = (time.monotonic(), base_fee, priority_fee)
+        return _oracle[1], _oracle[2]
+
+
+def reset_fee_cache():
+    # Forget the oracle reading and gas estimates, e.g. when the client switches to another chain
+    global _oracle
+    with _oracle_lock:
+        _oracle = None
+    with _gas_lock:
+        _gas_estimates.clear()
+
+
+def _fee_cap():
+    # FEE_MAX_FEE_GWEI as wei, or None when uncapped
+    return Web3.to_wei(settings.FEE_MAX_FEE_GWEI, 'gwei') if settings.FEE_MAX_FEE_GWEI else None
+
+
+def _apply_cap(params):
+    # Never bid above the configured ceiling; the tip can never exceed the max fee
+    cap = _fee_cap()
+    if cap is None:
+        return params
+    capped = {field: min(value, cap) for field, value in params.items()}
+    if 'maxFeePerGas' in capped:
+        capped['maxPriorityFeePerGas'] = min(capped['maxPriorityFeePerGas'], capped['maxFeePerGas'])
+    return capped
+
+
+def fee_params(w3, strategy=None):
+    """
+    Fee fields for a new transaction under FEE_STRATEGY ('latency' or 'cost'):
+    maxFeePerGas / maxPriorityFeePerGas on EIP-1559 chains, gasPrice otherwise.
+    """
+    strategy = FEE_STRATEGIES[strategy or settings.FEE_STRATEGY]
+    base_fee, priority_fee = current_fees(w3)
+    if base_fee is None:
+        return _apply_cap({'gasPrice': priority_fee})
+    tip = int(priority_fee * strategy['priority_multiplier'])
+    return _apply_cap({
+        'maxPriorityFeePerGas': tip,
+        'maxFeePerGas': int(base_fee * strategy['base_fee_multiplier']) + tip,
+    })
+
+
+def bump_fees(w3, params):
+    """
+    Fees for a same-nonce replacement: every fee field raised by at least
+    FEE_REPLACEMENT_BUMP (never less than 12.5%), or to the current market
+    price if that is higher. Returns None once the fee cap prevents a bump.
+    """
+    factor = 1 + max(settings.FEE_REPLACEMENT_BUMP, MIN_REPLACEMENT_BUMP)
+    market = fee_params(w3)
+    bumped = _apply_cap({
+        field: max(int(value * factor) + 1, market.get(field, 0))
+        for field, value in params.items() if field in FEE_FIELDS
+    })
+    if any(bumped[field] < int(params[field] * (1 + MIN_REPLACEMENT_BUMP)) for field in bumped):
+        return None
+    return bumped
+
+
+def _gas_key(contract_function):
+    # Gas depends on the function and on the length of any array arguments
+    sizes = tuple(len(arg) for arg in getattr(contract_function, 'args', ()) if isinstance(arg, (list, tuple)))
+    return getattr(contract_function, 'fn_name', None), sizes
+
+
+def estimate_gas(w3, contract_function, sender):
+    """
+    Gas limit for a contract call: eth_estimateGas plus FEE_GAS_MARGIN, cached per
+    function for FEE_GAS_ESTIMATE_TTL seconds. On a cache miss, a call that would
+    revert raises ContractLogicError instead of being sent; other estimation
+    errors fall back to FEE_DEFAULT_GAS_LIMIT.
+    """
+    key = _gas_key(contract_function)
+    with _gas_lock:
+        cached = _gas_estimates.get(key)
+    if cached and time.monotonic() - cached[0] < settings.FEE_GAS_ESTIMATE_TTL:
+        return cached[1]
+
+    try:
+        gas = int(contract_function.estimate_gas({'from': sender}) * (1 + settings.FEE_GAS_MARGIN))
+    except ContractLogicError:
+        raise
+    except Exception as e:
+        logger.warning("Gas estimation for %s failed (%s), using %s", key[0], e, settings.FEE_DEFAULT_GAS_LIMIT)
+        return settings.FEE_DEFAULT_GAS_LIMIT
+
+    with _gas_lock:
+        _gas_estimates[key] = (time.monotonic(), gas)
+    return gas
+
+
+def record_replacement():
+    count('fees', 'replacements', 1)
+
+
+def record_inclusion(receipt, seconds, hash_count=1):
+    """
+    Record time-to-inclusion and cost of a mined transaction that anchored
+    `hash_count` hashes. Returns the cost in wei.
+    """
+    cost = receipt['gasUsed'] * receipt.get('effectiveGasPrice', 0)
+    count('fees', 'transactions', 1)
+    count('fees', 'hashes', hash_count)
+    count('fees', 'inclusion_ms', int(seconds * 1000))
+    count('fees', 'cost_gwei', int(Web3.from_wei(cost, 'gwei')))
+    logger.info("Transaction %s included after %.1fs, gas %s, cost %s wei (%s per hash)",
+                receipt['transactionHash'].to_0x_hex(), seconds, receipt['gasUsed'], cost,
+                cost // max(hash_count, 1))
+    return cost
+
+
+def fee_stats():
+    # Shared counters plus average time-to-inclusion and cost per anchored hash
+    stats = read_counters('fees', _STATS_KEYS)
+    stats['avg_inclusion_seconds'] = (
+        stats['inclusion_ms'] / stats['transactions'] / 1000 if stats['transactions'] else 0.0
+    )
+    stats['avg_cost_per_hash_gwei'] = stats['cost_gwei'] / stats['hashes'] if stats['hashes'] else 0.0
+    return stats
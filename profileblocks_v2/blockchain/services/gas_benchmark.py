@@ -0,0 +1,160 @@
+# blockchain/services/gas_benchmark.py
+
+import json
+import time
+from pathlib import Path
+from django.conf import settings
+from web3 import Web3
+from web3.providers.eth_tester import EthereumTesterProvider
+from blockchain.services.merkle import build_merkle_tree, merkle_root
+
+# Workloads in run order: verification reads the hashes anchored before it
+WORKLOADS = ('authorize', 'authorize_batch', 'anchor', 'anchor_merkle', 'verify', 'verify_batch')
+# Fixed fees so gas costs do not depend on the simulated base fee
+_FEES = {'maxFeePerGas': 10 ** 10, 'maxPriorityFeePerGas': 10 ** 9}
+
+
+def load_artifact(path=None):
+    # Hardhat artifact (abi + bytecode), by default the deployed CertificateRegistry
+    with open(path or settings.ABI_PATH) as f:
+        artifact = json.load(f)
+    if not artifact.get('bytecode') or artifact['bytecode'] == '0x':
+        raise ValueError(f"{path} has no deployable bytecode (interface or abstract contract?)")
+    return artifact
+
+
+class _Bench:
+    # A fresh in-memory chain with the artifact deployed by an authorized owner
+    def __init__(self, artifact):
+        self.artifact = artifact
+        self.functions = {item['name'] for item in artifact['abi'] if item.get('type') == 'function'}
+        self.w3 = Web3(EthereumTesterProvider())
+        self.owner = self.w3.eth.accounts[0]
+        self.gas_limit = self.w3.eth.get_block('latest').gasLimit  # Explicit gas skips eth_estimateGas
+        registry = self.w3.eth.contract(abi=artifact['abi'], bytecode=artifact['bytecode'])
+        receipt = self.w3.eth.get_transaction_receipt(self._transact(registry.constructor()))
+        self.deployment_gas = receipt.gasUsed
+        self.contract = self.w3.eth.contract(address=receipt.contractAddress, abi=artifact['abi'])
+        self._transact(self.contract.functions.authorizeInstitution(self.owner))
+        self.anchored = []
+
+    def _transact(self, call):
+        return call.transact({'from': self.owner, 'gas': self.gas_limit, **_FEES})
+
+    def _send_all(self, calls):
+        # Send one transaction per call (mined on arrival) and total the gas they used
+        tx_hashes = [self._transact(call) for call in calls]
+        return len(tx_hashes), sum(self.w3.eth.get_transaction_receipt(h).gasUsed for h in tx_hashes)
+
+    def _read_all(self, calls):
+        # eth_call each view; its gas is what the call would cost inside a transaction. Every call is
+        # estimated: batch chunks differ in size (the last one is usually shorter) and in calldata
+        for call in calls:
+            call.call()
+        return len(calls), sum(call.estimate_gas({'from': self.owner}) for call in calls)
+
+    def run(self, workload, size, chunk_size):
+        functions = self.contract.functions
+        # Distinct, deterministic inputs that cost next to nothing to make (no key generation)
+        hashes = [Web3.keccak(text=f"{workload}:{index}") for index in range(size)]
+        addresses = [Web3.to_checksum_address(h[-20:]) for h in hashes]
+        chunks = lambda items: [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]  # noqa: E731
+
+        if workload == 'authorize':
+            return 'authorizeInstitution', self._send_all([functions.authorizeInstitution(a) for a in addresses])
+        if workload == 'authorize_batch' and 'authorizeInstitutions' in self.functions:
+            return 'authorizeInstitutions', self._send_all(
+                [functions.authorizeInstitutions(chunk) for chunk in chunks(addresses)]
+            )
+        if workload == 'anchor':
+            self.anchored.extend(hashes)
+            return 'addSignedHash', self._send_all([functions.addSignedHash(h) for h in hashes])
+        if workload == 'anchor_merkle':
+            # One root for the whole batch; contracts without anchorMerkleRoot store it as a signed hash
+            root = Web3.to_bytes(hexstr=merkle_root(build_merkle_tree(hashes)))
+            name = 'anchorMerkleRoot' if 'anchorMerkleRoot' in self.functions else 'addSignedHash'
+            return name, self._send_all([getattr(functions, name)(root)])
+        verify_hashes = (self.anchored + hashes)[:size]
+        if workload == 'verify':
+            return 'verifySignedHash', self._read_all([functions.verifySignedHash(h) for h in verify_hashes])
+        if workload == 'verify_batch' and 'verifySignedHashes' in self.functions:
+            return 'verifySignedHashes', self._read_all(
+                [functions.verifySignedHashes(chunk) for chunk in chunks(verify_hashes)]
+            )
+        return None, None  # Not supported by this contract variant
+
+
+def run_gas_benchmark(artifact_path=None, sizes=(1, 100, 10000), workloads=WORKLOADS, chunk_size=None,
+                      progress=None):
+    """
+    Deploy a compiled registry into a local py-evm chain (one fresh chain per
+    size) and run each workload at each size: `size` institutions authorized,
+    hashes anchored or hashes verified. Gas comes from receipts, or from
+    eth_estimateGas for views. Workloads a contract variant does not implement
+    are skipped. `progress` is called with each result as it completes.
+    Returns a dict with the deployment gas and one result per (workload, size).
+    """
+    artifact = load_artifact(artifact_path)
+    chunk_size = chunk_size or settings.CHAIN_BATCH_CHUNK_SIZE
+    report = {
+        'contract': artifact.get('contractName'),
+        'artifact': str(Path(artifact_path or settings.ABI_PATH)),
+        'deployment_gas': None,
+        'results': [],
+    }
+    for size in sizes:
+        bench = _Bench(artifact)
+        report['deployment_gas'] = bench.deployment_gas
+        for workload in WORKLOADS:
+            if workload not in workloads:
+                continue
+            started = time.perf_counter()
+            function, outcome = bench.run(workload, size, chunk_size)
+            elapsed = time.perf_counter() - started
+            if function is None:
+                continue
+            calls, gas = outcome
+            result = {
+                'contract': report['contract'],
+                'workload': workload,
+                'function': function,
+                'size': size,
+                'calls': calls,
+                'gas_total': gas,
+                'gas_per_item': round(gas / size, 1),
+                'wall_seconds': round(elapsed, 4),
+                'ms_per_item': round(elapsed * 1000 / size, 3),
+            }
+            report['results'].append(result)
+            if progress:
+                progress(result)
+    return report
+
+
+def compare_to_baseline(report, baseline, gas_tolerance=0.02, time_tolerance=None):
+    """
+    Regressions of `report` against a previous report: gas per item more than
+    `gas_tolerance` above the baseline (and wall time per item more than
+    `time_tolerance` above it, when given) for the same contract, workload and size.
+    Returns a list of human-readable regression messages.
+    """
+    previous = {(r['contract'], r['workload'], r['size']): r for r in baseline.get('results', [])}
+    regressions = []
+    for result in report['results']:
+        base = previous.get((result['contract'], result['workload'], result['size']))
+        if base is None:
+            continue
+        if result['gas_per_item'] > base['gas_per_item'] * (1 + gas_tolerance):
+            regressions.append(
+                f"{result['workload']}@{result['size']}: gas per item {result['gas_per_item']} "
+                f"vs baseline {base['gas_per_item']}"
+            )
+        if time_tolerance is not None and result['ms_per_item'] > base['ms_per_item'] * (1 + time_tolerance):
+            regressions.append(
+                f"{result['workload']}@{result['size']}: {result['ms_per_item']} ms per item "
+                f"vs baseline {base['ms_per_item']}"
+            )
+    base_deployment = baseline.get('deployment_gas')
+    if base_deployment and report['deployment_gas'] > base_deployment * (1 + gas_tolerance):
+        regressions.append(f"deployment: gas {report['deployment_gas']} vs baseline {base_deployment}")
+    return regressions
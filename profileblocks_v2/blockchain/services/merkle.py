@@ -0,0 +1,58 @@
+# blockchain/services/merkle.py
+
+from web3 import Web3
+
+
+def _to_bytes32(value):
+    # Accept 0x-prefixed hex strings or raw bytes for leaves and nodes
+    return Web3.to_bytes(hexstr=value) if isinstance(value, str) else bytes(value)
+
+
+def _hash_pair(a, b):
+    # Sorted-pair keccak256, matching OpenZeppelin's MerkleProof so proofs need no left/right flags
+    return Web3.keccak(a + b if a <= b else b + a)
+
+
+def build_merkle_tree(leaves):
+    """
+    Build a Merkle tree over bytes32 leaves (e.g. signed_hash_keccak values).
+    Returns the list of levels, leaves first and the root level last.
+    An unpaired node at the end of a level is promoted unchanged.
+    """
+    if not leaves:
+        raise ValueError("Cannot build a Merkle tree without leaves")
+    levels = [[_to_bytes32(leaf) for leaf in leaves]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [_hash_pair(level[i], level[i + 1]) for i in range(0, len(level) - 1, 2)]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def merkle_root(levels):
+    # Return the root of a tree from build_merkle_tree as 0x-prefixed hex
+    return Web3.to_hex(levels[-1][0])
+
+
+def merkle_proof(levels, index):
+    """
+    Return the inclusion proof for the leaf at `index` as a list of 0x-prefixed
+    sibling hashes, bottom-up.
+    """
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling < len(level):
+            proof.append(Web3.to_hex(level[sibling]))
+        index //= 2
+    return proof
+
+
+def verify_merkle_proof(leaf, proof, root):
+    # Recompute the root from a leaf and its proof and compare with the expected root
+    node = _to_bytes32(leaf)
+    for sibling in proof:
+        node = _hash_pair(node, _to_bytes32(sibling))
+    return node == _to_bytes32(root)
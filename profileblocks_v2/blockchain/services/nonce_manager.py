@@ -0,0 +1,104 @@
+# blockchain/services/nonce_manager.py
+
+import logging
+import threading
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from web3 import Web3
+from blockchain.models import SenderNonce
+
+logger = logging.getLogger(__name__)
+
+# In-process locks per sender address; the DB row serialises across processes
+_address_locks = {}
+_address_locks_guard = threading.Lock()
+
+
+def _address_lock(address):
+    with _address_locks_guard:
+        return _address_locks.setdefault(address, threading.Lock())
+
+
+def _pending_count(w3, address):
+    # Nonce the node expects next, counting transactions still in its mempool
+    return w3.eth.get_transaction_count(address, 'pending')
+
+
+def _lock_row(address):
+    # A no-op UPDATE takes the write lock (row lock, or SQLite's database lock) before we read
+    return SenderNonce.objects.filter(address=address).update(next_nonce=F('next_nonce'))
+
+
+def allocate_nonce(w3, address):
+    """
+    Hand out the next nonce for `address`, safe across threads and processes.
+    The counter is seeded (and re-seeded after NONCE_RESYNC_IDLE_SECONDS of
+    inactivity) from the node's pending transaction count.
+    """
+    address = Web3.to_checksum_address(address)
+    idle_before = timezone.now() - timedelta(seconds=settings.NONCE_RESYNC_IDLE_SECONDS)
+
+    with _address_lock(address), transaction.atomic():
+        if not _lock_row(address):
+            # First transaction from this address: seed from the node
+            try:
+                with transaction.atomic():
+                    SenderNonce.objects.create(address=address, next_nonce=_pending_count(w3, address))
+            except IntegrityError:
+                # Another process created the row first
+                _lock_row(address)
+
+        row = SenderNonce.objects.get(address=address)
+        nonce = row.next_nonce
+        # Resync a stale counter: other wallets may have used the address meanwhile
+        if row.updated_at < idle_before:
+            nonce = _pending_count(w3, address)
+
+        SenderNonce.objects.filter(address=address).update(next_nonce=nonce + 1, updated_at=timezone.now())
+        return nonce
+
+
+def resync_nonce(w3, address):
+    """
+    Reset the counter for `address` to the node's pending count.
+    Call after a send error: nonces allocated but never broadcast are re-used.
+    """
+    address = Web3.to_checksum_address(address)
+    with _address_lock(address), transaction.atomic():
+        pending = _pending_count(w3, address)
+        stored = SenderNonce.objects.filter(address=address).values_list('next_nonce', flat=True).first()
+        if stored is not None and stored != pending:
+            logger.warning("Resyncing nonce for %s: stored %s, node pending %s", address, stored, pending)
+        if not SenderNonce.objects.filter(address=address).update(next_nonce=pending, updated_at=timezone.now()):
+            SenderNonce.objects.get_or_create(address=address, defaults={'next_nonce': pending})
+        return pending
+
+
+def release_nonce(w3, address, nonce):
+    """
+    Give back a nonce whose transaction never reached the node.
+    If it was the most recent allocation the counter simply steps back;
+    otherwise it leaves a gap and the counter is resynced from the node.
+    """
+    address = Web3.to_checksum_address(address)
+    with _address_lock(address), transaction.atomic():
+        if SenderNonce.objects.filter(address=address, next_nonce=nonce + 1).update(next_nonce=nonce):
+            return
+    logger.warning("Nonce %s for %s left a gap, resyncing", nonce, address)
+    resync_nonce(w3, address)
+
+
+def detect_gap(w3, address):
+    """
+    Return (first_missing, next_allocated) if nonces were allocated that the
+    node has not seen, otherwise None. Only meaningful once senders are idle.
+    """
+    address = Web3.to_checksum_address(address)
+    stored = SenderNonce.objects.filter(address=address).values_list('next_nonce', flat=True).first()
+    pending = _pending_count(w3, address)
+    if stored is not None and stored > pending:
+        return pending, stored
+    return None
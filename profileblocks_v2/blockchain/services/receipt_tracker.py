@@ -0,0 +1,204 @@
+# blockchain/services/receipt_tracker.py
+
+import json
+import logging
+import os
+import threading
+import time
+from django.conf import settings
+from web3._utils.method_formatters import receipt_formatter
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted, TransactionNotFound
+
+logger = logging.getLogger(__name__)
+
+# Process-wide tracker: (pid, Web3 instance, ReceiptTracker)
+_tracker = None
+_tracker_lock = threading.Lock()
+
+
+class _Waiter:
+    # One caller waiting for any of several tx hashes (a transaction and its replacements)
+    def __init__(self, tx_hashes):
+        self.tx_hashes = tx_hashes
+        self.event = threading.Event()
+        self.receipt = None
+
+
+class ReceiptTracker:
+    """
+    Resolve receipts for every transaction in flight with one lookup per block
+    instead of one polling loop per waiting transaction.
+    A single background thread follows new blocks through an eth_subscribe
+    newHeads subscription when WEB3_WS_URL is set, or by polling eth_blockNumber
+    every RECEIPT_POLL_INTERVAL seconds otherwise (and while the websocket is
+    down). On each new block all pending hashes are looked up in one JSON-RPC
+    batch. The thread exits after RECEIPT_TRACKER_IDLE_SECONDS without waiters.
+    """
+    def __init__(self, w3):
+        self.w3 = w3
+        self._pending = {}  # tx hash (0x hex, lower case) -> set of waiters
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_activity = time.monotonic()
+        self._ws_retry_at = 0.0
+        self._new_waiters = False  # Look up newly added hashes without waiting for the next block
+
+    def wait(self, tx_hashes, timeout):
+        """
+        Block until any of `tx_hashes` is mined and return its receipt.
+        Raises TimeExhausted after `timeout` seconds.
+        """
+        waiter = _Waiter([_normalize(tx_hash) for tx_hash in tx_hashes])
+        with self._lock:
+            for tx_hash in waiter.tx_hashes:
+                self._pending.setdefault(tx_hash, set()).add(waiter)
+            self._last_activity = time.monotonic()
+            self._new_waiters = True
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='receipt-tracker', daemon=True)
+                self._thread.start()
+        try:
+            if not waiter.event.wait(timeout):
+                raise TimeExhausted(f"No receipt for {', '.join(waiter.tx_hashes)} after {timeout} seconds")
+            return waiter.receipt
+        finally:
+            with self._lock:
+                for tx_hash in waiter.tx_hashes:
+                    waiters = self._pending.get(tx_hash)
+                    if waiters is not None:
+                        waiters.discard(waiter)
+                        if not waiters:
+                            del self._pending[tx_hash]
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _idle(self):
+        # Called with the lock held: nothing to track for a whole idle period
+        if self._pending:
+            self._last_activity = time.monotonic()
+            return False
+        return time.monotonic() - self._last_activity >= settings.RECEIPT_TRACKER_IDLE_SECONDS
+
+    def _take_new_waiters(self):
+        with self._lock:
+            new_waiters, self._new_waiters = self._new_waiters, False
+            return new_waiters
+
+    def _should_stop(self):
+        # Clear the thread slot under the lock so a new waiter always starts a fresh thread
+        with self._lock:
+            if self._idle():
+                self._thread = None
+                return True
+            return False
+
+    def _run(self):
+        last_block = None
+        while not self._should_stop():
+            if settings.WEB3_WS_URL and time.monotonic() >= self._ws_retry_at:
+                try:
+                    self._follow_new_heads()
+                    return  # Only returns once the tracker went idle and released its thread slot
+                except Exception as e:
+                    # Subscriptions unavailable: poll for a while, then try the websocket again
+                    logger.warning("newHeads subscription failed (%s), polling instead", e)
+                    self._ws_retry_at = time.monotonic() + 60
+            try:
+                block = self.w3.eth.block_number
+                if self._take_new_waiters() or block != last_block:
+                    last_block = block
+                    self._resolve()
+            except Exception as e:
+                logger.warning("Receipt polling failed: %s", e)
+            time.sleep(settings.RECEIPT_POLL_INTERVAL)
+
+    def _follow_new_heads(self):
+        # Resolve pending receipts on every newHeads notification until the tracker stops
+        from websockets.sync.client import connect
+
+        with connect(settings.WEB3_WS_URL, open_timeout=settings.WEB3_REQUEST_TIMEOUT) as ws:
+            ws.send(json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': 'eth_subscribe', 'params': ['newHeads']}))
+            reply = json.loads(ws.recv(timeout=settings.WEB3_REQUEST_TIMEOUT))
+            if 'error' in reply:
+                raise ConnectionError(reply['error'])
+            logger.info("Tracking receipts through newHeads subscription %s", reply.get('result'))
+            self._resolve()  # Catch anything mined before the subscription started
+            while True:
+                try:
+                    message = json.loads(ws.recv(timeout=settings.RECEIPT_POLL_INTERVAL))
+                except TimeoutError:
+                    if self._should_stop():
+                        return
+                    if self._take_new_waiters():
+                        self._resolve()
+                    continue
+                if message.get('method') == 'eth_subscription':
+                    self._resolve()
+
+    def _resolve(self):
+        # Look up every pending hash once and wake the waiters of those that were mined
+        with self._lock:
+            tx_hashes = list(self._pending)
+        if not tx_hashes:
+            return
+        receipts = self._lookup(tx_hashes)
+        with self._lock:
+            for tx_hash, receipt in receipts.items():
+                for waiter in self._pending.get(tx_hash, ()):
+                    if waiter.receipt is None:
+                        waiter.receipt = receipt
+                        waiter.event.set()
+
+    def _lookup(self, tx_hashes):
+        """
+        Receipts of the mined hashes, fetched in raw JSON-RPC batches and formatted
+        as w3.eth.get_transaction_receipt would. Providers that cannot batch get
+        one request per hash.
+        """
+        receipts = {}
+        make_batch_request = getattr(self.w3.provider, 'make_batch_request', None)
+        if make_batch_request is None:
+            for tx_hash in tx_hashes:
+                try:
+                    receipts[tx_hash] = self.w3.eth.get_transaction_receipt(tx_hash)
+                except TransactionNotFound:
+                    continue
+            return receipts
+        chunk_size = settings.CHAIN_BATCH_CHUNK_SIZE
+        for start in range(0, len(tx_hashes), chunk_size):
+            chunk = tx_hashes[start:start + chunk_size]
+            responses = make_batch_request([('eth_getTransactionReceipt', [tx_hash]) for tx_hash in chunk])
+            if not isinstance(responses, list):
+                raise ConnectionError(f"Batch receipt lookup failed: {responses.get('error')}")
+            for tx_hash, response in zip(chunk, responses):
+                if response.get('result'):
+                    receipts[tx_hash] = AttributeDict.recursive(receipt_formatter(response['result']))
+        return receipts
+
+
+def _normalize(tx_hash):
+    return (tx_hash if isinstance(tx_hash, str) else tx_hash.to_0x_hex()).lower()
+
+
+def get_receipt_tracker(w3):
+    # Return the process-wide tracker for `w3`, rebuilt after a fork or for a different client
+    global _tracker
+    tracker = _tracker
+    if tracker is None or tracker[0] != os.getpid() or tracker[1] is not w3:
+        with _tracker_lock:
+            tracker = _tracker
+            if tracker is None or tracker[0] != os.getpid() or tracker[1] is not w3:
+                tracker = (os.getpid(), w3, ReceiptTracker(w3))
+                _tracker = tracker
+    return tracker[2]
+
+
+def wait_for_receipt(w3, tx_hashes, timeout):
+    """
+    Wait until any of `tx_hashes` (a transaction and its same-nonce
+    replacements) is mined and return its receipt, through the shared tracker.
+    """
+    return get_receipt_tracker(w3).wait(tx_hashes, timeout)
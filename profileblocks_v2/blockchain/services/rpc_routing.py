@@ -0,0 +1,224 @@
+# blockchain/services/rpc_routing.py
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from web3 import Web3
+from web3.providers.base import JSONBaseProvider
+
+logger = logging.getLogger(__name__)
+
+# Calls that must reach the node holding our nonce sequence: the pending nonce count,
+# the raw transactions themselves, and lookups of transactions it has only just seen
+STICKY_METHODS = {
+    'eth_sendRawTransaction', 'eth_sendTransaction', 'eth_getTransactionCount',
+    'eth_getTransactionByHash', 'eth_getTransactionReceipt',
+}
+# Read calls worth duplicating on a second endpoint when the first is slow
+HEDGED_METHODS = {'eth_call'}
+
+
+class EndpointHealth:
+    """
+    Rolling latency / error window and circuit breaker state for one RPC URL.
+    The breaker opens after `failure_threshold` consecutive failures; after
+    `cooldown` seconds one trial request is let through (half-open) and its
+    outcome closes or re-opens it.
+    """
+    def __init__(self, url, window, failure_threshold, cooldown):
+        self.url = url
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True for success
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def percentile(self, fraction):
+        with self.lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    @property
+    def error_rate(self):
+        with self.lock:
+            return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self.opened_at >= self.cooldown else 'open'
+
+    def available(self):
+        # Closed endpoints always; an open one only for a single trial after its cooldown
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            return time.monotonic() - self.opened_at >= self.cooldown and not self.trial_in_flight
+
+    def begin(self):
+        # Mark the trial request of a half-open endpoint as in flight
+        with self.lock:
+            if self.opened_at is not None:
+                self.trial_in_flight = True
+
+    def score(self):
+        # Lower is better: typical latency, heavily penalised by recent errors
+        return self.percentile(0.5) * (1 + 10 * self.error_rate)
+
+    def record_success(self, latency):
+        with self.lock:
+            self.latencies.append(latency)
+            self.outcomes.append(True)
+            self.consecutive_failures = 0
+            if self.opened_at is not None:
+                logger.info("RPC endpoint %s recovered, closing circuit", self.url)
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.outcomes.append(False)
+            self.consecutive_failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning("RPC endpoint %s failed %s times in a row, opening circuit",
+                                   self.url, self.consecutive_failures)
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        return {
+            'url': self.url,
+            'requests': len(self.outcomes),
+            'p50_ms': round(self.percentile(0.5) * 1000, 1),
+            'p99_ms': round(self.percentile(0.99) * 1000, 1),
+            'error_rate': round(self.error_rate, 3),
+            'state': self.state,
+        }
+
+
+class RoutingProvider(JSONBaseProvider):
+    """
+    Web3 provider spreading requests over several HTTP RPC endpoints.
+    Reads go to the healthiest endpoint (lowest p50 weighted by error rate) and
+    fail over to the next one; slow eth_calls are hedged on a second endpoint;
+    failing endpoints are skipped by a circuit breaker. Writes and nonce reads
+    stay pinned to one endpoint until it fails, so a nonce sequence is never
+    split across nodes with different mempools.
+    """
+    def __init__(self, urls, request_timeout=30, session_factory=None, window=200,
+                 failure_threshold=5, cooldown=30.0, hedge_after=None, hedge_min=0.05):
+        super().__init__()
+        if not urls:
+            raise ValueError("RoutingProvider needs at least one RPC URL")
+        self.endpoints = []
+        for url in urls:
+            provider = Web3.HTTPProvider(
+                url,
+                request_kwargs={'timeout': request_timeout},
+                session=session_factory() if session_factory else None,
+                exception_retry_configuration=None,  # Failover replaces same-node retries
+            )
+            self.endpoints.append((EndpointHealth(url, window, failure_threshold, cooldown), provider))
+        self.hedge_after = hedge_after  # Fixed hedge delay in seconds, or None to use the primary's p99
+        self.hedge_min = hedge_min
+        self._pinned = None
+        self._pin_lock = threading.Lock()
+        self._hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix='rpc-hedge')
+
+    def __str__(self):
+        return f"RPC routing over {', '.join(health.url for health, _ in self.endpoints)}"
+
+    def ranked(self):
+        # Available endpoints, healthiest first; if every circuit is open, try them all anyway
+        candidates = [(health, provider) for health, provider in self.endpoints if health.available()]
+        return sorted(candidates or self.endpoints, key=lambda endpoint: endpoint[0].score())
+
+    def _call(self, endpoint, send):
+        health, provider = endpoint
+        health.begin()
+        started = time.monotonic()
+        try:
+            response = send(provider)
+        except Exception:
+            health.record_failure()
+            raise
+        health.record_success(time.monotonic() - started)
+        return response
+
+    def _failover(self, endpoints, send):
+        # Try endpoints in order until one answers; JSON-RPC error responses count as answers
+        error = None
+        for endpoint in endpoints:
+            try:
+                return self._call(endpoint, send)
+            except Exception as e:
+                error = e
+                logger.warning("RPC endpoint %s failed (%s), failing over", endpoint[0].url, e)
+        raise error
+
+    def _pinned_endpoint(self):
+        with self._pin_lock:
+            if self._pinned is None or self._pinned[0].state != 'closed':
+                previous = self._pinned
+                self._pinned = self.ranked()[0]
+                if previous is not None and previous is not self._pinned:
+                    logger.warning("Write endpoint %s unhealthy, pinning writes to %s",
+                                   previous[0].url, self._pinned[0].url)
+            return self._pinned
+
+    def _hedged(self, endpoints, send):
+        # Fire at the best endpoint; if it has not answered within the hedge delay, also at the next
+        primary, secondary = endpoints[0], endpoints[1]
+        delay = self.hedge_after if self.hedge_after is not None else max(
+            primary[0].percentile(0.99), self.hedge_min
+        )
+        first = self._hedge_pool.submit(self._call, primary, send)
+        done, _ = wait([first], timeout=delay)
+        if done and not first.exception():
+            return first.result()
+        futures = {first, self._hedge_pool.submit(self._call, secondary, send)}
+        while futures:
+            done, futures = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                if not future.exception():
+                    return future.result()
+        # Both failed: fall back to the remaining endpoints
+        return self._failover(endpoints[2:] or endpoints, send)
+
+    def make_request(self, method, params):
+        send = lambda provider: provider.make_request(method, params)  # noqa: E731
+        if method in STICKY_METHODS:
+            pinned = self._pinned_endpoint()
+            if method == 'eth_getTransactionCount' or method.startswith('eth_send'):
+                return self._call(pinned, send)
+            # Lookups prefer the pinned node but may fall back to others
+            return self._failover([pinned] + [e for e in self.ranked() if e is not pinned], send)
+        endpoints = self.ranked()
+        if method in HEDGED_METHODS and len(endpoints) > 1:
+            return self._hedged(endpoints, send)
+        return self._failover(endpoints, send)
+
+    def make_batch_request(self, batch_requests):
+        return self._failover(self.ranked(), lambda provider: provider.make_batch_request(batch_requests))
+
+    def probe(self, count=20):
+        # Send `count` eth_blockNumber calls to every endpoint to refresh its health window
+        for endpoint in self.endpoints:
+            for _ in range(count):
+                try:
+                    self._call(endpoint, lambda provider: provider.make_request('eth_blockNumber', []))
+                except Exception:
+                    pass
+
+    def endpoint_stats(self):
+        # Per-endpoint rolling latency, error rate and breaker state
+        return [health.snapshot() for health, _ in self.endpoints]
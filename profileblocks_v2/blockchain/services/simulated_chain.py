@@ -0,0 +1,190 @@
+# blockchain/services/simulated_chain.py
+
+import logging
+import random
+import threading
+import time
+import rlp
+from django.conf import settings
+from eth_account import Account
+from eth_utils import big_endian_to_int, keccak
+from web3 import Web3
+from web3.providers.eth_tester import EthereumTesterProvider
+from web3.providers.eth_tester.middleware import result_formatters
+
+logger = logging.getLogger(__name__)
+
+# Ether sent to the simulated owner account so it can pay for gas
+OWNER_FUNDING_WEI = Web3.to_wei(1000, 'ether')
+
+
+def _decode_fees(raw_transaction):
+    # (nonce, max fee, priority fee) of a signed transaction; legacy ones pay gasPrice for both
+    if raw_transaction[0] == 0x02:
+        fields = rlp.decode(raw_transaction[1:])  # chainId, nonce, maxPriorityFeePerGas, maxFeePerGas, ...
+        return big_endian_to_int(fields[1]), big_endian_to_int(fields[3]), big_endian_to_int(fields[2])
+    if raw_transaction[0] <= 0x7f:
+        fields = rlp.decode(raw_transaction[1:])[1:]  # Drop chainId of other typed transactions
+    else:
+        fields = rlp.decode(raw_transaction)
+    gas_price = big_endian_to_int(fields[1])
+    return big_endian_to_int(fields[0]), gas_price, gas_price
+
+
+class SimulatedChainProvider(EthereumTesterProvider):
+    """
+    In-memory EVM (eth-tester / py-evm) that behaves like a remote node:
+    every request waits `latency` seconds (plus up to `jitter`), a `failure_rate`
+    fraction of requests fail with ConnectionError, and with a `block_time`
+    raw transactions sit in a mempool until the next block instead of being
+    mined on arrival. Requests are serialised, since eth-tester is not thread-safe.
+    """
+    def __init__(self, block_time=0.0, latency=0.0, jitter=0.0, failure_rate=0.0, seed=None):
+        super().__init__()
+        self.block_time = block_time
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.running = False  # Faults and the mempool only apply once start() is called
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._mempool = {}  # (sender, nonce) -> raw transaction; a same-nonce send replaces it
+
+    def __str__(self):
+        return f"Simulated chain (block time {self.block_time}s, latency {self.latency * 1000:.0f}ms)"
+
+    def start(self):
+        # Begin behaving like a remote node (called after the contract is deployed)
+        self.running = True
+        if self.block_time:
+            threading.Thread(target=self._mine_blocks, name='simulated-chain', daemon=True).start()
+
+    def _round_trip(self, label):
+        # Injected network latency and failures
+        if not self.running:
+            return
+        delay = self.latency + self._random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        if self._random.random() < self.failure_rate:
+            raise ConnectionError(f"Simulated RPC failure on {label}")
+
+    def _handle(self, method, params):
+        with self._lock:
+            if self.running and self.block_time:
+                if method == 'eth_sendRawTransaction':
+                    return self._queue(params[0])
+                if method == 'eth_getTransactionCount' and params[1] == 'pending':
+                    return {'jsonrpc': '2.0', 'id': 0, 'result': hex(self._pending_count(params[0]))}
+            return super().make_request(method, params)
+
+    def make_request(self, method, params):
+        self._round_trip(method)
+        return self._handle(method, params)
+
+    def make_batch_request(self, requests):
+        # eth-tester has no batch endpoint: answer each request in turn within one simulated round trip.
+        # Results are converted to a node's JSON-RPC shape (camelCase keys), as the tester middleware
+        # does for single requests, so callers can format them like any node's batch response.
+        self._round_trip('batch request')
+        responses = []
+        for method, params in requests:
+            response = self._handle(method, params)
+            if 'result' in response and method in result_formatters:
+                response = dict(response, result=result_formatters[method](response['result']))
+            responses.append(response)
+        return responses
+
+    def _mined_count(self, sender):
+        return self.ethereum_tester.get_nonce(Web3.to_checksum_address(sender))
+
+    def _pending_count(self, sender):
+        # Mined nonce count plus the consecutive nonces waiting in the mempool
+        sender = Web3.to_checksum_address(sender)
+        nonce = self._mined_count(sender)
+        while (sender, nonce) in self._mempool:
+            nonce += 1
+        return nonce
+
+    def _queue(self, raw_hex):
+        raw_transaction = Web3.to_bytes(hexstr=raw_hex)
+        sender = Account.recover_transaction(raw_transaction)
+        nonce, max_fee, priority_fee = _decode_fees(raw_transaction)
+        if nonce < self._mined_count(sender):
+            return self._error('nonce too low')
+        queued = self._mempool.get((sender, nonce))
+        if queued is not None:
+            # Like geth, a same-nonce transaction only replaces one paying at least 10% more
+            _, queued_max_fee, queued_priority_fee = _decode_fees(queued)
+            if max_fee * 10 < queued_max_fee * 11 or priority_fee * 10 < queued_priority_fee * 11:
+                return self._error('replacement transaction underpriced')
+        self._mempool[(sender, nonce)] = raw_transaction
+        return {'jsonrpc': '2.0', 'id': 0, 'result': Web3.to_hex(keccak(raw_transaction))}
+
+    def _error(self, message):
+        return {'jsonrpc': '2.0', 'id': 0, 'error': {'code': -32000, 'message': message}}
+
+    def _mine_blocks(self):
+        # Every block_time seconds, mine each sender's queued transactions in nonce order
+        while True:
+            time.sleep(self.block_time)
+            with self._lock:
+                for sender in {sender for sender, _ in self._mempool}:
+                    nonce = self._mined_count(sender)
+                    while (sender, nonce) in self._mempool:
+                        raw_transaction = self._mempool.pop((sender, nonce))
+                        try:
+                            self.ethereum_tester.send_raw_transaction(Web3.to_hex(raw_transaction))
+                        except Exception as e:
+                            # Invalid (e.g. unaffordable) transactions are dropped, as a node would
+                            logger.warning("Simulated chain dropped nonce %s from %s: %s", nonce, sender, e)
+                            break
+                        nonce += 1
+                # Replaced or stale versions of already mined nonces can never be included
+                for sender, nonce in list(self._mempool):
+                    if nonce < self._mined_count(sender):
+                        del self._mempool[(sender, nonce)]
+
+
+def build_simulated_chain():
+    """
+    Start an in-process chain and deploy the CertificateRegistry artifact to it.
+    Each process gets its own chain and its own freshly created, funded owner
+    account, which deploys the contract and is authorized. The owner stays with
+    the returned client instead of being written to settings or the environment,
+    and because its address is new, its nonce counter (a SenderNonce row) is
+    never shared with another process's chain.
+    Returns (Web3 instance, contract address, owner account).
+    """
+    provider = SimulatedChainProvider(
+        block_time=settings.CHAIN_SIM_BLOCK_TIME,
+        latency=settings.CHAIN_SIM_LATENCY_MS / 1000,
+        jitter=settings.CHAIN_SIM_JITTER_MS / 1000,
+        failure_rate=settings.CHAIN_SIM_FAILURE_RATE,
+        seed=settings.CHAIN_SIM_SEED,
+    )
+    w3 = Web3(provider)
+    tester = provider.ethereum_tester
+    owner = Account.create()
+    tester.send_transaction({'from': tester.get_accounts()[0], 'to': owner.address,
+                             'value': OWNER_FUNDING_WEI, 'gas': 21000})
+
+    # Deploy and authorize synchronously, before block time and faults apply
+    registry = w3.eth.contract(abi=settings.ARTIFACT['abi'], bytecode=settings.ARTIFACT['bytecode'])
+    receipt = _send(w3, registry.constructor(), owner)
+    contract = w3.eth.contract(address=receipt.contractAddress, abi=settings.CONTRACT_ABI)
+    _send(w3, contract.functions.authorizeInstitution(owner.address), owner)
+    provider.start()
+
+    logger.info("Simulated chain ready: CertificateRegistry at %s, owner %s", contract.address, owner.address)
+    return w3, contract.address, owner
+
+
+def _send(w3, contract_function, account):
+    # Sign and send a setup transaction, returning its receipt
+    txn = contract_function.build_transaction({
+        'from': account.address,
+        'nonce': w3.eth.get_transaction_count(account.address),
+    })
+    signed = account.sign_transaction(txn)
+    return w3.eth.wait_for_transaction_receipt(w3.eth.send_raw_transaction(signed.raw_transaction))
@@ -0,0 +1,107 @@
+# blockchain/services/tx_journal.py
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timezone as dt_timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+from django.conf import settings
+
+# Append-only transaction journal: one JSON object per line in a single file.
+# Callers only put records on an in-memory queue; a background listener thread
+# does the file I/O, so sending a transaction never waits on the disk. Every
+# process (web workers, anchor_worker, ...) appends to the same file, so no
+# process rotates it: rotate it externally (e.g. logrotate) and each process
+# reopens the file once it has been moved away.
+_journal_logger = logging.getLogger('blockchain.tx_journal')
+_journal_logger.setLevel(logging.INFO)
+_journal_logger.propagate = False
+
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+class JsonLineFormatter(logging.Formatter):
+    # Journal records carry a dict as their message; write it as one JSON line
+    def format(self, record):
+        return json.dumps(record.msg, default=str, separators=(',', ':'))
+
+
+def _start_listener():
+    global _listener, _listener_pid
+    path = settings.TX_JOURNAL_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Appends are one line per write, so records from concurrent processes do not interleave
+    file_handler = WatchedFileHandler(path)
+
+    # QueueHandler formats before enqueueing, so the JSON encoding happens there
+    records = queue.SimpleQueue()
+    queue_handler = QueueHandler(records)
+    queue_handler.setFormatter(JsonLineFormatter())
+    _journal_logger.handlers = [queue_handler]
+    _listener = QueueListener(records, file_handler)
+    _listener.start()
+    _listener_pid = os.getpid()
+
+
+def _ensure_listener():
+    # Start lazily, and again in a forked child, whose copy of the listener thread is gone
+    if _listener is None or _listener_pid != os.getpid():
+        with _listener_lock:
+            if _listener is None or _listener_pid != os.getpid():
+                _start_listener()
+
+
+def stop_journal():
+    """
+    Flush queued records to disk and stop the listener thread.
+    Runs at interpreter exit; the next record starts a new listener.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None and _listener_pid == os.getpid():
+            _listener.stop()
+            for handler in _listener.handlers:
+                handler.close()
+        _listener = None
+
+
+atexit.register(stop_journal)
+
+
+def journal(event, **fields):
+    """
+    Append one transaction event ('sent', 'replaced', 'mined', 'timeout', ...)
+    to the journal. Fields are the event's details: tx hash, nonce, fees,
+    receipt status, latency and so on. A blank TX_JOURNAL_PATH disables the journal.
+    """
+    if not settings.TX_JOURNAL_PATH:
+        return
+    _ensure_listener()
+    _journal_logger.info({
+        'ts': datetime.now(dt_timezone.utc).isoformat(timespec='milliseconds'),
+        'event': event,
+        **fields,
+    })
+
+
+def journal_files():
+    # Journal files oldest first: the rotated backups (path.N ... path.1, logrotate's naming), then the live file
+    path = settings.TX_JOURNAL_PATH
+    backups = [f"{path}.{n}" for n in range(settings.TX_JOURNAL_BACKUP_COUNT, 0, -1)]
+    return [p for p in backups + [path] if os.path.exists(p)]
+
+
+def read_journal(paths=None):
+    # Yield journal records in write order, skipping any partially written line
+    for path in paths or journal_files():
+        with open(path) as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
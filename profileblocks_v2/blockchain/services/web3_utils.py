@@ -1,10 +1,10 @@
 # blockchain/services/web3_utils.py
-from web3 import Web3
 from django.conf import settings
+from blockchain.services.contract_service import get_w3
 
 def get_web3_instance():
-    # Initialize and return a Web3 instance connected to the configured HTTP provider
-    return Web3(Web3.HTTPProvider(settings.WEB3_PROVIDER_URL))
+    # Return the pooled process-wide Web3 instance
+    return get_w3()
 
 def get_chain_id():
     # Return the expected chain ID from Django settings
@@ -1,3 +1,635 @@
-from django.test import TestCase
+# blockchain/tests.py
 
-# Create your tests here.
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock, skipUnless
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+from django.db import connection
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from hexbytes import HexBytes
+from web3 import Web3
+from web3.exceptions import TimeExhausted
+from blockchain.models import AnchoredHash, SenderNonce, SyncCheckpoint
+from blockchain.services import contract_service, event_indexer, fees, gas_benchmark, tx_journal
+from blockchain.services.contract_service import send_contract_transaction
+from blockchain.services.merkle import build_merkle_tree, merkle_proof, merkle_root, verify_merkle_proof
+from blockchain.services.nonce_manager import allocate_nonce, detect_gap, release_nonce
+from blockchain.services.receipt_tracker import ReceiptTracker
+from blockchain.services.rpc_routing import RoutingProvider
+from blockchain.services.simulated_chain import SimulatedChainProvider
+
+SENDER = '0x709D6b9e4496a70fF26541853be50bd7375D4Fb5'
+
+
+class LocalChain:
+    """
+    Minimal stand-in for a node's mempool: accepts each nonce once per sender
+    and reports the pending count as the length of the gap-free nonce prefix.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.accepted = {}
+        self.reject_next = 0
+
+    def get_transaction_count(self, address, block_identifier='latest'):
+        with self.lock:
+            nonces = self.accepted.get(address, set())
+            count = 0
+            while count in nonces:
+                count += 1
+            return count
+
+    def send_raw_transaction(self, raw):
+        sender, nonce = raw
+        with self.lock:
+            if self.reject_next:
+                self.reject_next -= 1
+                raise ConnectionError("node unavailable")
+            nonces = self.accepted.setdefault(sender, set())
+            if nonce in nonces:
+                raise ValueError("nonce too low")
+            nonces.add(nonce)
+            return HexBytes(nonce.to_bytes(32, 'big'))
+
+
+class LocalWeb3:
+    # Exposes just the w3.eth surface used by send_contract_transaction and the fee oracle
+    def __init__(self, chain):
+        self.eth = self
+        self.account = self
+        self.gas_price = 1
+        self.max_priority_fee = 1
+        self.chain = chain
+        self.get_transaction_count = chain.get_transaction_count
+        self.send_raw_transaction = chain.send_raw_transaction
+
+    def get_block(self, block_identifier):
+        return {'baseFeePerGas': 1}
+
+    def sign_transaction(self, txn, private_key=None):
+        class Signed:
+            raw_transaction = (txn['from'], txn['nonce'])
+        return Signed
+
+
+class ContractCall:
+    fn_name = 'addSignedHash'
+    args = ()
+
+    def estimate_gas(self, params):
+        return 50000
+
+    def build_transaction(self, params):
+        return dict(params)
+
+
+@override_settings(TX_JOURNAL_PATH='')
+class NonceManagerTest(TransactionTestCase):
+    def setUp(self):
+        self.chain = LocalChain()
+        self.w3 = LocalWeb3(self.chain)
+
+    def _send(self):
+        try:
+            return send_contract_transaction(self.w3, ContractCall(), SENDER, '0x' + '11' * 32)[1]['nonce']
+        finally:
+            connection.close()
+
+    def test_concurrent_issuers_get_unique_nonces(self):
+        """N concurrent issuers all land without reusing or skipping a nonce"""
+        issuers, per_issuer = 16, 8
+        with ThreadPoolExecutor(max_workers=issuers) as pool:
+            sent = list(pool.map(lambda _: self._send(), range(issuers * per_issuer)))
+        self.assertEqual(sorted(sent), list(range(issuers * per_issuer)))
+        self.assertEqual(self.chain.get_transaction_count(SENDER, 'pending'), issuers * per_issuer)
+        self.assertIsNone(detect_gap(self.w3, SENDER))
+
+    def test_failed_send_resyncs_and_fills_gap(self):
+        """A send error resyncs from the pending count so the lost nonce is reused"""
+        self.assertEqual(self._send(), 0)
+        lost = allocate_nonce(self.w3, SENDER)
+        self.assertEqual(allocate_nonce(self.w3, SENDER), lost + 1)
+        self.assertEqual(detect_gap(self.w3, SENDER), (lost, lost + 2))
+
+        self.chain.reject_next = 1
+        with self.assertRaises(ConnectionError):
+            self._send()
+        self.assertEqual(self._send(), lost)
+        self.assertEqual(self._send(), lost + 1)
+        self.assertIsNone(detect_gap(self.w3, SENDER))
+
+    def test_release_most_recent_nonce(self):
+        """Releasing the latest allocation steps the counter back"""
+        nonce = allocate_nonce(self.w3, SENDER)
+        release_nonce(self.w3, SENDER, nonce)
+        self.assertEqual(allocate_nonce(self.w3, SENDER), nonce)
+
+
+class StandInNode:
+    """
+    Local HTTP JSON-RPC stand-in for an Ethereum node. Answers every call with
+    its own name, after `delay` seconds; with `fail` set it returns HTTP 500.
+    Records the methods it received.
+    """
+    def __init__(self, name, delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.fail = False
+        self.methods = []
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                request = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                node.methods.append(request['method'])
+                time.sleep(node.delay)
+                if node.fail:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                body = json.dumps({'jsonrpc': '2.0', 'id': request['id'], 'result': node.name}).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class RoutingProviderTest(SimpleTestCase):
+    def setUp(self):
+        self.fast = StandInNode('fast', delay=0.01)
+        self.slow = StandInNode('slow', delay=0.2)
+        self.addCleanup(self.fast.stop)
+        self.addCleanup(self.slow.stop)
+
+    def _provider(self, **kwargs):
+        return RoutingProvider([self.slow.url, self.fast.url], request_timeout=5, **kwargs)
+
+    def test_reads_route_to_lowest_latency(self):
+        """After warm-up, reads go to the endpoint with the lower p50"""
+        provider = self._provider()
+        provider.probe(3)
+        results = [provider.make_request('eth_blockNumber', [])['result'] for _ in range(10)]
+        self.assertEqual(set(results), {'fast'})
+        stats = {s['url']: s for s in provider.endpoint_stats()}
+        self.assertLess(stats[self.fast.url]['p50_ms'], stats[self.slow.url]['p99_ms'])
+
+    def test_slow_eth_call_is_hedged(self):
+        """An eth_call stuck on the primary is answered by the hedge to the second endpoint"""
+        provider = self._provider(hedge_after=0.02)
+        provider.probe(3)
+        self.fast.delay = 1.0  # The preferred endpoint degrades
+        started = time.monotonic()
+        self.assertEqual(provider.make_request('eth_call', [{}, 'latest'])['result'], 'slow')
+        self.assertLess(time.monotonic() - started, 0.9)
+
+    def test_circuit_opens_on_failing_endpoint(self):
+        """A failing endpoint is failed over, then skipped once its breaker opens"""
+        provider = self._provider(failure_threshold=2, cooldown=60)
+        provider.probe(3)
+        self.fast.fail = True
+        for _ in range(5):
+            self.assertEqual(provider.make_request('eth_blockNumber', [])['result'], 'slow')
+        self.assertEqual(self.fast.methods.count('eth_blockNumber'), 3 + 2)
+        states = {s['url']: s['state'] for s in provider.endpoint_stats()}
+        self.assertEqual(states[self.fast.url], 'open')
+
+    def test_writes_stay_pinned(self):
+        """Nonce reads and raw transactions keep going to one endpoint while reads move"""
+        provider = self._provider()
+        pinned = provider.make_request('eth_getTransactionCount', ['0x0', 'pending'])['result']
+        provider.probe(3)
+        for _ in range(5):
+            self.assertEqual(provider.make_request('eth_sendRawTransaction', ['0x00'])['result'], pinned)
+            self.assertEqual(provider.make_request('eth_getTransactionCount', ['0x0', 'pending'])['result'], pinned)
+
+
+@override_settings(
+    CHAIN_BACKEND='simulated', CHAIN_SIM_BLOCK_TIME=0, CHAIN_SIM_LATENCY_MS=0, CHAIN_SIM_JITTER_MS=0,
+    CHAIN_SIM_FAILURE_RATE=0, CHAIN_SIM_SEED=1, CONTRACT_OWNER_ADDRESS=None, CONTRACT_OWNER_PRIVATE_KEY=None,
+    TX_JOURNAL_PATH='', RECEIPT_POLL_INTERVAL=0.05,
+)
+class SimulatedChainTest(TransactionTestCase):
+    def setUp(self):
+        contract_service.reset_client()
+        self.addCleanup(contract_service.reset_client)
+
+    def test_contract_calls_behave_as_on_a_node(self):
+        """Authorization, anchoring and verification run unchanged against the in-process chain"""
+        institution = Web3().eth.account.create()
+        self.assertEqual(contract_service.authorize_institution_on_chain(institution.address).status, 1)
+        signed_hash = Web3.keccak(text='certificate').hex()
+        receipt = contract_service.add_signed_hash_to_chain('ab' * 32, institution.address, signed_hash)
+        self.assertEqual(receipt.status, 1)
+        self.assertTrue(contract_service.verify_signed_hash_on_chain(signed_hash))
+        self.assertFalse(contract_service.verify_signed_hash_on_chain('11' * 32))
+        self.assertEqual(
+            contract_service.verify_signed_hashes_on_chain([signed_hash, '11' * 32]),
+            {signed_hash: True, '11' * 32: False},
+        )
+
+    def test_owner_account_stays_with_the_client(self):
+        """Each simulated chain has its own owner; settings, the environment and other nonce rows are untouched"""
+        SenderNonce.objects.create(address=SENDER, next_nonce=7)
+        with mock.patch.dict(os.environ, {'CONTRACT_OWNER_ADDRESS': SENDER}):
+            contract_service.authorize_institution_on_chain(Web3().eth.account.create().address)
+            first_owner, _ = contract_service.contract_owner()
+            self.assertEqual(os.environ['CONTRACT_OWNER_ADDRESS'], SENDER)
+        self.assertIsNone(settings.CONTRACT_OWNER_ADDRESS)
+        self.assertEqual(SenderNonce.objects.get(address=SENDER).next_nonce, 7)
+        self.assertEqual(SenderNonce.objects.get(address=first_owner).next_nonce, 3)  # After deploy and setup authorization
+
+        # A rebuilt client (e.g. in a forked worker) gets a new chain and owner, so nonces never mix
+        contract_service.reset_client()
+        second_owner, _ = contract_service.contract_owner()
+        self.assertNotEqual(second_owner, first_owner)
+        self.assertEqual(contract_service.authorize_institution_on_chain(SENDER).status, 1)
+
+    def test_block_time_holds_transactions_in_mempool(self):
+        """With a block time, sends are pending until the next block and same-nonce sends need a fee bump"""
+        provider = SimulatedChainProvider(block_time=0.2)
+        provider.start()
+        w3 = Web3(provider)
+        sender, key = w3.eth.accounts[0], provider.ethereum_tester.backend.account_keys[0]
+        txn = {'to': w3.eth.accounts[1], 'value': 1, 'gas': 21000, 'nonce': 0, 'chainId': w3.eth.chain_id,
+               'maxFeePerGas': 10 ** 10, 'maxPriorityFeePerGas': 10 ** 9}
+        tx_hash = w3.eth.send_raw_transaction(w3.eth.account.sign_transaction(txn, key).raw_transaction)
+        self.assertEqual(w3.eth.get_transaction_count(sender, 'pending'), 1)
+        self.assertEqual(w3.eth.get_transaction_count(sender), 0)
+        with self.assertRaisesMessage(Exception, 'underpriced'):
+            w3.eth.send_raw_transaction(w3.eth.account.sign_transaction({**txn, 'value': 2}, key).raw_transaction)
+        self.assertEqual(w3.eth.wait_for_transaction_receipt(tx_hash, timeout=5, poll_latency=0.05).status, 1)
+
+
+@override_settings(
+    CHAIN_BACKEND='http', WEB3_PROVIDER_URLS=['http://127.0.0.1:8545'], CONTRACT_ADDRESS=SENDER,
+)
+class ContractClientTest(SimpleTestCase):
+    def setUp(self):
+        contract_service.reset_client()
+        self.addCleanup(contract_service.reset_client)
+
+    def test_client_is_reused_within_a_process(self):
+        """Every caller in the process shares one Web3 instance and parsed contract, built once"""
+        def client(_):
+            return contract_service.get_w3(), contract_service.get_contract()
+
+        with mock.patch.object(contract_service, '_build_client', wraps=contract_service._build_client) as build:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                clients = list(pool.map(client, range(16)))
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual({(id(w3), id(contract)) for w3, contract in clients}, {(id(clients[0][0]), id(clients[0][1]))})
+
+    def test_client_is_rebuilt_when_the_pid_changes(self):
+        """A process whose pid differs from the one that built the client gets its own"""
+        w3 = contract_service.get_w3()
+        child_pid = os.getpid() + 1
+        with mock.patch.object(contract_service.os, 'getpid', return_value=child_pid):
+            rebuilt = contract_service.get_w3()
+            self.assertIsNot(rebuilt, w3)
+            self.assertIs(contract_service.get_w3(), rebuilt)
+        self.assertEqual(contract_service._client[0], child_pid)
+
+    @skipUnless(hasattr(os, 'fork'), 'needs os.fork')
+    def test_forked_child_starts_without_a_client(self):
+        """The register_at_fork hook drops the parent's client in the child"""
+        contract_service.get_w3()
+        read_end, write_end = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.write(write_end, b'1' if contract_service._client is None else b'0')
+            os._exit(0)
+        os.close(write_end)
+        os.waitpid(pid, 0)
+        with os.fdopen(read_end, 'rb') as pipe:
+            self.assertEqual(pipe.read(), b'1')
+        self.assertEqual(contract_service._client[0], os.getpid())
+
+
+@override_settings(CHAIN_CACHE_LOCK_TIMEOUT=0.2)
+class ChainCacheTest(SimpleTestCase):
+    def setUp(self):
+        contract_service._chain_cache().clear()
+        self.addCleanup(contract_service._chain_cache().clear)
+
+    def test_lookup_releases_its_own_lock(self):
+        """The caller that took the cross-process lock calls the node once and releases the lock"""
+        fetch = mock.Mock(return_value=True)
+        self.assertTrue(contract_service._cached_lookup('signed-hash', '11' * 32, fetch))
+        self.assertTrue(contract_service._cached_lookup('signed-hash', '11' * 32, fetch))
+        fetch.assert_called_once_with('11' * 32)
+        self.assertIsNone(contract_service._chain_cache().get(contract_service._cache_key('signed-hash', '11' * 32) + ':lock'))
+
+    def test_lookup_after_wait_keeps_another_holders_lock(self):
+        """A caller that gave up waiting still answers but leaves the other process's lock in place"""
+        lock_key = contract_service._cache_key('signed-hash', '22' * 32) + ':lock'
+        contract_service._chain_cache().add(lock_key, 1, timeout=60)
+        self.assertFalse(contract_service._cached_lookup('signed-hash', '22' * 32, mock.Mock(return_value=False)))
+        self.assertEqual(contract_service._chain_cache().get(lock_key), 1)
+
+
+class TransactionJournalTest(SimpleTestCase):
+    def test_journal_reopens_file_after_external_rotation(self):
+        """Records written after the file is rotated away land in a fresh file, not in the backup"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tx_journal.jsonl')
+            with override_settings(TX_JOURNAL_PATH=path):
+                tx_journal.journal('sent', nonce=0)
+                tx_journal.stop_journal()
+                os.rename(path, f"{path}.1")
+                tx_journal.journal('sent', nonce=1)
+                tx_journal.stop_journal()
+                self.assertEqual(tx_journal.journal_files(), [f"{path}.1", path])
+                self.assertEqual([record['nonce'] for record in tx_journal.read_journal()], [0, 1])
+
+
+@override_settings(WEB3_WS_URL=None, RECEIPT_POLL_INTERVAL=0.05, RECEIPT_TRACKER_IDLE_SECONDS=0)
+class ReceiptTrackerTest(SimpleTestCase):
+    def setUp(self):
+        self.provider = SimulatedChainProvider(block_time=0.2)
+        self.provider.start()
+        self.w3 = Web3(self.provider)
+        self.sender, self.key = self.w3.eth.accounts[0], self.provider.ethereum_tester.backend.account_keys[0]
+        self.tracker = ReceiptTracker(self.w3)
+
+    def _send(self, nonce=0, priority_fee=10 ** 9, value=1):
+        txn = {'to': self.w3.eth.accounts[1], 'value': value, 'gas': 21000, 'nonce': nonce,
+               'chainId': self.w3.eth.chain_id, 'maxFeePerGas': 10 * priority_fee, 'maxPriorityFeePerGas': priority_fee}
+        return self.w3.eth.send_raw_transaction(self.w3.eth.account.sign_transaction(txn, self.key).raw_transaction)
+
+    def test_wait_returns_the_formatted_receipt(self):
+        """A waiter gets the same receipt w3.eth.get_transaction_receipt returns once the block is mined"""
+        tx_hash = self._send()
+        receipt = self.tracker.wait([tx_hash], timeout=5)
+        self.assertEqual(receipt, self.w3.eth.get_transaction_receipt(tx_hash))
+        self.assertEqual(receipt.status, 1)
+
+    def test_wait_returns_whichever_version_is_mined(self):
+        """Waiting on a transaction and its replacement returns the receipt of the one that landed"""
+        original = self._send()
+        replacement = self._send(priority_fee=2 * 10 ** 9, value=2)
+        receipt = self.tracker.wait([original, replacement], timeout=5)
+        self.assertEqual(receipt.transactionHash, replacement)
+
+    def test_receipts_are_fetched_in_one_batch(self):
+        """One batch request per lookup carries the receipts: no per-hash receipt calls follow"""
+        tx_hashes = [self._send(nonce) for nonce in range(3)]
+        self.tracker.wait([tx_hashes[-1]], timeout=5)
+        pending = [tx_hash.to_0x_hex() for tx_hash in tx_hashes] + ['0x' + '11' * 32]
+        with mock.patch.object(self.provider, 'make_batch_request', wraps=self.provider.make_batch_request) as batch, \
+                mock.patch.object(self.w3.eth, 'get_transaction_receipt') as single:
+            receipts = self.tracker._lookup(pending)
+        batch.assert_called_once()
+        single.assert_not_called()
+        self.assertEqual(sorted(receipts), sorted(pending[:3]))
+        self.assertEqual([receipts[h].transactionHash.to_0x_hex() for h in pending[:3]], pending[:3])
+
+    def test_wait_times_out_for_unknown_hash(self):
+        """A hash that is never mined raises TimeExhausted and leaves nothing pending"""
+        with self.assertRaises(TimeExhausted):
+            self.tracker.wait(['0x' + '22' * 32], timeout=0.3)
+        self.assertEqual(self.tracker.pending_count(), 0)
+
+
+class GasBenchmarkTest(SimpleTestCase):
+    def test_read_gas_sums_every_call(self):
+        """View gas adds up each call's estimate, so a shorter last batch chunk is not overcounted"""
+        bench = gas_benchmark._Bench.__new__(gas_benchmark._Bench)
+        bench.owner = SENDER
+        calls = [mock.Mock(**{'estimate_gas.return_value': gas}) for gas in (90000, 90000, 41000)]
+        self.assertEqual(bench._read_all(calls), (3, 221000))
+        self.assertEqual(bench._read_all([]), (0, 0))
+
+
+class FeeEngineTest(SimpleTestCase):
+    def setUp(self):
+        fees.reset_fee_cache()
+        self.addCleanup(fees.reset_fee_cache)
+
+    def _fees(self, base_fee, priority_fee, strategy=None):
+        with mock.patch.object(fees, 'current_fees', return_value=(base_fee, priority_fee)):
+            return fees.fee_params(None, strategy)
+
+    def test_strategies_trade_tip_and_headroom(self):
+        """'latency' tips 1.5x and keeps two base fees of headroom, 'cost' tips 1x with 1.25 base fees"""
+        gwei = 10 ** 9
+        self.assertEqual(self._fees(100 * gwei, 2 * gwei, 'latency'),
+                         {'maxPriorityFeePerGas': 3 * gwei, 'maxFeePerGas': 203 * gwei})
+        self.assertEqual(self._fees(100 * gwei, 2 * gwei, 'cost'),
+                         {'maxPriorityFeePerGas': 2 * gwei, 'maxFeePerGas': 127 * gwei})
+        with override_settings(FEE_STRATEGY='cost'):
+            self.assertEqual(self._fees(100 * gwei, 2 * gwei)['maxFeePerGas'], 127 * gwei)
+        # Pre-London chains have no base fee: a legacy gas price
+        self.assertEqual(self._fees(None, 5 * gwei), {'gasPrice': 5 * gwei})
+
+    @override_settings(FEE_MAX_FEE_GWEI=150)
+    def test_fee_cap_limits_new_transactions(self):
+        """The max fee never exceeds FEE_MAX_FEE_GWEI, and the tip never exceeds the max fee"""
+        gwei = 10 ** 9
+        self.assertEqual(self._fees(100 * gwei, 2 * gwei, 'latency'),
+                         {'maxPriorityFeePerGas': 3 * gwei, 'maxFeePerGas': 150 * gwei})
+        self.assertEqual(self._fees(100 * gwei, 200 * gwei, 'cost'),
+                         {'maxPriorityFeePerGas': 150 * gwei, 'maxFeePerGas': 150 * gwei})
+
+    @override_settings(FEE_REPLACEMENT_BUMP=0.2, FEE_MAX_FEE_GWEI=250, FEE_STRATEGY='cost')
+    def test_bump_raises_every_fee_until_the_cap(self):
+        """A replacement pays at least FEE_REPLACEMENT_BUMP more, or the market price; at the cap there is no bump"""
+        gwei = 10 ** 9
+        txn = {'nonce': 4, 'maxFeePerGas': 100 * gwei, 'maxPriorityFeePerGas': 2 * gwei}
+        with mock.patch.object(fees, 'current_fees', return_value=(10 * gwei, 1 * gwei)):
+            self.assertEqual(fees.bump_fees(None, txn),
+                             {'maxFeePerGas': 120 * gwei + 1, 'maxPriorityFeePerGas': 24 * gwei // 10 + 1})
+        with mock.patch.object(fees, 'current_fees', return_value=(160 * gwei, 1 * gwei)):
+            self.assertEqual(fees.bump_fees(None, txn)['maxFeePerGas'], 201 * gwei)  # The market moved further
+        with mock.patch.object(fees, 'current_fees', return_value=(10 * gwei, 1 * gwei)):
+            self.assertIsNone(fees.bump_fees(None, dict(txn, maxFeePerGas=240 * gwei)))
+
+
+@override_settings(FEE_STUCK_TIMEOUT=0.3, FEE_MAX_REPLACEMENTS=3, FEE_ORACLE_TTL=0, TX_JOURNAL_PATH='',
+                   RECEIPT_POLL_INTERVAL=0.05)
+class StuckTransactionTest(SimpleTestCase):
+    def setUp(self):
+        fees.reset_fee_cache()
+        self.addCleanup(fees.reset_fee_cache)
+        self.provider = SimulatedChainProvider(block_time=1.0)
+        self.provider.start()
+        self.w3 = Web3(self.provider)
+        self.sender, self.key = self.w3.eth.accounts[0], self.provider.ethereum_tester.backend.account_keys[0]
+
+    def test_stuck_transaction_is_replaced_with_the_same_nonce(self):
+        """A transaction still pending after FEE_STUCK_TIMEOUT is re-sent with its nonce and higher fees"""
+        txn = {'from': self.sender, 'to': self.w3.eth.accounts[1], 'value': 1, 'gas': 21000, 'nonce': 0,
+               'chainId': self.w3.eth.chain_id, **fees.fee_params(self.w3)}
+        tx_hash = self.w3.eth.send_raw_transaction(self.w3.eth.account.sign_transaction(txn, self.key).raw_transaction)
+        with mock.patch.object(contract_service, 'record_replacement') as replaced:
+            receipt = contract_service.wait_for_inclusion(self.w3, tx_hash, txn, self.key, hash_count=0)
+        self.assertGreaterEqual(replaced.call_count, 1)
+        self.assertNotEqual(receipt.transactionHash, tx_hash)
+        mined = self.w3.eth.get_transaction(receipt.transactionHash)
+        self.assertEqual((mined['from'], mined['nonce']), (self.sender, 0))
+        self.assertGreaterEqual(mined['maxFeePerGas'], txn['maxFeePerGas'] * 1.125)
+        self.assertGreaterEqual(mined['maxPriorityFeePerGas'], txn['maxPriorityFeePerGas'] * 1.125)
+        self.assertEqual(self.w3.eth.get_transaction_count(self.sender), 1)
+
+
+@override_settings(
+    CHAIN_BACKEND='simulated', CHAIN_SIM_BLOCK_TIME=0, CHAIN_SIM_LATENCY_MS=0, CHAIN_SIM_JITTER_MS=0,
+    CHAIN_SIM_FAILURE_RATE=0, CHAIN_SIM_SEED=1, CONTRACT_OWNER_ADDRESS=None, CONTRACT_OWNER_PRIVATE_KEY=None,
+    TX_JOURNAL_PATH='', CHAIN_INDEX_START_BLOCK=0,
+)
+class EventIndexerTest(TransactionTestCase):
+    def setUp(self):
+        contract_service.reset_client()
+        self.addCleanup(contract_service.reset_client)
+        self.institution = Web3().eth.account.create()
+        contract_service.authorize_institution_on_chain(self.institution.address)
+
+    def _anchor(self, text):
+        signed_hash = Web3.keccak(text=text).hex()
+        receipt = contract_service.add_signed_hash_to_chain('ab' * 32, self.institution.address, signed_hash)
+        return signed_hash, receipt.blockNumber
+
+    def test_resumes_from_the_checkpoint(self):
+        """A second run stores only the events mined since the first and moves the checkpoint to the head"""
+        first, _ = self._anchor('first')
+        self.assertEqual(event_indexer.index_events(confirmations=0), 1)
+        second, block = self._anchor('second')
+        with mock.patch.object(event_indexer, '_fetch_page', wraps=event_indexer._fetch_page) as fetch:
+            self.assertEqual(event_indexer.index_events(confirmations=0), 1)
+        self.assertEqual(fetch.call_args.args[3:], (block, block))
+        self.assertEqual(SyncCheckpoint.objects.get(name=event_indexer.CHECKPOINT_NAME).position, block)
+        self.assertEqual(set(AnchoredHash.objects.values_list('value', flat=True)), {'0x' + first, '0x' + second})
+
+    def test_confirmations_hold_back_recent_blocks(self):
+        """Events fewer than `confirmations` blocks deep wait for a later run"""
+        self._anchor('first')
+        self.assertEqual(event_indexer.index_events(confirmations=1), 0)
+        self._anchor('second')
+        self.assertEqual(event_indexer.index_events(confirmations=1), 1)
+
+    def test_page_is_halved_when_the_node_rejects_a_range(self):
+        """A range the node refuses is retried in halves until it fits, without losing events"""
+        anchored = {'0x' + self._anchor(str(i))[0] for i in range(3)}
+        w3 = contract_service.get_w3()
+        get_logs = w3.eth.get_logs
+        ranges = []
+
+        def capped_get_logs(params):
+            ranges.append((params['fromBlock'], params['toBlock']))
+            if params['toBlock'] - params['fromBlock'] >= 2:
+                raise ValueError('query returned more than 2 blocks')
+            return get_logs(params)
+
+        with mock.patch.object(w3.eth, 'get_logs', side_effect=capped_get_logs):
+            self.assertEqual(event_indexer.index_events(page_size=8, confirmations=0), 3)
+        self.assertEqual(ranges[0], (0, min(7, w3.eth.block_number)))
+        self.assertTrue(all(end - start < 2 for start, end in ranges[2:]))
+        self.assertEqual(set(AnchoredHash.objects.values_list('value', flat=True)), anchored)
+
+    def test_find_anchor_by_value_and_kind(self):
+        """Lookups accept the value with or without 0x and can be narrowed to one kind"""
+        signed_hash, block = self._anchor('first')
+        event_indexer.index_events(confirmations=0)
+        anchor = event_indexer.find_anchor(signed_hash)
+        self.assertEqual((anchor.kind, anchor.block_number), ('signed_hash', block))
+        self.assertEqual(event_indexer.find_anchor('0x' + signed_hash.upper(), kind='signed_hash'), anchor)
+        self.assertIsNone(event_indexer.find_anchor(signed_hash, kind='merkle_root'))
+        self.assertIsNone(event_indexer.find_anchor('11' * 32))
+
+
+# Shared with smart_contracts/test/CertificateRegistry.test.js, so both sides check the same tree
+MERKLE_LEAVES = [Web3.to_hex(Web3.keccak(text=f'certificate {i}')) for i in range(5)]
+MERKLE_ROOT = '0xab126bf3dc3543eef5c256f95cf181261bb4a1e51e8bbf3cb7bd88d9085e505b'
+
+
+class MerkleTest(SimpleTestCase):
+    def _leaves(self, count):
+        return [Web3.to_hex(Web3.keccak(text=f'certificate {i}')) for i in range(count)]
+
+    def _assert_every_proof_verifies(self, leaves):
+        levels = build_merkle_tree(leaves)
+        root = merkle_root(levels)
+        for index, leaf in enumerate(leaves):
+            self.assertTrue(verify_merkle_proof(leaf, merkle_proof(levels, index), root), index)
+        return levels
+
+    def test_single_leaf_is_its_own_root(self):
+        """A one-leaf tree has the leaf as root and an empty proof"""
+        leaf = self._leaves(1)[0]
+        levels = self._assert_every_proof_verifies([leaf])
+        self.assertEqual(merkle_root(levels), leaf)
+        self.assertEqual(merkle_proof(levels, 0), [])
+
+    def test_power_of_two(self):
+        """Every proof in a full tree has one sibling per level"""
+        levels = self._assert_every_proof_verifies(self._leaves(8))
+        self.assertEqual(len(levels), 4)
+        self.assertTrue(all(len(merkle_proof(levels, i)) == 3 for i in range(8)))
+
+    def test_odd_leaf_count_promotes_the_last_node(self):
+        """The unpaired leaf is carried up unchanged, so its proof skips that level"""
+        levels = self._assert_every_proof_verifies(MERKLE_LEAVES)
+        self.assertEqual(merkle_root(levels), MERKLE_ROOT)
+        self.assertEqual([len(level) for level in levels], [5, 3, 2, 1])
+        self.assertEqual(merkle_proof(levels, 4), [Web3.to_hex(levels[2][0])])
+
+    def test_pairs_are_hashed_in_sorted_order(self):
+        """Parents match OpenZeppelin's commutative keccak, whichever side the smaller node is on"""
+        a, b = (Web3.to_bytes(hexstr=leaf) for leaf in self._leaves(2))
+        expected = Web3.to_hex(Web3.keccak(min(a, b) + max(a, b)))
+        self.assertEqual(merkle_root(build_merkle_tree([a, b])), expected)
+        self.assertEqual(merkle_root(build_merkle_tree([b, a])), expected)
+
+    def test_tampered_proof_is_rejected(self):
+        """Changing the leaf, a sibling or the root breaks verification"""
+        levels = build_merkle_tree(MERKLE_LEAVES)
+        proof = merkle_proof(levels, 1)
+        self.assertTrue(verify_merkle_proof(MERKLE_LEAVES[1], proof, MERKLE_ROOT))
+        self.assertFalse(verify_merkle_proof(MERKLE_LEAVES[2], proof, MERKLE_ROOT))
+        self.assertFalse(verify_merkle_proof(MERKLE_LEAVES[1], [proof[0], '0x' + '00' * 32, proof[2]], MERKLE_ROOT))
+        self.assertFalse(verify_merkle_proof(MERKLE_LEAVES[1], proof[:-1], MERKLE_ROOT))
+        self.assertFalse(verify_merkle_proof(MERKLE_LEAVES[1], proof, '0x' + '11' * 32))
+
+    def test_empty_batch_is_rejected(self):
+        """There is no root for an empty batch"""
+        with self.assertRaises(ValueError):
+            build_merkle_tree([])
+
+
+@override_settings(
+    CHAIN_BACKEND='simulated', CHAIN_SIM_BLOCK_TIME=0, CHAIN_SIM_LATENCY_MS=0, CHAIN_SIM_JITTER_MS=0,
+    CHAIN_SIM_FAILURE_RATE=0, CHAIN_SIM_SEED=1, CONTRACT_OWNER_ADDRESS=None, CONTRACT_OWNER_PRIVATE_KEY=None,
+    TX_JOURNAL_PATH='',
+)
+class MerkleAnchorTest(TransactionTestCase):
+    def setUp(self):
+        contract_service.reset_client()
+        self.addCleanup(contract_service.reset_client)
+        self.institution = Web3().eth.account.create()
+        contract_service.authorize_institution_on_chain(self.institution.address)
+
+    def test_root_built_in_python_is_anchored(self):
+        """A root from build_merkle_tree round-trips through the contract as bytes32"""
+        root = merkle_root(build_merkle_tree(MERKLE_LEAVES))
+        self.assertFalse(contract_service.verify_merkle_root_on_chain(root))
+        receipt = contract_service.add_merkle_root_to_chain(
+            'ab' * 32, self.institution.address, root, hash_count=len(MERKLE_LEAVES)
+        )
+        self.assertEqual(receipt.status, 1)
+        self.assertTrue(contract_service.verify_merkle_root_on_chain(root))
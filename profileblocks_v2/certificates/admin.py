@@ -1,7 +1,7 @@
 # certificates/admin.py
 
 from django.contrib import admin
-from .models import Student, Certificate
+from .models import Student, Certificate, AnchorOutbox, BulkIssuanceJob
 
 class StudentAdmin(admin.ModelAdmin):
     # Fields to display in the list view of the admin interface for Student model
@@ -26,21 +26,52 @@ class StudentAdmin(admin.ModelAdmin):
 
 class CertificateAdmin(admin.ModelAdmin):
     # Fields to display in the list view of the admin interface for Certificate model
-    list_display = ('certificate_hash', 'certificate_type', 'issuing_institution', 'student', 'created_at')
+    list_display = ('certificate_hash', 'certificate_type', 'issuing_institution', 'student', 'anchor_status', 'created_at')
     
     # Fields to filter by in the sidebar of the admin list page
-    list_filter = ('certificate_type', 'created_at', 'issuing_institution')
+    list_filter = ('certificate_type', 'anchor_status', 'signature_algorithm', 'created_at', 'issuing_institution')
     
     # Fields that will be searchable in the admin search bar
     search_fields = ('certificate_hash', 'student_user_unique_identifier', 
                      'issuing_institution_user_unique_identifier')
     
     # Fields that are read-only in the admin interface (cannot be edited)
-    readonly_fields = ('certificate_hash', 'created_at')
+    readonly_fields = ('certificate_hash', 'signature_algorithm', 'signing_key', 'idempotency_key', 'created_at',
+                       'anchor_status', 'anchor_tx_hash', 'anchor_block_number')
+
+
+class AnchorOutboxAdmin(admin.ModelAdmin):
+    # Show delivery state of queued on-chain anchoring work
+    list_display = ('signed_hash_keccak', 'certificate', 'status', 'attempts', 'next_attempt_at', 'updated_at')
+    
+    # Filter rows by delivery state
+    list_filter = ('status',)
+    
+    # Outbox rows are written by issuance and the worker only
+    readonly_fields = ('certificate', 'signed_hash_keccak', 'attempts', 'last_error', 'created_at', 'updated_at')
+
+
+class BulkIssuanceJobAdmin(admin.ModelAdmin):
+    # Show progress of bulk issuance uploads
+    list_display = ('id', 'source_name', 'institution', 'status', 'processed_rows', 'total_rows', 'issued', 'updated_at')
+    
+    # Filter jobs by state
+    list_filter = ('status',)
+    
+    # Jobs are written by the upload view and bulk_issuance service only
+    readonly_fields = ('institution', 'issuing_user', 'source_name', 'position', 'total_rows', 'processed_rows',
+                       'issued', 'replayed', 'errors', 'last_error', 'created_at', 'updated_at')
+    exclude = ('source',)
 
 
 # Register the Student model with the customized StudentAdmin configuration
 admin.site.register(Student, StudentAdmin)
 
 # Register the Certificate model with the customized CertificateAdmin configuration
-admin.site.register(Certificate, CertificateAdmin)
\ No newline at end of file
+admin.site.register(Certificate, CertificateAdmin)
+
+# Register the AnchorOutbox model with the customized AnchorOutboxAdmin configuration
+admin.site.register(AnchorOutbox, AnchorOutboxAdmin)
+
+# Register the BulkIssuanceJob model with the customized BulkIssuanceJobAdmin configuration
+admin.site.register(BulkIssuanceJob, BulkIssuanceJobAdmin)
\ No newline at end of file
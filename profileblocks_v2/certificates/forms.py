@@ -103,6 +103,32 @@ class CertificateIssueForm(forms.ModelForm):
         return cert
 
         
+class BulkIssuanceForm(forms.Form):
+    # CSV or JSONL file of certificates to issue (see bulk_issuance.create_job for the columns)
+    file = forms.FileField(help_text="CSV with a header row, or JSONL with one certificate per line")
+    certificate_type = forms.ChoiceField(required=False, help_text="Type for rows that do not name one")
+
+    def __init__(self, *args, **kwargs):
+        self.institution = kwargs.pop('institution', None)
+        super().__init__(*args, **kwargs)
+        if self.institution:
+            # Limit certificate_type choices based on institution's allowed types
+            self.fields['certificate_type'].choices = [('', 'Named in each row')] + [
+                (ct, ct) for ct in self.institution.institution_type.allowed_certificate_types
+            ]
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.endswith(('.csv', '.jsonl')):
+            raise forms.ValidationError("Upload a .csv or .jsonl file")
+        try:
+            # Keep the decoded text: the job stores it so it can resume
+            self.source = upload.read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise forms.ValidationError("The file must be UTF-8 encoded")
+        return upload
+
+
 class StudentSignupForm(forms.ModelForm):
     # Fields for user login credentials
     username = forms.CharField(max_length=150, help_text="Your login username")
@@ -0,0 +1,33 @@
+# certificates/management/commands/anchor_worker.py
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from certificates.services.anchoring import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Drain the anchoring outbox, adding issued certificates' signed hashes to the chain"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Rows claimed per batch (default 20, or ANCHOR_MERKLE_BATCH_SIZE in merkle mode)")
+        parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds to sleep when the outbox is empty")
+        parser.add_argument('--once', action='store_true', help="Process due rows once and exit")
+        parser.add_argument('--flush', action='store_true',
+                            help="In merkle mode, anchor partial batches without waiting for the window")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write(f"Anchor worker started ({settings.ANCHORING_MODE} mode)")
+        try:
+            while True:
+                processed = drain_outbox(batch_size, flush=options['flush'])
+                if processed:
+                    self.stdout.write(f"Processed {processed} outbox row(s)")
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write("Anchor worker stopped")
@@ -0,0 +1,36 @@
+# certificates/management/commands/bulk_issuance_worker.py
+
+import time
+from django.core.management.base import BaseCommand
+from certificates.management.commands.bulk_issue_certificates import run_and_report
+from certificates.services.bulk_issuance import claim_job
+
+
+class Command(BaseCommand):
+    help = "Run bulk issuance jobs uploaded through the web interface"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Certificates per transaction (default BULK_ISSUANCE_CHUNK_SIZE)")
+        parser.add_argument('--poll-interval', type=float, default=5.0, help="Seconds to sleep when no job is pending")
+        parser.add_argument('--once', action='store_true', help="Run the pending jobs once and exit")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Bulk issuance worker started")
+        while True:
+            job = claim_job()
+            if job:
+                self.stdout.write(f"Job {job.pk}: {job.source_name}, {job.total_rows} row(s)")
+                try:
+                    run_and_report(self, job, options['chunk_size'])
+                except Exception as e:
+                    # run_job has marked the job failed; it can be resumed with bulk_issue_certificates --job
+                    self.stderr.write(f"Job {job.pk} failed: {e}")
+                continue
+            if options['once']:
+                break
+            try:
+                time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                break
+        self.stdout.write("Bulk issuance worker stopped")
@@ -0,0 +1,21 @@
+# certificates/management/commands/drop_unused_student_keys.py
+
+from django.core.management.base import BaseCommand
+from certificates.services.student_keys import drop_unused_student_keys, students_with_unused_keys
+
+
+class Command(BaseCommand):
+    help = "Clear keypairs of students who never signed a profile (keys are now created on first profile)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help="Students updated per UPDATE statement")
+        parser.add_argument('--dry-run', action='store_true', help="Count the keys without dropping them")
+
+    def handle(self, *args, **options):
+        total = students_with_unused_keys().count()
+        self.stdout.write(f"{total} student(s) with a keypair that never signed a profile")
+        dropped = 0
+        for position, dropped in drop_unused_student_keys(options['chunk_size'], options['dry_run']):
+            self.stdout.write(f"id <= {position}: {dropped}/{total}")
+        verb = "would be dropped" if options['dry_run'] else "dropped"
+        self.stdout.write(self.style.SUCCESS(f"Done: {dropped} unused keypair(s) {verb}"))
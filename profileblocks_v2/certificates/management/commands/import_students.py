@@ -0,0 +1,46 @@
+# certificates/management/commands/import_students.py
+
+import time
+from django.core.management.base import BaseCommand
+from certificates.services.student_import import import_students, read_roster
+
+
+class Command(BaseCommand):
+    help = "Create students and their accounts in bulk from a CSV or JSONL roster file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV (with header) or .jsonl roster, see read_roster for the columns")
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Rows per transaction (default STUDENT_IMPORT_CHUNK_SIZE)")
+        parser.add_argument('--workers', type=int, default=None, help="Password hashing processes (default: CPU count)")
+        parser.add_argument('--dry-run', action='store_true', help="Validate the roster without creating anything")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = None
+        reported = 0
+        for stats in import_students(
+            read_roster(options['path']),
+            chunk_size=options['chunk_size'],
+            workers=options['workers'],
+            dry_run=options['dry_run'],
+        ):
+            for line_number, message in stats['errors'][reported:]:
+                self.stderr.write(f"  line {line_number}: {message}")
+            reported = len(stats['errors'])
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{stats['rows']} row(s): {stats['created']} new, {stats['skipped']} existing, "
+                f"{len(stats['errors'])} error(s), {stats['rows'] / elapsed:.0f} rows/s"
+            )
+
+        if stats is None:
+            self.stdout.write("Roster is empty")
+            return
+        elapsed = time.perf_counter() - started
+        verb = "would be created" if options['dry_run'] else "created"
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {stats['created']} student(s) {verb} from {stats['rows']} row(s) in {elapsed:.1f}s "
+            f"({stats['rows'] / elapsed:.0f} rows/s), {stats['skipped']} already existed, "
+            f"{len(stats['errors'])} error(s)"
+        ))
@@ -0,0 +1,52 @@
+# certificates/management/commands/reconcile_anchors.py
+
+import time
+from django.core.management.base import BaseCommand
+from blockchain.models import SyncCheckpoint
+from certificates.models import Certificate
+from certificates.services.reconciliation import CHECKPOINT_NAME, reconcile_anchors
+
+
+class Command(BaseCommand):
+    help = "Find certificates whose hash is missing on chain and queue them for re-anchoring"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Certificates checked per chunk (default ANCHOR_RECONCILE_CHUNK_SIZE)")
+        parser.add_argument('--rate', type=float, default=None,
+                            help="Maximum certificates queued per second (default ANCHOR_RECONCILE_RATE)")
+        parser.add_argument('--limit', type=int, default=None, help="Stop after queueing this many certificates")
+        parser.add_argument('--restart', action='store_true', help="Ignore the saved position and scan from the start")
+        parser.add_argument('--dry-run', action='store_true', help="Report missing certificates without queueing them")
+
+    def handle(self, *args, **options):
+        # Certificates left to scan, for progress output
+        position = 0 if options['restart'] else (
+            SyncCheckpoint.objects.filter(name=CHECKPOINT_NAME).values_list('position', flat=True).first() or 0
+        )
+        total = Certificate.objects.filter(pk__gt=position).exclude(signed_hash_keccak='').count()
+        started = time.monotonic()
+        stats = None
+        try:
+            for stats in reconcile_anchors(
+                chunk_size=options['chunk_size'],
+                rate=options['rate'],
+                limit=options['limit'],
+                restart=options['restart'],
+                dry_run=options['dry_run'],
+            ):
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"id <= {stats['position']}: scanned {stats['scanned']}/{total}, "
+                    f"missing {stats['missing']} (in flight {stats['in_flight']}), "
+                    f"queued {stats['requeued']}, confirmed {stats['confirmed']}, "
+                    f"{stats['scanned'] / elapsed if elapsed else 0:.0f} certs/s"
+                )
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted; run again to resume from the saved position")
+            return
+        if stats is None:
+            self.stdout.write("Nothing to reconcile (use --restart to scan from the start)")
+        else:
+            verb = "would be queued" if options['dry_run'] else "queued"
+            self.stdout.write(self.style.SUCCESS(f"Done: {stats['requeued']} certificate(s) {verb} for re-anchoring"))
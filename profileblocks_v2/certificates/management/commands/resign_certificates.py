@@ -0,0 +1,69 @@
+# certificates/management/commands/resign_certificates.py
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from blockchain.models import SyncCheckpoint
+from certificates.services.resigning import certificates_to_resign, checkpoint_name, resign_certificates
+from institutions.models import Institution
+from institutions.services.key_registry import current_key_id
+
+
+class Command(BaseCommand):
+    help = "Re-sign an institution's certificates with its current key and queue the new hashes for anchoring"
+
+    def add_arguments(self, parser):
+        parser.add_argument('institution', help="Institution id or unique identifier")
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Certificates per chunk (default RESIGN_CHUNK_SIZE)")
+        parser.add_argument('--rate', type=float, default=None,
+                            help="Maximum certificates re-signed per second (default RESIGN_RATE)")
+        parser.add_argument('--duty-cycle', type=float, default=None,
+                            help="Most share of wall time spent writing to the DB (default RESIGN_DB_DUTY_CYCLE)")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Signing processes when no signing daemon is configured (default: CPU count)")
+        parser.add_argument('--restart', action='store_true', help="Ignore the saved position and scan from the start")
+
+    def handle(self, *args, **options):
+        identifier = options['institution']
+        institution = (
+            Institution.objects.filter(pk=int(identifier)).first() if identifier.isdigit() else None
+        ) or Institution.objects.filter(unique_identifier=identifier).first()
+        if institution is None:
+            raise CommandError(f"No institution {identifier}")
+
+        # Certificates left to re-sign, for progress and ETA
+        key_id = current_key_id(institution)
+        position = 0 if options['restart'] else (
+            SyncCheckpoint.objects.filter(name=checkpoint_name(institution.pk, key_id))
+            .values_list('position', flat=True).first() or 0
+        )
+        total = certificates_to_resign(institution, key_id, position).count()
+        self.stdout.write(f"{institution.name}: {total} certificate(s) to re-sign with key {key_id}")
+        started = time.monotonic()
+        stats = None
+        try:
+            for stats in resign_certificates(
+                institution,
+                chunk_size=options['chunk_size'],
+                rate=options['rate'],
+                duty_cycle=options['duty_cycle'],
+                restart=options['restart'],
+                workers=options['workers'],
+            ):
+                elapsed = time.monotonic() - started
+                throughput = stats['resigned'] / elapsed if elapsed else 0
+                remaining = max(total - stats['resigned'], 0)
+                eta = f"{remaining / throughput:.0f}s" if throughput else "unknown"
+                self.stdout.write(
+                    f"id <= {stats['position']}: re-signed {stats['resigned']}/{total}, "
+                    f"{throughput:.0f} certs/s, DB writes {stats['write_seconds']:.1f}s, ETA {eta}"
+                )
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted; run again to resume from the saved position")
+            return
+        if stats is None:
+            self.stdout.write("Nothing to re-sign")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Done: {stats['resigned']} certificate(s) re-signed and queued for anchoring"
+            ))
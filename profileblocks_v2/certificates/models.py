@@ -5,6 +5,9 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from web3 import Web3
 from django.utils import timezone
+from django.conf import settings
+from accounts.services.signature_schemes import RSA_PSS_SHA256, SIGNATURE_ALGORITHMS
+from accounts.services.signing_client import sign_for
 from certificates.services.hashing import generate_student_identifier
 from institutions.models import InstitutionUser
 import re
@@ -20,6 +23,7 @@ class Student(models.Model):
     unique_identifier = models.CharField(max_length=64, unique=True, editable=False)  # Unique ID for student (auto-generated)
     public_key = models.TextField(blank=True, null=True)  # Student's public key for cryptographic operations
     private_key = models.TextField(blank=True, null=True)  # Student's private key (should be securely stored)
+    key_algorithm = models.CharField(max_length=20, choices=SIGNATURE_ALGORITHMS, default=RSA_PSS_SHA256)  # Signature scheme of the keys
 
     def clean(self):
         # Validate HKID prefix format: exactly 4 alphanumeric characters
@@ -29,13 +33,33 @@ class Student(models.Model):
         if not self.firstname or not self.lastname:
             raise ValidationError('Both first name and last name are required')
 
+    def ensure_keypair(self):
+        """
+        Give the student a signing keypair on first use (signup no longer creates one).
+        The key is installed with a conditional UPDATE, so when two first-profile
+        requests race, both end up with the key that was stored first.
+        """
+        if self.public_key and self.private_key:
+            return self
+        from accounts.services.key_pool import take_keypair
+        # Take a key pair of the configured algorithm (RSA comes from the pre-generated pool)
+        key_algorithm = settings.SIGNATURE_ALGORITHM
+        pub, priv = take_keypair(key_algorithm)
+        Student.objects.filter(pk=self.pk).filter(
+            models.Q(private_key__isnull=True) | models.Q(private_key='')
+        ).update(public_key=pub, private_key=priv, key_algorithm=key_algorithm)
+        # Whether ours or a concurrent request's key was stored, use the stored one
+        self.refresh_from_db(fields=['public_key', 'private_key', 'key_algorithm'])
+        return self
+
     def save(self, *args, **kwargs):
-        from accounts.services.key_management import generate_key_pair
-        # Generate cryptographic key pair if not already assigned
-        if not self.public_key or not self.private_key:
-            pub, priv = generate_key_pair()
-            self.public_key = pub
-            self.private_key = priv
+        # Keys are only created by ensure_keypair, with their own UPDATE: saving an instance loaded
+        # before that must not write its blank keys over them
+        if not self._state.adding and not self.private_key and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ('public_key', 'private_key', 'key_algorithm')
+            ]
 
         # Generate unique identifier based on student info
         new_uid = generate_student_identifier(self.firstname, self.lastname, self.hkid_prefix, self.date_of_birth)
@@ -63,11 +87,27 @@ class Certificate(models.Model):
         ('academic_results', 'Academic Results'),
         ('awards', 'Awards'),
     )
+    ANCHOR_STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('submitted', 'Submitted'),
+        ('confirmed', 'Confirmed'),
+        ('failed', 'Failed'),
+    )
     
     certificate_hash = models.CharField(max_length=66, unique=True)  # Unique hash representing the certificate
     certificate_type = models.CharField(max_length=20, choices=CERTIFICATE_TYPES)  # Type of certificate
     is_public = models.BooleanField(default=False, verbose_name="Allow external access")  # Flag for external visibility
     signed_hash = models.CharField(max_length=512, blank=True)  # Signature of the certificate hash
+    signature_algorithm = models.CharField(
+        max_length=20, choices=SIGNATURE_ALGORITHMS, default=RSA_PSS_SHA256
+    )  # Scheme signed_hash was made with (the issuer's key_algorithm at signing time)
+    signing_key = models.ForeignKey(
+        'institutions.InstitutionKey',
+        on_delete=models.PROTECT,  # Registry keys are append-only
+        related_name='certificates',
+        null=True, blank=True,
+        help_text='Registry version of the institution key signed_hash was made with'
+    )
     signed_hash_keccak = models.CharField(max_length=66, blank=True)  # Keccak hash of the signature
     
     issuing_institution = models.ForeignKey(
@@ -88,7 +128,13 @@ class Certificate(models.Model):
         related_name='received_certificates'
     )
     metadata = models.JSONField()  # JSON metadata with certificate details
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, editable=False)  # Client key of the issuing request: a retry with the same key returns this certificate
     created_at = models.DateTimeField(auto_now_add=True)  # Timestamp of creation
+    anchor_status = models.CharField(max_length=20, choices=ANCHOR_STATUS_CHOICES, default='pending', db_index=True)  # On-chain anchoring state
+    anchor_tx_hash = models.CharField(max_length=66, blank=True)  # Transaction that anchored signed_hash_keccak
+    anchor_block_number = models.BigIntegerField(null=True, blank=True)  # Block the anchoring transaction was mined in
+    merkle_root = models.CharField(max_length=66, blank=True)  # Batch root anchored on-chain (Merkle anchoring mode)
+    merkle_proof = models.JSONField(default=list, blank=True)  # Sibling hashes proving signed_hash_keccak is under merkle_root
     
     def generate_certificate_hash(self):
         # Prepare certificate information dictionary for hashing
@@ -103,29 +149,14 @@ class Certificate(models.Model):
         return Web3.solidity_keccak(['string'], [str(cert_info)]).hex()
     
     def sign_certificate(self):
-        # Import cryptography primitives for signing
-        from cryptography.hazmat.primitives import hashes, serialization
-        from cryptography.hazmat.primitives.asymmetric import padding
-        from cryptography.hazmat.backends import default_backend
-        
-        # Load the institution's private key (PEM format)
-        private_key = serialization.load_pem_private_key(
-            self.issuing_institution.private_key.encode(),
-            password=None,
-            backend=default_backend()
-        )
-        
-        # Sign the certificate hash using PSS padding and SHA256 hashing
-        signature = private_key.sign(
-            self.certificate_hash.encode(),
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
-        # Return signature in hex string format
-        return signature.hex()
+        # Sign the certificate hash with the institution's key under its signature scheme
+        # (through the signing daemon when configured, otherwise inline via the key cache)
+        from institutions.services.key_registry import current_key_id
+
+        institution = self.issuing_institution
+        self.signature_algorithm = institution.key_algorithm
+        self.signing_key_id = current_key_id(institution)  # Lets verification survive key rotation
+        return sign_for(institution, self.certificate_hash)
 
     def save(self, *args, **kwargs):
         # If certificate_hash is not set, generate it before saving
@@ -149,6 +180,43 @@ class Certificate(models.Model):
     class Meta:
         verbose_name = "Certificate"
         verbose_name_plural = "Certificates"
+        constraints = [
+            # Keys are per institution; certificates issued without a key (NULL) are not constrained
+            models.UniqueConstraint(fields=['issuing_institution', 'idempotency_key'], name='unique_certificate_idempotency_key')
+        ]
+
+class AnchorOutbox(models.Model):
+    """
+    Transactional outbox of certificates waiting to be anchored on-chain.
+    Rows are written in the same DB transaction as the Certificate and drained
+    by the anchor_worker management command.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    certificate = models.ForeignKey(Certificate, on_delete=models.CASCADE, related_name='anchor_jobs')  # Certificate to anchor
+    signed_hash_keccak = models.CharField(max_length=66)  # Hash submitted to addSignedHash
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')  # Delivery state of this row
+    attempts = models.PositiveIntegerField(default=0)  # Number of delivery attempts made so far
+    next_attempt_at = models.DateTimeField(default=timezone.now)  # Earliest time the worker may (re)try this row
+    last_error = models.TextField(blank=True)  # Error from the most recent failed attempt
+    created_at = models.DateTimeField(auto_now_add=True)  # Timestamp of enqueueing
+    updated_at = models.DateTimeField(auto_now=True)  # Timestamp of the last state change (used as claim lease)
+
+    def __str__(self):
+        return f"Anchor {self.signed_hash_keccak[:10]} ({self.status})"
+
+    class Meta:
+        verbose_name = "Anchor Outbox Entry"
+        verbose_name_plural = "Anchor Outbox"
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
 
 class DraftCertificate(models.Model):
     certificate_type = models.CharField(max_length=20, choices=Certificate.CERTIFICATE_TYPES)  # Type of certificate draft
@@ -173,4 +241,46 @@ class DraftCertificate(models.Model):
 
     class Meta:
         verbose_name = "Draft Certificate"
-        verbose_name_plural = "Draft Certificates"
\ No newline at end of file
+        verbose_name_plural = "Draft Certificates"
+
+
+class BulkIssuanceJob(models.Model):
+    """
+    A CSV/JSONL file of certificates to issue in bulk (bulk_issuance service).
+    The rows are kept on the job and progress is committed with every chunk of
+    certificates, so an interrupted job resumes after its last issued row.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    institution = models.ForeignKey('institutions.Institution', on_delete=models.CASCADE, related_name='bulk_issuance_jobs')  # Issuing institution
+    issuing_user = models.ForeignKey(InstitutionUser, on_delete=models.SET_NULL, null=True, blank=True)  # User who uploaded the file
+    certificate_type = models.CharField(max_length=20, choices=Certificate.CERTIFICATE_TYPES, blank=True)  # Type for rows that do not name one
+    source_name = models.CharField(max_length=255)  # Name of the uploaded file
+    source = models.TextField()  # Content of the uploaded file, read again when the job resumes
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)  # Job state
+    position = models.PositiveIntegerField(default=0)  # Last source line processed; rows up to it are never issued again
+    total_rows = models.PositiveIntegerField(default=0)  # Rows in the file
+    processed_rows = models.PositiveIntegerField(default=0)  # Rows issued or rejected so far
+    issued = models.PositiveIntegerField(default=0)  # Certificates created
+    replayed = models.PositiveIntegerField(default=0)  # Rows whose idempotency key was already issued
+    errors = models.JSONField(default=list, blank=True)  # [line number, message] for every rejected row
+    last_error = models.TextField(blank=True)  # Why the job stopped, when it failed
+    created_at = models.DateTimeField(auto_now_add=True)  # Timestamp of upload
+    updated_at = models.DateTimeField(auto_now=True)  # Timestamp of the last committed chunk
+
+    @property
+    def is_jsonl(self):
+        return self.source_name.endswith('.jsonl')
+
+    def __str__(self):
+        return f"Bulk issuance {self.pk} of {self.source_name} ({self.status})"
+
+    class Meta:
+        verbose_name = "Bulk Issuance Job"
+        verbose_name_plural = "Bulk Issuance Jobs"
+        ordering = ['-id']
@@ -0,0 +1,236 @@
+# certificates/services/anchoring.py
+
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from blockchain.services.contract_service import (
+    add_merkle_root_to_chain, add_signed_hash_to_chain, remember_anchored, verify_signed_hash_on_chain
+)
+from blockchain.services.merkle import build_merkle_tree, merkle_proof, merkle_root
+from certificates.models import AnchorOutbox, Certificate
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_anchor(cert):
+    """
+    Queue a certificate's signed hash for on-chain anchoring.
+    Call inside the same transaction that creates the certificate.
+    """
+    return AnchorOutbox.objects.create(
+        certificate=cert,
+        signed_hash_keccak=cert.signed_hash_keccak
+    )
+
+
+def anchoring_credentials(cert):
+    """
+    Return the (private key, address) pair used to anchor this certificate:
+    the issuing user's Ethereum account if any, otherwise the institution's.
+    """
+    issuing_user = cert.issuing_user
+    if issuing_user and hasattr(issuing_user, "ethereum_private_key"):
+        return issuing_user.ethereum_private_key, issuing_user.ethereum_address
+    institution = cert.issuing_institution
+    return institution.ethereum_private_key, institution.ethereum_address
+
+
+def retry_delay(attempts):
+    # Exponential backoff capped at ANCHOR_RETRY_MAX_DELAY seconds
+    delay = settings.ANCHOR_RETRY_BASE_DELAY * (2 ** max(attempts - 1, 0))
+    return timedelta(seconds=min(delay, settings.ANCHOR_RETRY_MAX_DELAY))
+
+
+def claim_batch(limit):
+    """
+    Claim up to `limit` due outbox rows for this worker.
+    Each row is claimed with a conditional UPDATE so concurrent workers never
+    process the same row; rows stuck in 'processing' past the lease are reclaimed.
+    """
+    now = timezone.now()
+    lease_expired = now - timedelta(seconds=settings.ANCHOR_LEASE_SECONDS)
+    candidates = (
+        AnchorOutbox.objects.filter(status='pending', next_attempt_at__lte=now)
+        | AnchorOutbox.objects.filter(status='processing', updated_at__lt=lease_expired)
+    ).order_by('id').values_list('id', 'status')[:limit]
+
+    claimed = []
+    for entry_id, status in candidates:
+        if AnchorOutbox.objects.filter(id=entry_id, status=status).update(status='processing', updated_at=now):
+            claimed.append(entry_id)
+    return list(AnchorOutbox.objects.filter(id__in=claimed).select_related(
+        'certificate__issuing_institution', 'certificate__issuing_user__institution'
+    ))
+
+
+def _mark_certificate(entry, **fields):
+    # Update anchoring columns without re-running Certificate.save hashing logic;
+    # a certificate re-signed meanwhile keeps the state of its new hash
+    Certificate.objects.filter(pk=entry.certificate_id, signed_hash_keccak=entry.signed_hash_keccak).update(**fields)
+
+
+def _superseded(entry):
+    # The certificate was re-signed after this row was queued (see resigning._write): drop the row
+    if entry.certificate.signed_hash_keccak == entry.signed_hash_keccak:
+        return False
+    logger.info("Skipping superseded hash %s of certificate %s", entry.signed_hash_keccak, entry.certificate_id)
+    entry.delete()
+    return True
+
+
+def _schedule_retry(entry, error):
+    entry.last_error = str(error)
+    if entry.attempts >= settings.ANCHOR_MAX_ATTEMPTS:
+        # Out of retries: keep the row for inspection and flag the certificate
+        entry.status = 'failed'
+        _mark_certificate(entry, anchor_status='failed')
+        logger.error("Anchoring %s failed permanently after %s attempts: %s",
+                     entry.signed_hash_keccak, entry.attempts, error)
+    else:
+        entry.status = 'pending'
+        entry.next_attempt_at = timezone.now() + retry_delay(entry.attempts)
+        logger.warning("Anchoring %s failed (attempt %s), retrying at %s: %s",
+                       entry.signed_hash_keccak, entry.attempts, entry.next_attempt_at, error)
+    entry.save(update_fields=['status', 'attempts', 'next_attempt_at', 'last_error', 'updated_at'])
+
+
+def process_entry(entry):
+    """
+    Deliver one claimed outbox row to the chain and record the outcome
+    (tx hash, block number, status) on the certificate.
+    """
+    if _superseded(entry):
+        return entry
+    cert = entry.certificate
+    entry.attempts += 1
+
+    try:
+        # A previous attempt may have been mined after we gave up waiting for it
+        if entry.attempts > 1 and verify_signed_hash_on_chain(entry.signed_hash_keccak):
+            receipt = None
+            already_anchored = True
+        else:
+            eth_private_key, eth_address = anchoring_credentials(cert)
+            _mark_certificate(entry, anchor_status='submitted')
+            receipt = add_signed_hash_to_chain(eth_private_key, eth_address, entry.signed_hash_keccak)
+            already_anchored = False
+    except Exception as e:
+        # Nothing is known to be on its way: show the certificate as waiting again
+        _mark_certificate(entry, anchor_status='pending')
+        _schedule_retry(entry, e)
+        return entry
+
+    if already_anchored:
+        _mark_certificate(entry, anchor_status='confirmed')
+    elif receipt is None:
+        _schedule_retry(entry, "No receipt received for anchoring transaction")
+        return entry
+    elif receipt.status != 1:
+        _mark_certificate(entry, anchor_status='failed', anchor_tx_hash=receipt.transactionHash.to_0x_hex(),
+                          anchor_block_number=receipt.blockNumber)
+        _schedule_retry(entry, f"Transaction {receipt.transactionHash.to_0x_hex()} reverted")
+        return entry
+    else:
+        _mark_certificate(entry, anchor_status='confirmed', anchor_tx_hash=receipt.transactionHash.to_0x_hex(),
+                          anchor_block_number=receipt.blockNumber)
+
+    remember_anchored('signed-hash', entry.signed_hash_keccak)
+    entry.status = 'done'
+    entry.last_error = ''
+    entry.save(update_fields=['status', 'attempts', 'last_error', 'updated_at'])
+    return entry
+
+
+def process_merkle_batch(entries, eth_private_key, eth_address):
+    """
+    Anchor a batch of claimed outbox rows with one transaction carrying the
+    Merkle root of their signed hashes, then store each certificate's
+    inclusion proof and the root it belongs to.
+    """
+    entries = [entry for entry in entries if not _superseded(entry)]
+    if not entries:
+        return entries
+    for entry in entries:
+        entry.attempts += 1
+
+    levels = build_merkle_tree([entry.signed_hash_keccak for entry in entries])
+    root = merkle_root(levels)
+    cert_ids = [entry.certificate_id for entry in entries]
+    # Certificates still signed with the hashes in this root (a re-sign may land while the root is sent)
+    current = Certificate.objects.filter(
+        pk__in=cert_ids, signed_hash_keccak__in=[entry.signed_hash_keccak for entry in entries]
+    )
+
+    try:
+        current.update(anchor_status='submitted')
+        receipt = add_merkle_root_to_chain(eth_private_key, eth_address, root, hash_count=len(entries))
+        if receipt is None:
+            raise RuntimeError(f"No receipt received for Merkle root {root}")
+        if receipt.status != 1:
+            raise RuntimeError(f"Transaction {receipt.transactionHash.to_0x_hex()} reverted")
+    except Exception as e:
+        current.update(anchor_status='pending')
+        for entry in entries:
+            _schedule_retry(entry, e)
+        return entries
+
+    certs = []
+    now = timezone.now()
+    current_ids = set(current.values_list('pk', flat=True))
+    for index, entry in enumerate(entries):
+        entry.status = 'done'
+        entry.last_error = ''
+        entry.updated_at = now
+        if entry.certificate_id not in current_ids:
+            continue
+        cert = entry.certificate
+        cert.merkle_root = root
+        cert.merkle_proof = merkle_proof(levels, index)
+        cert.anchor_status = 'confirmed'
+        cert.anchor_tx_hash = receipt.transactionHash.to_0x_hex()
+        cert.anchor_block_number = receipt.blockNumber
+        certs.append(cert)
+    Certificate.objects.bulk_update(
+        certs, ['merkle_root', 'merkle_proof', 'anchor_status', 'anchor_tx_hash', 'anchor_block_number']
+    )
+    AnchorOutbox.objects.bulk_update(entries, ['status', 'attempts', 'last_error', 'updated_at'])
+    remember_anchored('merkle-root', root)
+    logger.info("Anchored %s certificate(s) under Merkle root %s", len(entries), root)
+    return entries
+
+
+def _merkle_window_ready(batch_size):
+    # Anchor once a full batch is due, or once the oldest due row has waited a whole window
+    now = timezone.now()
+    due = AnchorOutbox.objects.filter(status='pending', next_attempt_at__lte=now)
+    if due.count() >= batch_size:
+        return True
+    oldest = due.order_by('created_at').values_list('created_at', flat=True).first()
+    return oldest is not None and oldest <= now - timedelta(seconds=settings.ANCHOR_MERKLE_WINDOW_SECONDS)
+
+
+def drain_outbox(batch_size=None, flush=False):
+    """
+    Claim and process one batch of due outbox rows.
+    In 'merkle' anchoring mode the batch is anchored as Merkle roots (one per
+    sending account) once the window is ready, or immediately with flush=True.
+    Returns the number of rows processed.
+    """
+    if settings.ANCHORING_MODE == 'merkle':
+        batch_size = batch_size or settings.ANCHOR_MERKLE_BATCH_SIZE
+        if not flush and not _merkle_window_ready(batch_size):
+            return 0
+        entries = claim_batch(batch_size)
+        # One root per sending account, since each root is a single transaction
+        groups = {}
+        for entry in entries:
+            groups.setdefault(anchoring_credentials(entry.certificate), []).append(entry)
+        for (eth_private_key, eth_address), group in groups.items():
+            process_merkle_batch(group, eth_private_key, eth_address)
+        return len(entries)
+
+    entries = claim_batch(batch_size or 20)
+    for entry in entries:
+        process_entry(entry)
+    return len(entries)
@@ -0,0 +1,226 @@
+# certificates/services/bulk_issuance.py
+
+import io
+import json
+import logging
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from web3 import Web3
+from accounts.services.signing_client import sign_many
+from certificates.models import AnchorOutbox, BulkIssuanceJob, Certificate, Student
+from certificates.services.hashing import generate_certificate_hash
+from certificates.services.student_import import chunks, iter_rows
+from institutions.models import Institution
+from institutions.services.key_registry import current_key_id
+
+logger = logging.getLogger(__name__)
+
+ROW_FIELDS = ('awardee_identifier', 'certificate_type', 'metadata', 'idempotency_key')
+
+
+def create_job(institution, source_name, source, certificate_type='', issuing_user=None):
+    """
+    Record an uploaded file of certificates as a pending job. Each row names the
+    awardee_identifier, optionally a certificate_type (default: the job's) and
+    the metadata: a JSON object (a JSON string in CSV), or in a CSV without a
+    metadata column, every other column (e.g. score, rank). An optional
+    idempotency_key column makes uploading the same rows again issue nothing new.
+    """
+    total_rows = sum(1 for _ in iter_rows(io.StringIO(source), jsonl=source_name.endswith('.jsonl')))
+    return BulkIssuanceJob.objects.create(
+        institution=institution,
+        issuing_user=issuing_user,
+        certificate_type=certificate_type,
+        source_name=source_name,
+        source=source,
+        total_rows=total_rows,
+    )
+
+
+def claim_job(job_id=None):
+    # Take the oldest pending job (or job_id) with a conditional UPDATE, so two workers never run the same job
+    candidates = BulkIssuanceJob.objects.filter(status='pending').order_by('id')
+    if job_id is not None:
+        candidates = candidates.filter(pk=job_id)
+    for candidate_id in candidates.values_list('id', flat=True)[:5]:
+        if BulkIssuanceJob.objects.filter(id=candidate_id, status='pending').update(status='running'):
+            return BulkIssuanceJob.objects.select_related('institution__institution_type').get(id=candidate_id)
+    return None
+
+
+def _parse(row, job):
+    # (identifier, certificate type, metadata, idempotency key) of one row; raises ValueError with the reason it is rejected
+    if '_error' in row:
+        raise ValueError(row['_error'])
+    identifier = str(row.get('awardee_identifier') or '').strip()
+    if not identifier:
+        raise ValueError("Missing awardee_identifier")
+    certificate_type = str(row.get('certificate_type') or '').strip() or job.certificate_type
+    if not certificate_type:
+        raise ValueError("Missing certificate_type")
+    if certificate_type not in job.institution.institution_type.allowed_certificate_types:
+        raise ValueError(f"{job.institution.institution_type.name} cannot issue {certificate_type} certificates")
+    if 'metadata' in row:
+        metadata = row['metadata']
+        if isinstance(metadata, str):
+            try:
+                metadata = json.loads(metadata)
+            except ValueError:
+                raise ValueError("Metadata is not valid JSON")
+    else:
+        metadata = {key: value for key, value in row.items() if key not in ROW_FIELDS and key and value not in ('', None)}
+    if not isinstance(metadata, dict) or not metadata:
+        raise ValueError("Metadata must be a non-empty JSON object")
+    idempotency_key = str(row.get('idempotency_key') or '').strip()
+    if len(idempotency_key) > 64:
+        raise ValueError("idempotency_key is longer than 64 characters")
+    return identifier, certificate_type, metadata, idempotency_key or None
+
+
+def _prepare_chunk(chunk, job):
+    """
+    Stages 1 and 2 for a chunk of (line number, row): resolve every awardee
+    and every idempotency key with one IN query each, and compute the
+    certificate hashes. Rows whose key was already issued are replays: they
+    are counted but not signed again.
+    Returns ([(line number, Certificate without signature)], [[line number, error]], replays).
+    """
+    parsed, errors = [], []
+    for line_number, row in chunk:
+        try:
+            parsed.append((line_number, *_parse(row, job)))
+        except ValueError as e:
+            errors.append([line_number, str(e)])
+
+    students = Student.objects.in_bulk({identifier for _, identifier, _, _, _ in parsed}, field_name='unique_identifier')
+    issued_keys = set(Certificate.objects.filter(
+        issuing_institution=job.institution, idempotency_key__in={key for *_, key in parsed if key}
+    ).values_list('idempotency_key', flat=True))
+    prepared = []
+    hashes = set()
+    replays = 0
+    for line_number, identifier, certificate_type, metadata, idempotency_key in parsed:
+        if idempotency_key in issued_keys:
+            replays += 1
+            continue
+        student = students.get(identifier)
+        if student is None:
+            errors.append([line_number, f"Unknown student {identifier}"])
+            continue
+        certificate_hash = generate_certificate_hash(
+            certificate_type=certificate_type,
+            institution_id=job.institution.unique_identifier,
+            student_id=identifier,
+            metadata=metadata,
+        )
+        if certificate_hash in hashes:
+            # Same row twice within one clock tick
+            errors.append([line_number, "Duplicate of an earlier row"])
+            continue
+        hashes.add(certificate_hash)
+        if idempotency_key:
+            issued_keys.add(idempotency_key)  # Later rows with the same key replay this one
+        prepared.append((line_number, Certificate(
+            certificate_type=certificate_type,
+            certificate_hash=certificate_hash,
+            issuing_institution=job.institution,
+            issuing_user=job.issuing_user,
+            student=student,
+            metadata=metadata,
+            idempotency_key=idempotency_key,
+        )))
+    return prepared, sorted(errors), replays
+
+
+def _write_chunk(job, certs, errors, replays, position, rows):
+    """
+    Stages 4 and 5: insert the chunk's certificates, queue them for anchoring
+    and advance the job, all in one transaction, so a row is either issued and
+    behind the job's position or neither.
+    """
+    while True:
+        try:
+            with transaction.atomic():
+                Certificate.objects.bulk_create(certs)
+                if any(cert.pk is None for cert in certs):
+                    # Backends without RETURNING (e.g. MySQL) leave pks unset: re-read them
+                    saved = Certificate.objects.in_bulk([cert.certificate_hash for cert in certs], field_name='certificate_hash')
+                    certs = [saved[cert.certificate_hash] for cert in certs]
+                if settings.USE_BLOCKCHAIN:
+                    # One outbox row per certificate; in merkle mode anchor_worker anchors them together under one root
+                    AnchorOutbox.objects.bulk_create([
+                        AnchorOutbox(certificate=cert, signed_hash_keccak=cert.signed_hash_keccak) for cert in certs
+                    ])
+                job.position = position
+                job.processed_rows += rows
+                job.issued += len(certs)
+                job.replayed += replays
+                job.errors.extend(errors)
+                job.save(update_fields=['position', 'processed_rows', 'issued', 'replayed', 'errors', 'updated_at'])
+            return
+        except IntegrityError:
+            # A concurrent request issued some of these idempotency keys first: those rows are replays now
+            taken = set(Certificate.objects.filter(
+                issuing_institution=job.institution,
+                idempotency_key__in=[cert.idempotency_key for cert in certs if cert.idempotency_key],
+            ).values_list('idempotency_key', flat=True))
+            if not taken:
+                raise
+            replays += sum(1 for cert in certs if cert.idempotency_key in taken)
+            certs = [cert for cert in certs if cert.idempotency_key not in taken]
+
+
+def run_job(job, chunk_size=None):
+    """
+    Issue the certificates of a claimed job in stages, one chunk of rows at a
+    time: resolve awardees with one IN query, hash, sign the chunk with one
+    sign_many call (the signing daemon spreads it over its workers), then
+    bulk_create the certificates and their anchoring outbox rows in one
+    transaction per chunk. Rejected rows are recorded on the job with their
+    line number instead of stopping it. Rows up to job.position are skipped,
+    so a job interrupted by a crash or Ctrl+C resumes where it stopped.
+    Yields the job after every chunk and marks it done at the end.
+    """
+    chunk_size = chunk_size or settings.BULK_ISSUANCE_CHUNK_SIZE
+    institution = Institution.objects.select_related('institution_type').get(pk=job.institution_id)
+    job.institution = institution
+    key_id = current_key_id(institution)
+    algorithm = institution.key_algorithm
+
+    rows = (
+        (line_number, row) for line_number, row in iter_rows(io.StringIO(job.source), jsonl=job.is_jsonl)
+        if line_number > job.position
+    )
+    try:
+        for chunk in chunks(rows, chunk_size):
+            prepared, errors, replays = _prepare_chunk(chunk, job)
+            certs = [cert for _, cert in prepared]
+
+            # Stage 3: sign the whole chunk in one round trip
+            signatures = sign_many([(institution, cert.certificate_hash) for cert in certs])
+            for cert, signature in zip(certs, signatures):
+                # Mirror Certificate.save, which bulk_create bypasses
+                cert.signed_hash = signature
+                cert.signed_hash_keccak = Web3.keccak(hexstr=signature).hex()
+                cert.signature_algorithm = algorithm
+                cert.signing_key_id = key_id
+
+            _write_chunk(job, certs, errors, replays, chunk[-1][0], len(chunk))
+            logger.info("Bulk issuance %s: issued %s of %s row(s) up to line %s",
+                        job.pk, len(certs), len(chunk), job.position)
+            yield job
+    except BaseException as e:
+        # Includes KeyboardInterrupt: the job stays resumable from its position
+        BulkIssuanceJob.objects.filter(pk=job.pk).update(
+            status='failed', last_error=str(e) or type(e).__name__, updated_at=timezone.now()
+        )
+        raise
+    job.status = 'done'
+    job.last_error = ''
+    job.save(update_fields=['status', 'last_error', 'updated_at'])
+
+
+def resume_job(job):
+    # Put a failed or stuck job back in the queue; its issued rows are kept
+    return BulkIssuanceJob.objects.filter(pk=job.pk).exclude(status='done').update(status='pending')
@@ -1,8 +1,6 @@
 # certificates/services/hashing.py
 
 from web3 import Web3
-from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.asymmetric import padding
 from django.utils import timezone
 import hashlib
 
@@ -38,23 +36,3 @@ def generate_certificate_hash(certificate_type, institution_id, student_id, meta
     }
     # Convert dict to string and hash it as solidity string type
     return Web3.solidity_keccak(['string'], [str(cert_info)]).hex()
-
-def sign_certificate(certificate_hash, private_key_pem):
-    """
-    Sign the given certificate hash (hex string) using an RSA private key in PEM format.
-    Returns the signature as a hex string.
-    """
-    private_key = serialization.load_pem_private_key(
-        private_key_pem.encode(),
-        password=None,
-    )
-    # Sign the raw bytes of the certificate hash string (encoded as utf-8)
-    signature = private_key.sign(
-        certificate_hash.encode(),
-        padding.PSS(
-            mgf=padding.MGF1(hashes.SHA256()),
-            salt_length=padding.PSS.MAX_LENGTH
-        ),
-        hashes.SHA256()
-    )
-    return signature.hex()
\ No newline at end of file
@@ -1,17 +1,44 @@
 # certificates/services/issuance.py
 
+from accounts.services.signing_client import sign_for
 from certificates.models import Certificate, DraftCertificate, Student
-from certificates.services.hashing import generate_certificate_hash, sign_certificate
-from blockchain.services.contract_service import add_signed_hash_to_chain
+from certificates.services.hashing import generate_certificate_hash
+from certificates.services.anchoring import enqueue_anchor
+from institutions.services.key_registry import current_key_id
 from django.conf import settings
+from django.db import IntegrityError, transaction
 
 USE_BLOCKCHAIN = settings.USE_BLOCKCHAIN
 
-def issue_certificate_service(institution, student, certificate_type, metadata, issuing_user=None):
+def find_replay(institution, idempotency_key, student, certificate_type, metadata):
+    # The certificate already issued by `institution` under this idempotency key, if any;
+    # the key reused for a different student, type or metadata is an error, not a replay
+    if not idempotency_key:
+        return None
+    replay = Certificate.objects.filter(issuing_institution=institution, idempotency_key=idempotency_key).first()
+    if replay is None:
+        return None
+    if (replay.student_id, replay.certificate_type, replay.metadata) != (student.pk, certificate_type, metadata):
+        raise ValueError(f"Idempotency key {idempotency_key} was already used for a different certificate")
+    return replay
+
+
+def issue_certificate_service(institution, student, certificate_type, metadata, issuing_user=None, idempotency_key=None):
     """
-    Issue a certificate by generating its hash, signing it, saving to DB,
-    and optionally adding the signed hash to the blockchain.
+    Issue a certificate by generating its hash, signing it and saving it to DB.
+    When blockchain is enabled, an outbox row is written in the same transaction;
+    the anchor_worker command adds the signed hash to the chain asynchronously.
+    With an idempotency_key, a retried request (double click, proxy retry) gets
+    the certificate issued the first time, without signing or anchoring again;
+    of two concurrent requests, the unique index lets only one insert.
     """
+    max_length = Certificate._meta.get_field('idempotency_key').max_length
+    if idempotency_key and len(idempotency_key) > max_length:
+        raise ValueError(f"Idempotency key is longer than {max_length} characters")
+    replay = find_replay(institution, idempotency_key, student, certificate_type, metadata)
+    if replay:
+        return replay
+
     # Generate the certificate hash using provided data
     certificate_hash = generate_certificate_hash(
         certificate_type=certificate_type,
@@ -19,40 +46,33 @@ def issue_certificate_service(institution, student, certificate_type, metadata,
         student_id=student.unique_identifier,
         metadata=metadata
     )
-    # Sign the certificate hash with institution's private key (PEM format)
-    signed_hash = sign_certificate(
-        certificate_hash=certificate_hash,
-        private_key_pem=institution.private_key
-    )
-    # Create and save the Certificate instance in the database
-    cert = Certificate.objects.create(
-        certificate_type=certificate_type,
-        certificate_hash=certificate_hash,
-        signed_hash=signed_hash,
-        issuing_institution=institution,
-        issuing_user=issuing_user,
-        student=student,
-        metadata=metadata
-    )
-
-    # Determine which Ethereum credentials to use for blockchain transaction
-    if issuing_user and hasattr(issuing_user, "ethereum_private_key"):
-        eth_private_key = issuing_user.ethereum_private_key
-        eth_address = issuing_user.ethereum_address
-    else:
-        eth_private_key = institution.ethereum_private_key
-        eth_address = institution.ethereum_address
-
-    # Add the signed hash to blockchain if enabled
-    if USE_BLOCKCHAIN:
-        try:
-            add_signed_hash_to_chain(
-                eth_private_key,
-                eth_address,
-                cert.signed_hash_keccak
+    # Sign the certificate hash with institution's key under its scheme (via the signing daemon if configured)
+    signed_hash = sign_for(institution, certificate_hash)
+    try:
+        with transaction.atomic():
+            # Create and save the Certificate instance in the database
+            cert = Certificate.objects.create(
+                certificate_type=certificate_type,
+                certificate_hash=certificate_hash,
+                signed_hash=signed_hash,
+                signature_algorithm=institution.key_algorithm,
+                signing_key_id=current_key_id(institution),  # Registry version of the key that signed it
+                issuing_institution=institution,
+                issuing_user=issuing_user,
+                student=student,
+                metadata=metadata,
+                idempotency_key=idempotency_key or None
             )
-        except Exception as e:
-            print(f"Failed to add signed hash to blockchain: {e}")
+
+            # Queue the signed hash for the anchoring worker if enabled
+            if USE_BLOCKCHAIN:
+                enqueue_anchor(cert)
+    except IntegrityError:
+        # A concurrent request with the same key committed first: its certificate is the answer
+        replay = find_replay(institution, idempotency_key, student, certificate_type, metadata)
+        if replay is None:
+            raise
+        return replay
 
     return cert
 
@@ -65,7 +85,8 @@ def confirm_certificate_from_draft(draft):
         institution=draft.issuing_institution,
         student=draft.student,
         certificate_type=draft.certificate_type,
-        metadata=draft.metadata
+        metadata=draft.metadata,
+        idempotency_key=f"draft:{draft.pk}"  # Confirming the same draft twice issues it once
     )
     draft.delete()
     return cert
\ No newline at end of file
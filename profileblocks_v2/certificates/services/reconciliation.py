@@ -0,0 +1,102 @@
+# certificates/services/reconciliation.py
+
+import logging
+import time
+from django.conf import settings
+from django.db import transaction
+from blockchain.models import SyncCheckpoint
+from blockchain.services.contract_service import remember_anchored
+from certificates.models import AnchorOutbox, Certificate
+from certificates.services.verification import verify_certificates_on_chain_batch
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_NAME = 'reconcile:anchors'
+
+
+def _requeue(certs):
+    # Reset the certificates to pending and queue them for the anchor worker, all in one transaction
+    with transaction.atomic():
+        Certificate.objects.filter(pk__in=[cert.pk for cert in certs]).update(
+            anchor_status='pending', anchor_tx_hash='', anchor_block_number=None, merkle_root='', merkle_proof=[]
+        )
+        AnchorOutbox.objects.bulk_create([
+            AnchorOutbox(certificate_id=cert.pk, signed_hash_keccak=cert.signed_hash_keccak) for cert in certs
+        ])
+
+
+def reconcile_anchors(chunk_size=None, rate=None, limit=None, restart=False, dry_run=False):
+    """
+    Walk all certificates in primary key order and re-anchor those whose hash
+    is missing on chain. Each chunk is checked in batched lookups; missing
+    certificates without an outbox row in flight are queued for anchor_worker
+    at no more than `rate` per second, and certificates found on chain are
+    marked confirmed. Progress is saved in a SyncCheckpoint after every chunk,
+    so an interrupted run resumes where it stopped (restart=True starts over).
+    Yields a stats dict per chunk.
+    """
+    chunk_size = chunk_size or settings.ANCHOR_RECONCILE_CHUNK_SIZE
+    rate = rate or settings.ANCHOR_RECONCILE_RATE
+    checkpoint, _ = SyncCheckpoint.objects.get_or_create(name=CHECKPOINT_NAME)
+    if restart:
+        checkpoint.position = 0
+    stats = {'position': checkpoint.position, 'scanned': 0, 'missing': 0, 'requeued': 0, 'in_flight': 0, 'confirmed': 0}
+    started = time.monotonic()
+
+    while limit is None or stats['requeued'] < limit:
+        # Keyset pagination: constant cost per chunk however deep into the table we are
+        certs = list(
+            Certificate.objects.filter(pk__gt=checkpoint.position)
+            .exclude(signed_hash_keccak='')
+            .order_by('pk')
+            .only('pk', 'certificate_hash', 'signed_hash_keccak', 'anchor_status', 'merkle_root', 'merkle_proof')[:chunk_size]
+        )
+        if not certs:
+            break
+
+        # Uncached: a cached result could hide an anchor lost to a reorg or a wiped chain
+        anchored = verify_certificates_on_chain_batch(certs, cached=False)
+        missing = [cert for cert in certs if not anchored[cert.certificate_hash]]
+        in_flight = set(
+            AnchorOutbox.objects.filter(
+                certificate_id__in=[cert.pk for cert in missing], status__in=['pending', 'processing']
+            ).values_list('certificate_id', flat=True)
+        )
+        to_requeue = [cert for cert in missing if cert.pk not in in_flight]
+        if limit is not None and len(to_requeue) > limit - stats['requeued']:
+            # Stop right after the last certificate we may queue so the next run picks up the rest
+            to_requeue = to_requeue[:limit - stats['requeued']]
+            certs = [cert for cert in certs if cert.pk <= to_requeue[-1].pk]
+            missing = [cert for cert in missing if cert.pk <= to_requeue[-1].pk]
+            in_flight = {pk for pk in in_flight if pk <= to_requeue[-1].pk}
+        # Anchored on chain but not recorded as such (e.g. the worker gave up before it was mined)
+        to_confirm = [cert for cert in certs if anchored[cert.certificate_hash] and cert.anchor_status != 'confirmed']
+
+        if not dry_run:
+            if to_requeue:
+                _requeue(to_requeue)
+            if to_confirm:
+                Certificate.objects.filter(pk__in=[cert.pk for cert in to_confirm]).update(anchor_status='confirmed')
+                for cert in to_confirm:
+                    if cert.merkle_root:
+                        remember_anchored('merkle-root', cert.merkle_root)
+                    else:
+                        remember_anchored('signed-hash', cert.signed_hash_keccak)
+        checkpoint.position = certs[-1].pk
+        if not dry_run:
+            checkpoint.save(update_fields=['position', 'updated_at'])
+
+        stats['position'] = checkpoint.position
+        stats['scanned'] += len(certs)
+        stats['missing'] += len(missing)
+        stats['in_flight'] += len(in_flight)
+        stats['requeued'] += len(to_requeue)
+        stats['confirmed'] += len(to_confirm)
+        if to_requeue:
+            logger.info("Queued %s certificate(s) for re-anchoring up to id %s", len(to_requeue), checkpoint.position)
+        yield dict(stats)
+
+        # Bounded rate: never queue faster than `rate` certificates per second on average
+        wait = stats['requeued'] / rate - (time.monotonic() - started)
+        if wait > 0 and not dry_run:
+            time.sleep(wait)
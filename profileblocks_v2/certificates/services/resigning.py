@@ -0,0 +1,152 @@
+# certificates/services/resigning.py
+
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
+import django
+from django.conf import settings
+from django.db import transaction
+from web3 import Web3
+from accounts.services.key_cache import key_owner
+from accounts.services.signing_client import sign_many
+from accounts.services.signing_service import sign_chunk
+from blockchain.models import SyncCheckpoint
+from certificates.models import AnchorOutbox, Certificate
+from institutions.models import Institution
+from institutions.services.key_registry import current_key_id
+
+logger = logging.getLogger(__name__)
+
+def checkpoint_name(institution_id, key_id):
+    # One resume position per institution and target key: a later rotation starts a fresh pass
+    return f"resign:{institution_id}:{key_id}"
+
+
+def certificates_to_resign(institution, key_id, position=0):
+    # The institution's certificates after `position` not yet signed with registry key `key_id`
+    return (
+        Certificate.objects.filter(issuing_institution=institution, pk__gt=position)
+        .exclude(signing_key_id=key_id)
+        .order_by('pk')
+    )
+
+
+def _sign_on_pool(pool, workers, institution, messages):
+    # Without a signing daemon: split the chunk into one slice per worker process
+    step = max(1, -(-len(messages) // workers))
+    slices = [messages[i:i + step] for i in range(0, len(messages), step)]
+    results = pool.map(
+        sign_chunk, repeat(institution.private_key), repeat(institution.key_algorithm),
+        repeat(key_owner(institution)), slices,
+    )
+    return [signature for signatures in results for signature in signatures]
+
+
+def _write(certs, signatures, key_id, algorithm):
+    # Store the new signatures and queue the new hashes for anchoring, all in one transaction
+    for cert, signature in zip(certs, signatures):
+        cert.signed_hash = signature
+        cert.signed_hash_keccak = Web3.keccak(hexstr=signature).hex()
+    pks = [cert.pk for cert in certs]
+    with transaction.atomic():
+        # Only the per-row values go through bulk_update (its CASE expressions cost per field);
+        # the columns shared by the whole chunk are set in one plain UPDATE
+        Certificate.objects.bulk_update(certs, ['signed_hash', 'signed_hash_keccak'])
+        Certificate.objects.filter(pk__in=pks).update(
+            signature_algorithm=algorithm, signing_key_id=key_id,
+            anchor_status='pending', anchor_tx_hash='', anchor_block_number=None, merkle_root='', merkle_proof=[]
+        )
+        # Rows still waiting with the old hash would only anchor a superseded signature; rows a worker
+        # has already claimed are dropped by anchoring.process_entry once it sees the new hash
+        AnchorOutbox.objects.filter(certificate_id__in=pks, status='pending').delete()
+        if settings.USE_BLOCKCHAIN:
+            AnchorOutbox.objects.bulk_create([
+                AnchorOutbox(certificate_id=cert.pk, signed_hash_keccak=cert.signed_hash_keccak) for cert in certs
+            ])
+
+
+def resign_certificates(institution, chunk_size=None, rate=None, duty_cycle=None, restart=False, workers=None):
+    """
+    Re-sign every certificate of `institution` not yet signed with its current
+    key, e.g. after regenerate_institution_keypair. Certificates are read in
+    primary key chunks; each chunk is signed while the previous chunk is
+    written with bulk_update, and the new hashes are queued for anchor_worker
+    in the same transaction. With SIGNING_SOCKET_PATH set a chunk goes to the
+    signing daemon through sign_many; otherwise it is split over a pool of
+    `workers` processes (default one per CPU).
+    Throttling: at most `rate` certificates per second, and the DB is kept
+    busy with writes for at most `duty_cycle` of the wall time. Progress is
+    saved in a SyncCheckpoint after every chunk, so an interrupted run resumes
+    where it stopped (restart=True starts over). Yields a stats dict per chunk.
+    """
+    chunk_size = chunk_size or settings.RESIGN_CHUNK_SIZE
+    rate = rate or settings.RESIGN_RATE
+    duty_cycle = duty_cycle or settings.RESIGN_DB_DUTY_CYCLE
+    workers = workers or os.cpu_count()
+
+    institution = Institution.objects.get(pk=institution.pk)  # Sign with the key as stored now
+    key_id = current_key_id(institution)
+    algorithm = institution.key_algorithm
+    checkpoint, _ = SyncCheckpoint.objects.get_or_create(name=checkpoint_name(institution.pk, key_id))
+    if restart:
+        checkpoint.position = 0
+    stats = {'key_id': key_id, 'position': checkpoint.position, 'resigned': 0, 'write_seconds': 0.0}
+    started = time.monotonic()
+    pool = None
+
+    def submit(certs):
+        # Sign a chunk on the signer thread: one sign_many round trip, or one slice per pool worker
+        messages = [cert.certificate_hash for cert in certs]
+        if pool:
+            return signer.submit(_sign_on_pool, pool, workers, institution, messages)
+        return signer.submit(sign_many, [(institution, message) for message in messages])
+
+    try:
+        if not settings.SIGNING_SOCKET_PATH and workers > 1:
+            # django.setup() configures Django in workers started with spawn rather than fork
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+        with ThreadPoolExecutor(max_workers=1) as signer:
+            fetch_position = checkpoint.position
+            pending = None  # (certs, future) being signed while the previous chunk is written
+            while True:
+                # Keyset pagination: constant cost per chunk however deep into the table we are
+                certs = list(
+                    certificates_to_resign(institution, key_id, fetch_position)
+                    .only('pk', 'certificate_hash')[:chunk_size]
+                )
+                upcoming = (certs, submit(certs)) if certs else None
+                if certs:
+                    fetch_position = certs[-1].pk
+
+                if pending:
+                    written, future = pending
+                    signatures = future.result()
+                    write_started = time.monotonic()
+                    _write(written, signatures, key_id, algorithm)
+                    checkpoint.position = written[-1].pk
+                    checkpoint.save(update_fields=['position', 'updated_at'])
+                    write_seconds = time.monotonic() - write_started
+
+                    stats['position'] = checkpoint.position
+                    stats['resigned'] += len(written)
+                    stats['write_seconds'] += write_seconds
+                    logger.info("Re-signed %s certificate(s) of institution %s up to id %s",
+                                len(written), institution.pk, checkpoint.position)
+                    yield dict(stats)
+
+                    # Throttle: average rate cap, and idle time in proportion to the time spent writing
+                    wait = max(
+                        stats['resigned'] / rate - (time.monotonic() - started),
+                        write_seconds * (1 / duty_cycle - 1),
+                    )
+                    if wait > 0:
+                        time.sleep(wait)
+
+                if upcoming is None:
+                    break
+                pending = upcoming
+    finally:
+        if pool:
+            pool.shutdown()
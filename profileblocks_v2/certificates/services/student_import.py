@@ -0,0 +1,207 @@
+# certificates/services/student_import.py
+
+import csv
+import datetime
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+from accounts.models import User
+from certificates.models import Student
+from certificates.services.hashing import generate_student_identifier
+
+logger = logging.getLogger(__name__)
+
+HKID_PREFIX = re.compile(r'^[A-Za-z]\d{3}$')  # Same rule as Student.clean
+ROSTER_FIELDS = ('firstname', 'lastname', 'hkid_prefix', 'date_of_birth')
+
+
+def iter_rows(f, jsonl=False):
+    # (line number, dict) for every row of an open CSV (header row) or JSONL file
+    if jsonl:
+        for line_number, line in enumerate(f, 1):
+            if line.strip():
+                try:
+                    yield line_number, json.loads(line)
+                except ValueError as e:
+                    yield line_number, {'_error': f"Invalid JSON: {e}"}
+    else:
+        for line_number, row in enumerate(csv.DictReader(f), 2):
+            yield line_number, row
+
+
+def read_roster(path):
+    """
+    Stream roster rows from a CSV (header row) or JSONL file as (line number, dict).
+    Columns: firstname, lastname, hkid_prefix, date_of_birth (YYYY-MM-DD), and
+    optionally username (default: the student's unique identifier) and password
+    (default: unusable, the student sets one through password reset).
+    """
+    with open(path, newline='') as f:
+        yield from iter_rows(f, jsonl=path.endswith('.jsonl'))
+
+
+def _hash_passwords(passwords):
+    # Runs in a pool worker: PBKDF2 is the expensive part of creating a user
+    return [make_password(password or None) for password in passwords]
+
+
+def chunks(rows, size):
+    # Lists of up to `size` consecutive items of an iterable, read lazily
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_chunk(rows, seen_identifiers, seen_usernames):
+    """
+    Validate a chunk of (line number, row) in one pass: field checks per row,
+    then identifier and username collisions against the rest of the file
+    (seen_* sets, updated here) and against the DB with one query each.
+    Returns (valid rows, skipped count, [(line number, error)]). Students whose
+    identifier already exists are skipped rather than reported, so a roster can
+    be imported again after an interruption.
+    """
+    today = timezone.now().date()
+    errors = []
+    parsed = []
+    for line_number, row in rows:
+        if '_error' in row:
+            errors.append((line_number, row['_error']))
+            continue
+        values = {field: str(row.get(field) or '').strip() for field in ROSTER_FIELDS}
+        missing = [field for field in ROSTER_FIELDS if not values[field]]
+        if missing:
+            errors.append((line_number, f"Missing {', '.join(missing)}"))
+            continue
+        if not HKID_PREFIX.match(values['hkid_prefix']):
+            errors.append((line_number, f"HKID prefix {values['hkid_prefix']!r} must be one letter and three digits"))
+            continue
+        try:
+            date_of_birth = datetime.date.fromisoformat(values['date_of_birth'])
+        except ValueError:
+            errors.append((line_number, f"Date of birth {values['date_of_birth']!r} is not YYYY-MM-DD"))
+            continue
+        if date_of_birth > today:
+            errors.append((line_number, "Date of birth cannot be in the future"))
+            continue
+        identifier = generate_student_identifier(
+            values['firstname'], values['lastname'], values['hkid_prefix'], date_of_birth
+        )
+        username = str(row.get('username') or '').strip() or identifier
+        if len(username) > User._meta.get_field('username').max_length:
+            errors.append((line_number, f"Username {username!r} is too long"))
+            continue
+        parsed.append((line_number, dict(
+            values, date_of_birth=date_of_birth, unique_identifier=identifier,
+            username=username, password=row.get('password') or '',
+        )))
+
+    # Student identifiers are also the users' unique_identifier, so one lookup covers both tables
+    existing_identifiers = set(User.objects.filter(
+        unique_identifier__in=[row['unique_identifier'] for _, row in parsed]
+    ).values_list('unique_identifier', flat=True))
+    taken_usernames = set(User.objects.filter(
+        username__in=[row['username'] for _, row in parsed]
+    ).values_list('username', flat=True))
+
+    valid = []
+    skipped = 0
+    for line_number, row in parsed:
+        if row['unique_identifier'] in existing_identifiers:
+            skipped += 1
+        elif row['unique_identifier'] in seen_identifiers:
+            errors.append((line_number, "Same student as an earlier row"))
+        elif row['username'] in taken_usernames or row['username'] in seen_usernames:
+            errors.append((line_number, f"Username {row['username']!r} already exists"))
+        else:
+            valid.append(row)
+        seen_identifiers.add(row['unique_identifier'])
+        seen_usernames.add(row['username'])
+    return valid, skipped, sorted(errors)
+
+
+def _create_chunk(rows, password_hashes):
+    # Mirror StudentSignupForm.save, which bulk_create bypasses
+    users = [
+        User(
+            username=row['username'],
+            password=password_hash,
+            user_type='student',
+            unique_identifier=row['unique_identifier'],
+        )
+        for row, password_hash in zip(rows, password_hashes)
+    ]
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        if any(user.pk is None for user in users):
+            # Backends without RETURNING (e.g. MySQL) leave pks unset: re-read them
+            saved = User.objects.in_bulk([user.username for user in users], field_name='username')
+            users = [saved[user.username] for user in users]
+        Student.objects.bulk_create([
+            Student(
+                user=user,
+                firstname=row['firstname'],
+                lastname=row['lastname'],
+                hkid_prefix=row['hkid_prefix'],
+                date_of_birth=row['date_of_birth'],
+                unique_identifier=row['unique_identifier'],
+                # No keys: they are created on first profile signing (Student.ensure_keypair)
+            )
+            for row, user in zip(rows, users)
+        ])
+
+
+def import_students(rows, chunk_size=None, workers=None, dry_run=False):
+    """
+    Create students and their user accounts from roster rows (see read_roster).
+    Rows are validated and created one chunk at a time, each chunk with two
+    bulk_create calls in its own transaction, so a failure loses at most one
+    chunk and a re-run skips the students already created. Passwords given in
+    the roster are hashed on a pool of `workers` processes (default one per
+    CPU). Yields a stats dict after every chunk; errors are (line, message).
+    """
+    chunk_size = chunk_size or settings.STUDENT_IMPORT_CHUNK_SIZE
+    workers = workers or os.cpu_count()
+    stats = {'rows': 0, 'created': 0, 'skipped': 0, 'errors': []}
+    seen_identifiers, seen_usernames = set(), set()
+    pool = None
+    try:
+        for chunk in chunks(rows, chunk_size):
+            valid, skipped, errors = validate_chunk(chunk, seen_identifiers, seen_usernames)
+            stats['rows'] += len(chunk)
+            stats['skipped'] += skipped
+            stats['errors'].extend(errors)
+
+            if valid and not dry_run:
+                passwords = [row['password'] for row in valid]
+                if workers > 1 and any(passwords):
+                    # django.setup() lets spawned (not forked) workers import this module's models
+                    pool = pool or ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+                    step = max(1, -(-len(passwords) // workers))
+                    password_hashes = [
+                        password_hash
+                        for hashes in pool.map(_hash_passwords, [passwords[i:i + step] for i in range(0, len(passwords), step)])
+                        for password_hash in hashes
+                    ]
+                else:
+                    password_hashes = _hash_passwords(passwords)
+                _create_chunk(valid, password_hashes)
+            stats['created'] += len(valid)
+            logger.info("Imported %s of %s roster row(s), %s skipped, %s error(s)",
+                        len(valid), len(chunk), skipped, len(errors))
+            yield dict(stats, errors=list(stats['errors']))
+    finally:
+        if pool:
+            pool.shutdown()
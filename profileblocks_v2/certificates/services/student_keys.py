@@ -0,0 +1,38 @@
+# certificates/services/student_keys.py
+
+from django.db.models import Exists, OuterRef, Q
+from certificates.models import Student
+from profiles.models import CertificateProfile
+
+
+def students_with_unused_keys():
+    # Students holding a keypair that never signed a profile (keys used to be created at signup)
+    return Student.objects.filter(
+        ~Q(private_key__isnull=True), ~Q(private_key=''),
+        ~Exists(CertificateProfile.objects.filter(student=OuterRef('pk'))),
+    )
+
+
+def drop_unused_student_keys(chunk_size=1000, dry_run=False):
+    """
+    Clear the keypair of every student that has never signed a profile; the
+    next profile signing creates a fresh one (Student.ensure_keypair). Students
+    are handled in primary key chunks, and the profile check is repeated in the
+    UPDATE itself, so a student whose first profile lands meanwhile keeps the key.
+    Yields (position, keys dropped so far) per chunk.
+    """
+    position = dropped = 0
+    while True:
+        pks = list(
+            students_with_unused_keys().filter(pk__gt=position).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+        )
+        if not pks:
+            break
+        position = pks[-1]
+        if dry_run:
+            dropped += len(pks)
+        else:
+            dropped += students_with_unused_keys().filter(pk__in=pks).update(
+                public_key=None, private_key=None
+            )
+        yield position, dropped
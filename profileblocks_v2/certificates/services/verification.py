@@ -1,10 +1,16 @@
 # certificates/services/verification.py
 
-from blockchain.services.contract_service import verify_signed_hash_on_chain
+from blockchain.services.contract_service import (
+    cached_verify_merkle_root, cached_verify_signed_hash, cached_verify_signed_hashes, verify_merkle_root_on_chain,
+    verify_signed_hash_on_chain, verify_signed_hashes_on_chain
+)
+from blockchain.services.event_indexer import find_anchor
+from blockchain.services.merkle import verify_merkle_proof
+from accounts.services.key_cache import key_owner
+from accounts.services.signature_schemes import verify
 from certificates.models import Certificate
-from cryptography.hazmat.primitives import hashes, serialization
-from cryptography.hazmat.primitives.asymmetric import padding
-import binascii
+from institutions.services.key_registry import public_key_for, registry_key_owner
+from django.conf import settings
 
 def verify_certificate_db_only(certificate_hash):
     """
@@ -38,6 +44,33 @@ def verify_certificate_on_chain(certificate_hash):
         return False
     
 
+def verify_certificates_on_chain_batch(certificates, cached=True):
+    """
+    On-chain check for many certificates at once (e.g. all certificates of a profile).
+    Directly anchored hashes are checked in one batched lookup; Merkle-batched
+    certificates verify their proof locally and look up each distinct root once.
+    cached=False asks the node every time (e.g. reconciliation, which must not
+    trust a stale result). Returns a dict mapping certificate_hash to True/False.
+    """
+    verify_hashes = cached_verify_signed_hashes if cached else verify_signed_hashes_on_chain
+    verify_root = cached_verify_merkle_root if cached else verify_merkle_root_on_chain
+    direct = [cert for cert in certificates if not cert.merkle_root]
+    anchored = verify_hashes([cert.signed_hash_keccak for cert in direct])
+    results = {cert.certificate_hash: anchored.get(cert.signed_hash_keccak, False) for cert in direct}
+
+    roots = {}
+    for cert in certificates:
+        if not cert.merkle_root:
+            continue
+        if cert.merkle_root not in roots:
+            roots[cert.merkle_root] = verify_root(cert.merkle_root)
+        results[cert.certificate_hash] = (
+            roots[cert.merkle_root]
+            and verify_merkle_proof(cert.signed_hash_keccak, cert.merkle_proof, cert.merkle_root)
+        )
+    return results
+
+
 def verify_certificate_full(certificate_hash):
     """
     Stepwise verification:
@@ -48,28 +81,43 @@ def verify_certificate_full(certificate_hash):
     try:
         cert = Certificate.objects.get(certificate_hash=certificate_hash)
     except Certificate.DoesNotExist:
-        return {'db': False, 'signature': False, 'on_chain': False}
+        return {'db': False, 'signature': False, 'on_chain': False, 'anchored_at': None}
 
     # 1. DB check
     db_ok = True
 
-    # 2. Signature verification
-    try:
-        pubkey = serialization.load_pem_public_key(cert.issuing_institution.public_key.encode())
-        pubkey.verify(
-            binascii.unhexlify(cert.signed_hash),
-            cert.certificate_hash.encode(),
-            padding.PSS(
-                mgf=padding.MGF1(hashes.SHA256()),
-                salt_length=padding.PSS.MAX_LENGTH
-            ),
-            hashes.SHA256()
-        )
-        signature_ok = True
-    except Exception:
-        signature_ok = False
+    # 2. Signature verification under the scheme the certificate was signed with, so RSA-PSS
+    #    certificates keep verifying alongside Ed25519 ones. The key is the registry version
+    #    recorded at signing (one cached fetch, unaffected by later rotations); certificates
+    #    predating the registry use the institution's current key.
+    if cert.signing_key_id:
+        public_key, _ = public_key_for(cert.signing_key_id)
+        owner = registry_key_owner(cert.signing_key_id)
+    else:
+        public_key = cert.issuing_institution.public_key
+        owner = key_owner(cert.issuing_institution)
+    signature_ok = verify(
+        cert.certificate_hash, cert.signed_hash, public_key, algorithm=cert.signature_algorithm, owner=owner
+    )
 
-    # 3. On-chain check (use signed_hash_keccak)
-    on_chain_ok = verify_signed_hash_on_chain(cert.signed_hash_keccak)
+    # 3. On-chain check. The local event index answers without an RPC call when it has
+    #    the anchored value; Merkle-batched certificates must also prove inclusion under
+    #    their root. Hashes the indexer has not reached yet fall back to the contract.
+    anchor = find_anchor(cert.merkle_root or cert.signed_hash_keccak)
+    if cert.merkle_root and not verify_merkle_proof(cert.signed_hash_keccak, cert.merkle_proof, cert.merkle_root):
+        on_chain_ok = False
+    elif anchor:
+        on_chain_ok = True
+    elif settings.CHAIN_INDEX_ONLY:
+        on_chain_ok = False
+    elif cert.merkle_root:
+        on_chain_ok = cached_verify_merkle_root(cert.merkle_root)
+    else:
+        on_chain_ok = cached_verify_signed_hash(cert.signed_hash_keccak)
 
-    return {'db': db_ok, 'signature': signature_ok, 'on_chain': on_chain_ok}
\ No newline at end of file
+    return {
+        'db': db_ok,
+        'signature': signature_ok,
+        'on_chain': on_chain_ok,
+        'anchored_at': anchor.anchored_at.isoformat() if anchor else None,  # When the anchor was mined, if indexed
+    }
\ No newline at end of file
@@ -1,9 +1,546 @@
 # certificates/tests.py
-from django.test import TestCase
+import datetime
+import multiprocessing
+from datetime import timedelta
+from unittest import mock
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import User
+from accounts.services.signature_schemes import verify
+from accounts.services.signing_client import sign_many
+from blockchain.models import SyncCheckpoint
 from blockchain.services.web3_utils import check_connection
+from certificates.models import AnchorOutbox, BulkIssuanceJob, Certificate, Student
+from certificates.services import anchoring
+from certificates.services import issuance
+from certificates.services import reconciliation
+from certificates.services import resigning
+from certificates.services.bulk_issuance import claim_job, create_job, run_job
+from certificates.services.resigning import resign_certificates
+from certificates.services.student_import import _create_chunk, import_students, validate_chunk
+from certificates.services.student_keys import drop_unused_student_keys
+from certificates.services.verification import verify_certificate_full
+from institutions.models import Institution, InstitutionType
+from profiles.models import CertificateProfile
 
 class BlockchainConnectionTest(TestCase):
     def test_web3_connection(self):
         """Test if we can connect to the Sepolia testnet"""
         is_connected = check_connection()
-        self.assertTrue(is_connected)
\ No newline at end of file
+        self.assertTrue(is_connected)
+
+
+def make_institution(name='HKU'):
+    kind, _ = InstitutionType.objects.get_or_create(
+        name='tertiary level', defaults={'allowed_certificate_types': ['certificate', 'academic_results']}
+    )
+    return Institution.objects.create(name=name, full_name='The University', institution_type=kind)
+
+
+def make_student(username='student', firstname='Tai Man'):
+    user = User.objects.create_user(username=username, password='x', user_type='student')
+    return Student.objects.create(
+        user=user, firstname=firstname, lastname='Chan', hkid_prefix='A123', date_of_birth=datetime.date(2000, 1, 1)
+    )
+
+
+class SupersededAnchorTest(TransactionTestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.cert = Certificate.objects.create(
+            certificate_type='certificate', issuing_institution=self.institution,
+            student=make_student(), metadata={'score': 1},
+        )
+        self.old_hash = self.cert.signed_hash_keccak
+        AnchorOutbox.objects.create(certificate=self.cert, signed_hash_keccak=self.old_hash)
+
+    def _resign(self):
+        self.institution.regenerate_keypair()
+        with override_settings(SIGNING_SOCKET_PATH='', USE_BLOCKCHAIN=True):
+            list(resign_certificates(self.institution, rate=10 ** 6, duty_cycle=1))
+        return Certificate.objects.get(pk=self.cert.pk).signed_hash_keccak
+
+    def test_claimed_row_for_a_resigned_certificate_is_dropped(self):
+        """A row claimed before the re-sign never sends the superseded hash"""
+        claimed = anchoring.claim_batch(10)
+        new_hash = self._resign()
+        self.assertNotEqual(new_hash, self.old_hash)
+        entry = AnchorOutbox.objects.select_related('certificate').get(pk=claimed[0].pk)
+        with mock.patch.object(anchoring, 'add_signed_hash_to_chain') as send:
+            anchoring.process_entry(entry)
+        send.assert_not_called()
+        self.assertEqual(
+            list(AnchorOutbox.objects.values_list('signed_hash_keccak', 'status')), [(new_hash, 'pending')]
+        )
+
+    def test_resign_during_send_keeps_the_new_hash_pending(self):
+        """A superseded hash mined after the re-sign does not mark the certificate confirmed"""
+        entry = anchoring.claim_batch(10)[0]
+        receipt = mock.Mock(status=1, blockNumber=7)
+        receipt.transactionHash.to_0x_hex.return_value = '0xabc'
+
+        def send(*args):
+            self._resign()
+            return receipt
+
+        with mock.patch.object(anchoring, 'add_signed_hash_to_chain', side_effect=send), \
+                mock.patch.object(anchoring, 'remember_anchored'):
+            anchoring.process_entry(entry)
+        cert = Certificate.objects.get(pk=self.cert.pk)
+        self.assertEqual((cert.anchor_status, cert.anchor_tx_hash), ('pending', ''))
+        self.assertTrue(
+            AnchorOutbox.objects.filter(signed_hash_keccak=cert.signed_hash_keccak, status='pending').exists()
+        )
+
+    def test_merkle_batch_skips_superseded_rows(self):
+        """A superseded row is left out of the Merkle root and its certificate is not marked confirmed"""
+        claimed = anchoring.claim_batch(10)
+        new_hash = self._resign()
+        entry = AnchorOutbox.objects.select_related('certificate').get(pk=claimed[0].pk)
+        with mock.patch.object(anchoring, 'add_merkle_root_to_chain') as send:
+            self.assertEqual(anchoring.process_merkle_batch([entry], '0xkey', '0xaddress'), [])
+        send.assert_not_called()
+        self.assertEqual(Certificate.objects.get(pk=self.cert.pk).anchor_status, 'pending')
+        self.assertEqual(list(AnchorOutbox.objects.values_list('signed_hash_keccak', flat=True)), [new_hash])
+
+
+@override_settings(SIGNING_SOCKET_PATH='', SIGNATURE_ALGORITHM='ed25519')
+class ResigningTest(TransactionTestCase):
+    def test_chunks_are_signed_on_a_process_pool_without_a_daemon(self):
+        """With no signing daemon every chunk is split over the worker processes and signed with the new key"""
+        institution = make_institution()
+        student = make_student()
+        for score in range(5):
+            Certificate.objects.create(
+                certificate_type='certificate', issuing_institution=institution, student=student,
+                metadata={'score': score},
+            )
+        institution.regenerate_keypair()
+        with mock.patch.object(resigning, 'sign_many', side_effect=AssertionError('signed on one thread')):
+            stats = list(resign_certificates(institution, chunk_size=3, rate=10 ** 6, duty_cycle=1, workers=2))
+        self.assertEqual([chunk['resigned'] for chunk in stats], [3, 5])
+        key_id = stats[-1]['key_id']
+        for cert in Certificate.objects.all():
+            self.assertEqual(cert.signing_key_id, key_id)
+            self.assertTrue(
+                verify(cert.certificate_hash, cert.signed_hash, institution.public_key, algorithm='ed25519')
+            )
+
+
+class BulkIssuanceTest(TransactionTestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.students = [make_student('first', 'Tai Man'), make_student('second', 'Siu Ming')]
+
+    def _job(self, rows):
+        lines = ['awardee_identifier,score'] + [f"{student.unique_identifier},{score}" for student, score in rows]
+        return create_job(self.institution, 'results.csv', '\n'.join(lines) + '\n', certificate_type='certificate')
+
+    @override_settings(SIGNING_SOCKET_PATH='', USE_BLOCKCHAIN=True)
+    def test_run_job_signs_every_certificate_with_the_institution_key(self):
+        """Each chunk is signed through sign_many and queued for anchoring"""
+        job = self._job([(self.students[0], 90), (self.students[1], 80), (self.students[0], 70)])
+        with mock.patch('certificates.services.bulk_issuance.sign_many', wraps=sign_many) as signer:
+            list(run_job(claim_job(job.pk), chunk_size=2))
+        self.assertEqual([len(call.args[0]) for call in signer.call_args_list], [2, 1])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.issued, job.errors), ('done', 3, []))
+        for cert in Certificate.objects.all():
+            self.assertTrue(verify(cert.certificate_hash, cert.signed_hash, self.institution.public_key,
+                                   algorithm=cert.signature_algorithm))
+        self.assertEqual(AnchorOutbox.objects.count(), 3)
+
+    def test_upload_already_claimed_by_the_worker(self):
+        """A small upload the worker claimed first is left to it instead of failing the request"""
+        user = User.objects.create_user(username='registrar', password='x', user_type='institution')
+        self.institution.user = user
+        self.institution.save()
+        self.client.force_login(user)
+        source = f"awardee_identifier,score\n{self.students[0].unique_identifier},90\n"
+        upload = SimpleUploadedFile('results.csv', source.encode())
+        with mock.patch('certificates.views.claim_job', return_value=None), \
+                mock.patch('certificates.views.run_job') as run:
+            response = self.client.post(
+                reverse('bulk_issue_certificates'), {'file': upload, 'certificate_type': 'certificate'}
+            )
+        job = BulkIssuanceJob.objects.get()
+        self.assertRedirects(response, reverse('bulk_issuance_job', args=[job.pk]), fetch_redirect_response=False)
+        run.assert_not_called()
+
+
+@override_settings(SIGNING_SOCKET_PATH='')
+class IdempotentIssuanceTest(TransactionTestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.student = make_student()
+
+    def _issue(self, key, metadata=None, student=None):
+        return issuance.issue_certificate_service(
+            self.institution, student or self.student, 'certificate', metadata or {'score': 90}, idempotency_key=key
+        )
+
+    def test_retry_returns_the_first_certificate(self):
+        """The same key and certificate data issue once; the retry is not signed again"""
+        first = self._issue('confirm-1')
+        with mock.patch.object(issuance, 'sign_for') as signer:
+            self.assertEqual(self._issue('confirm-1'), first)
+        signer.assert_not_called()
+        self.assertEqual(Certificate.objects.count(), 1)
+
+    def test_reused_key_for_different_data_is_rejected(self):
+        """A key already used for another student, type or metadata is an error, not a replay"""
+        self._issue('confirm-1')
+        with self.assertRaisesMessage(ValueError, 'already used for a different certificate'):
+            self._issue('confirm-1', metadata={'score': 10})
+        with self.assertRaisesMessage(ValueError, 'already used for a different certificate'):
+            self._issue('confirm-1', student=make_student('other', 'Siu Ming'))
+        self.assertEqual(Certificate.objects.count(), 1)
+
+    def test_over_long_key_is_rejected(self):
+        """Keys longer than the column are refused instead of truncated onto another key"""
+        with self.assertRaisesMessage(ValueError, 'longer than 64 characters'):
+            self._issue('k' * 65)
+        self.assertFalse(Certificate.objects.exists())
+
+    def test_concurrent_insert_returns_the_winner(self):
+        """When a concurrent request inserts the same key first, the unique index makes this one a replay"""
+        winner = []
+
+        def sign_after_the_other_request(holder, message):
+            if signer.call_count == 1:  # The outer request: the other one commits while it signs
+                winner.append(self._issue('confirm-1'))
+            return sign_many([(holder, message)])[0]
+
+        with mock.patch.object(issuance, 'sign_for', side_effect=sign_after_the_other_request) as signer:
+            self.assertEqual(self._issue('confirm-1'), winner[0])
+        self.assertEqual(Certificate.objects.count(), 1)
+
+    def test_bulk_chunk_turns_keys_issued_meanwhile_into_replays(self):
+        """Rows whose key a concurrent request issued during signing are replayed, the rest inserted"""
+        other = make_student('other', 'Siu Ming')
+        source = (
+            "awardee_identifier,score,idempotency_key\n"
+            f"{self.student.unique_identifier},90,row-1\n{other.unique_identifier},80,row-2\n"
+        )
+        job = create_job(self.institution, 'results.csv', source, certificate_type='certificate')
+
+        def sign_after_the_other_request(items):
+            if not Certificate.objects.exists():
+                self._issue('row-1')
+            return sign_many(items)
+
+        with mock.patch('certificates.services.bulk_issuance.sign_many', side_effect=sign_after_the_other_request):
+            list(run_job(claim_job(job.pk)))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.issued, job.replayed, job.errors), ('done', 1, 1, []))
+        self.assertEqual(
+            sorted(Certificate.objects.values_list('idempotency_key', flat=True)), ['row-1', 'row-2']
+        )
+
+
+@override_settings(SIGNATURE_ALGORITHM='ed25519')
+class StudentKeyTest(TransactionTestCase):
+    def setUp(self):
+        self.student = make_student()
+
+    def test_racing_first_signings_agree_on_one_key(self):
+        """Two instances loaded before either had a key end up with the key stored first"""
+        first = Student.objects.get(pk=self.student.pk)
+        second = Student.objects.get(pk=self.student.pk)
+        first.ensure_keypair()
+        second.ensure_keypair()
+        stored = Student.objects.get(pk=self.student.pk)
+        self.assertEqual(first.private_key, stored.private_key)
+        self.assertEqual(second.private_key, stored.private_key)
+        self.assertEqual(second.public_key, stored.public_key)
+
+    def test_stale_keyless_save_keeps_the_key(self):
+        """Saving an instance loaded before the key was created does not blank it"""
+        stale = Student.objects.get(pk=self.student.pk)
+        key = Student.objects.get(pk=self.student.pk).ensure_keypair().private_key
+        stale.firstname = 'Tai Wai'
+        stale.save()
+        stored = Student.objects.get(pk=self.student.pk)
+        self.assertEqual((stored.firstname, stored.private_key), ('Tai Wai', key))
+
+    def test_drop_unused_keys_spares_students_with_profiles(self):
+        """Only keys that never signed a profile are dropped"""
+        with_profile = make_student('profiled', 'Siu Ming')
+        for student in (self.student, with_profile):
+            student.ensure_keypair()
+        CertificateProfile.objects.create(id='p1', student=with_profile, name='CV', signed_profile_hash='0x1')
+        self.assertEqual(list(drop_unused_student_keys()), [(self.student.pk, 1)])
+        self.assertIsNone(Student.objects.get(pk=self.student.pk).private_key)
+        self.assertEqual(Student.objects.get(pk=with_profile.pk).private_key, with_profile.private_key)
+
+
+class StudentImportTest(TransactionTestCase):
+    def _row(self, firstname='Tai Man', **fields):
+        return dict({'firstname': firstname, 'lastname': 'Chan', 'hkid_prefix': 'A123', 'date_of_birth': '2000-01-01'},
+                    **fields)
+
+    def test_field_errors_are_reported_with_their_line(self):
+        """Bad HKID prefixes and dates are rejected per row, the other rows stay valid"""
+        rows = [
+            (2, self._row(hkid_prefix='1234')),
+            (3, self._row(date_of_birth='01/01/2000')),
+            (4, self._row(date_of_birth='2999-01-01')),
+            (5, self._row(firstname='Siu Ming')),
+        ]
+        valid, skipped, errors = validate_chunk(rows, set(), set())
+        self.assertEqual([row['firstname'] for row in valid], ['Siu Ming'])
+        self.assertEqual(skipped, 0)
+        self.assertEqual([line for line, _ in errors], [2, 3, 4])
+        self.assertIn('one letter and three digits', errors[0][1])
+        self.assertIn('not YYYY-MM-DD', errors[1][1])
+        self.assertIn('in the future', errors[2][1])
+
+    def test_duplicates_within_the_file_and_against_the_db(self):
+        """Same student twice, or a username already taken, is an error on the later row"""
+        make_student('taken')
+        rows = [
+            (2, self._row(firstname='Siu Ming')),
+            (3, self._row(firstname='Siu Ming', username='other')),
+            (4, self._row(firstname='Ka Ho', username='taken')),
+            (5, self._row(firstname='Wing', username='siu')),
+        ]
+        seen_identifiers, seen_usernames = set(), {'siu'}
+        valid, _, errors = validate_chunk(rows, seen_identifiers, seen_usernames)
+        self.assertEqual([row['firstname'] for row in valid], ['Siu Ming'])
+        self.assertEqual(errors, [
+            (3, "Same student as an earlier row"),
+            (4, "Username 'taken' already exists"),
+            (5, "Username 'siu' already exists"),
+        ])
+        self.assertEqual(len(seen_identifiers), 3)
+
+    def test_rerun_skips_students_already_created(self):
+        """Importing the same roster again creates nothing and reports no errors"""
+        rows = [(2, self._row()), (3, self._row(firstname='Siu Ming', password='secret'))]
+        first = list(import_students(iter(rows), workers=1))[-1]
+        again = list(import_students(iter(rows), workers=1))[-1]
+        self.assertEqual((first['created'], first['errors']), (2, []))
+        self.assertEqual((again['created'], again['skipped'], again['errors']), (0, 2, []))
+        self.assertEqual(Student.objects.count(), 2)
+        self.assertTrue(User.objects.get(student__firstname='Siu Ming').check_password('secret'))
+
+    def test_passwords_are_hashed_on_spawned_workers(self):
+        """The hashing pool also works when worker processes are spawned rather than forked"""
+        rows = [(2, self._row(password='secret')), (3, self._row(firstname='Siu Ming', password='other'))]
+        get_context = multiprocessing.get_context
+        with mock.patch('multiprocessing.get_context', side_effect=lambda method=None: get_context(method or 'spawn')):
+            stats = list(import_students(iter(rows), workers=2))[-1]
+        self.assertEqual((stats['created'], stats['errors']), (2, []))
+        self.assertTrue(User.objects.get(student__firstname='Tai Man').check_password('secret'))
+        self.assertTrue(User.objects.get(student__firstname='Siu Ming').check_password('other'))
+
+    def test_users_are_read_back_when_bulk_create_leaves_pks_unset(self):
+        """Without RETURNING support the users' pks are re-read before the students are created"""
+        valid, _, _ = validate_chunk([(2, self._row()), (3, self._row(firstname='Siu Ming'))], set(), set())
+        bulk_create = User.objects.bulk_create
+
+        def bulk_create_without_pks(users, *args, **kwargs):
+            created = bulk_create(users, *args, **kwargs)
+            for user in users:
+                user.pk = None
+            return created
+
+        with mock.patch.object(User.objects, 'bulk_create', side_effect=bulk_create_without_pks):
+            _create_chunk(valid, ['!', '!'])
+        for student in Student.objects.select_related('user'):
+            self.assertEqual(student.user.unique_identifier, student.unique_identifier)
+        self.assertEqual(Student.objects.count(), 2)
+
+
+@override_settings(SIGNING_SOCKET_PATH='', CHAIN_INDEX_ONLY=True)
+class MixedAlgorithmVerificationTest(TransactionTestCase):
+    def test_rsa_and_ed25519_certificates_verify_side_by_side(self):
+        """Certificates signed before and after a switch to Ed25519 both verify under their own scheme"""
+        institution = make_institution()
+        student = make_student()
+        rsa_cert = issuance.issue_certificate_service(institution, student, 'certificate', {'score': 1})
+        with override_settings(SIGNATURE_ALGORITHM='ed25519'):
+            institution.regenerate_keypair()
+        ed_cert = issuance.issue_certificate_service(institution, student, 'certificate', {'score': 2})
+        self.assertEqual((rsa_cert.signature_algorithm, ed_cert.signature_algorithm), ('rsa-pss-sha256', 'ed25519'))
+        for cert in (rsa_cert, ed_cert):
+            self.assertTrue(verify_certificate_full(cert.certificate_hash)['signature'])
+
+        # A certificate from before the key registry is checked against the current (Ed25519) key
+        Certificate.objects.filter(pk=rsa_cert.pk).update(signing_key=None)
+        self.assertFalse(verify_certificate_full(rsa_cert.certificate_hash)['signature'])
+        Certificate.objects.filter(pk=ed_cert.pk).update(signing_key=None)
+        self.assertTrue(verify_certificate_full(ed_cert.certificate_hash)['signature'])
+
+
+@override_settings(
+    ANCHOR_MAX_ATTEMPTS=3, ANCHOR_RETRY_BASE_DELAY=10, ANCHOR_RETRY_MAX_DELAY=25, ANCHOR_LEASE_SECONDS=60
+)
+class AnchorOutboxTest(TransactionTestCase):
+    def setUp(self):
+        self.institution = make_institution()
+        self.student = make_student()
+
+    def _queue(self, score=1):
+        cert = Certificate.objects.create(
+            certificate_type='certificate', issuing_institution=self.institution,
+            student=self.student, metadata={'score': score},
+        )
+        return anchoring.enqueue_anchor(cert)
+
+    def _receipt(self, status=1):
+        receipt = mock.Mock(status=status, blockNumber=7)
+        receipt.transactionHash.to_0x_hex.return_value = '0xabc'
+        return receipt
+
+    def test_claim_skips_leased_and_future_rows_and_reclaims_expired_leases(self):
+        """A row is claimed once; a crashed worker's row comes back only after the lease"""
+        due, leased, expired, later = [self._queue(score) for score in range(4)]
+        now = timezone.now()
+        AnchorOutbox.objects.filter(pk=leased.pk).update(status='processing', updated_at=now - timedelta(seconds=30))
+        AnchorOutbox.objects.filter(pk=expired.pk).update(status='processing', updated_at=now - timedelta(seconds=90))
+        AnchorOutbox.objects.filter(pk=later.pk).update(next_attempt_at=now + timedelta(seconds=30))
+        self.assertEqual([entry.pk for entry in anchoring.claim_batch(10)], [due.pk, expired.pk])
+        self.assertEqual(anchoring.claim_batch(10), [])
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        """Backoff is base * 2^(attempts - 1), never above ANCHOR_RETRY_MAX_DELAY"""
+        self.assertEqual(
+            [anchoring.retry_delay(attempts).total_seconds() for attempts in (0, 1, 2, 3, 8)], [10, 10, 20, 25, 25]
+        )
+
+    def test_failed_send_is_retried_then_given_up(self):
+        """A send that raises leaves the certificate pending and retries until ANCHOR_MAX_ATTEMPTS"""
+        self._queue()
+        with mock.patch.object(anchoring, 'add_signed_hash_to_chain', side_effect=ConnectionError('node down')), \
+                mock.patch.object(anchoring, 'verify_signed_hash_on_chain', return_value=False):
+            for attempt in (1, 2):
+                started = timezone.now()
+                entry = anchoring.process_entry(anchoring.claim_batch(1)[0])
+                self.assertEqual((entry.status, entry.attempts, entry.last_error), ('pending', attempt, 'node down'))
+                self.assertGreaterEqual(entry.next_attempt_at, started + anchoring.retry_delay(attempt))
+                self.assertEqual(Certificate.objects.get().anchor_status, 'pending')
+                AnchorOutbox.objects.update(next_attempt_at=timezone.now())
+            entry = anchoring.process_entry(anchoring.claim_batch(1)[0])
+        self.assertEqual((entry.status, entry.attempts), ('failed', 3))
+        self.assertEqual(Certificate.objects.get().anchor_status, 'failed')
+        self.assertEqual(anchoring.claim_batch(1), [])
+
+    def test_retry_finds_the_hash_already_mined(self):
+        """A retry whose earlier transaction was mined meanwhile confirms without sending again"""
+        self._queue()
+        AnchorOutbox.objects.update(attempts=1)
+        with mock.patch.object(anchoring, 'verify_signed_hash_on_chain', return_value=True) as on_chain, \
+                mock.patch.object(anchoring, 'add_signed_hash_to_chain') as send, \
+                mock.patch.object(anchoring, 'remember_anchored'):
+            entry = anchoring.process_entry(anchoring.claim_batch(1)[0])
+        on_chain.assert_called_once_with(entry.signed_hash_keccak)
+        send.assert_not_called()
+        self.assertEqual((entry.status, entry.attempts), ('done', 2))
+        self.assertEqual(Certificate.objects.get().anchor_status, 'confirmed')
+
+    def test_first_attempt_sends_without_checking_the_chain(self):
+        """A first attempt goes straight to the send and records the receipt"""
+        self._queue()
+        with mock.patch.object(anchoring, 'verify_signed_hash_on_chain') as on_chain, \
+                mock.patch.object(anchoring, 'add_signed_hash_to_chain', return_value=self._receipt()), \
+                mock.patch.object(anchoring, 'remember_anchored'):
+            anchoring.process_entry(anchoring.claim_batch(1)[0])
+        on_chain.assert_not_called()
+        cert = Certificate.objects.get()
+        self.assertEqual((cert.anchor_status, cert.anchor_tx_hash, cert.anchor_block_number), ('confirmed', '0xabc', 7))
+
+    def test_failed_merkle_send_puts_certificates_back_to_pending(self):
+        """When the root transaction cannot be sent, the batch's certificates stop showing 'submitted'"""
+        self._queue(1)
+        self._queue(2)
+        with mock.patch.object(anchoring, 'add_merkle_root_to_chain', side_effect=ConnectionError('node down')):
+            entries = anchoring.process_merkle_batch(anchoring.claim_batch(10), '0xkey', '0xaddress')
+        self.assertEqual([entry.status for entry in entries], ['pending', 'pending'])
+        self.assertEqual(set(Certificate.objects.values_list('anchor_status', flat=True)), {'pending'})
+
+
+@override_settings(ANCHOR_RECONCILE_CHUNK_SIZE=2, ANCHOR_RECONCILE_RATE=1000)
+class ReconcileAnchorsTest(TransactionTestCase):
+    def setUp(self):
+        institution = make_institution()
+        student = make_student()
+        self.certs = [
+            Certificate.objects.create(
+                certificate_type='certificate', issuing_institution=institution, student=student,
+                metadata={'score': score}, anchor_status='confirmed',
+            )
+            for score in range(5)
+        ]
+        self.on_chain = set()
+        patcher = mock.patch.object(
+            reconciliation, 'verify_certificates_on_chain_batch',
+            side_effect=lambda certs, cached: {cert.certificate_hash: cert.pk in self.on_chain for cert in certs},
+        )
+        self.verify = patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(reconciliation, 'remember_anchored')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _queued(self):
+        return sorted(AnchorOutbox.objects.values_list('certificate_id', flat=True))
+
+    def test_missing_certificates_are_requeued(self):
+        """Certificates absent on chain go back to pending with an outbox row; anchored ones are confirmed"""
+        self.on_chain = {self.certs[0].pk, self.certs[2].pk}
+        Certificate.objects.filter(pk=self.certs[2].pk).update(anchor_status='failed')
+        Certificate.objects.filter(pk=self.certs[1].pk).update(anchor_tx_hash='0xlost', anchor_block_number=3)
+        stats = list(reconciliation.reconcile_anchors())
+        self.assertEqual(len(stats), 3)
+        self.assertEqual(
+            {key: stats[-1][key] for key in ('scanned', 'missing', 'requeued', 'confirmed')},
+            {'scanned': 5, 'missing': 3, 'requeued': 3, 'confirmed': 1},
+        )
+        missing = [self.certs[i].pk for i in (1, 3, 4)]
+        self.assertEqual(self._queued(), missing)
+        self.assertEqual(
+            set(Certificate.objects.filter(pk__in=missing).values_list('anchor_status', 'anchor_tx_hash')),
+            {('pending', '')},
+        )
+        self.assertEqual(Certificate.objects.get(pk=self.certs[2].pk).anchor_status, 'confirmed')
+        self.verify.assert_called_with(mock.ANY, cached=False)
+
+    def test_in_flight_outbox_rows_are_not_duplicated(self):
+        """A certificate whose outbox row is pending or processing is counted, not queued again"""
+        for cert, status in ((self.certs[0], 'pending'), (self.certs[1], 'processing'), (self.certs[2], 'failed')):
+            AnchorOutbox.objects.create(certificate=cert, signed_hash_keccak=cert.signed_hash_keccak, status=status)
+        stats = list(reconciliation.reconcile_anchors())[-1]
+        self.assertEqual((stats['in_flight'], stats['requeued']), (2, 3))
+        self.assertEqual(AnchorOutbox.objects.filter(certificate=self.certs[0]).count(), 1)
+        self.assertEqual(AnchorOutbox.objects.filter(certificate=self.certs[1]).count(), 1)
+        self.assertEqual(AnchorOutbox.objects.filter(certificate=self.certs[2]).count(), 2)
+
+    def test_limit_stops_after_the_last_queued_certificate(self):
+        """With a limit the run stops mid-chunk and saves the checkpoint at the last certificate it queued"""
+        stats = list(reconciliation.reconcile_anchors(limit=3))
+        self.assertEqual(stats[-1]['requeued'], 3)
+        self.assertEqual(self._queued(), [cert.pk for cert in self.certs[:3]])
+        checkpoint = SyncCheckpoint.objects.get(name=reconciliation.CHECKPOINT_NAME)
+        self.assertEqual(checkpoint.position, self.certs[2].pk)
+
+    def test_resumes_from_the_checkpoint(self):
+        """A second run continues after the saved position; restart=True scans from the start"""
+        list(reconciliation.reconcile_anchors(limit=1))
+        self.assertEqual(self._queued(), [self.certs[0].pk])
+        stats = list(reconciliation.reconcile_anchors())
+        self.assertEqual(stats[-1]['scanned'], 4)
+        self.assertEqual(self._queued(), [cert.pk for cert in self.certs])
+        self.assertEqual(list(reconciliation.reconcile_anchors()), [])
+        AnchorOutbox.objects.update(status='done')
+        stats = list(reconciliation.reconcile_anchors(restart=True))
+        self.assertEqual((stats[-1]['scanned'], stats[-1]['requeued']), (5, 5))
+
+    def test_dry_run_changes_nothing(self):
+        """A dry run reports what it would queue without writing rows or moving the checkpoint"""
+        stats = list(reconciliation.reconcile_anchors(dry_run=True))
+        self.assertEqual(stats[-1]['requeued'], 5)
+        self.assertEqual(self._queued(), [])
+        self.assertEqual(SyncCheckpoint.objects.get(name=reconciliation.CHECKPOINT_NAME).position, 0)
@@ -12,6 +12,8 @@ urlpatterns = [
     path('student/profile/', views.student_profile, name='student_profile'),
     path('student/certificates/<str:certificate_hash>/', views.student_certificate_detail, name='student_certificate_detail'),
     path('issue/', views.issue_certificate, name='issue_certificate'),
+    path('issue/bulk/', views.bulk_issue_certificates, name='bulk_issue_certificates'),
+    path('issue/bulk/<int:job_id>/', views.bulk_issuance_job, name='bulk_issuance_job'),
     path('all-certificates/', views.student_certificates, name='student_certificates'),
     path('lookup-student/', views.lookup_student, name='lookup_student'),
     path('issued-certificates/', views.institution_certificates, name='institution_certificates'),
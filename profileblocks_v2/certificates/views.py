@@ -6,13 +6,16 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.core.exceptions import PermissionDenied 
 from django.db import models
+from django.conf import settings
 from django.http import JsonResponse
-from .models import Certificate, Student, DraftCertificate
-from certificates.forms import CertificateIssueForm, StudentSignupForm
+from .models import BulkIssuanceJob, Certificate, Student, DraftCertificate
+from certificates.forms import BulkIssuanceForm, CertificateIssueForm, StudentSignupForm
+from certificates.services.bulk_issuance import claim_job, create_job, run_job
 from certificates.services.issuance import confirm_certificate_from_draft, issue_certificate_service
 from certificates.services.verification import verify_certificate_full
 
 import json
+import uuid
 
 # Helper function to check if the user is an authenticated student
 def is_student_user(user):
@@ -183,13 +186,18 @@ def issue_certificate(request):
                 try:
                     certificate_type = form.cleaned_data['certificate_type']
                     metadata = form.cleaned_data['metadata']
+                    # Key minted with the confirmation page (or sent by an API client): a double
+                    # click or retried request returns the certificate issued the first time;
+                    # an over-long or reused key is rejected by the service
+                    idempotency_key = request.POST.get('idempotency_key') or request.headers.get('Idempotency-Key')
                     # Call service to issue certificate with provided data
                     certificate = issue_certificate_service(
                         institution=institution,
                         student=student,
                         certificate_type=certificate_type,
                         metadata=metadata,
-                        issuing_user=issuing_user  # Important to track issuing user
+                        issuing_user=issuing_user,  # Important to track issuing user
+                        idempotency_key=idempotency_key
                     )
                     messages.success(request, 'Certificate issued successfully')
                     return redirect('dashboard')
@@ -221,6 +229,7 @@ def issue_certificate(request):
                 "student_name": student_name,
                 "institution_name": institution.name,
                 "metadata": metadata_json,
+                "idempotency_key": uuid.uuid4().hex,  # Identifies this confirmation, however often it is submitted
             }
             return render(request, 'certificates/confirm_certificate.html', {"cert_info": cert_info})
 
@@ -231,6 +240,62 @@ def issue_certificate(request):
         'institution': institution
     })
 
+@login_required
+@user_passes_test(is_institution_user)  # Only institution users can issue certificates
+def bulk_issue_certificates(request):
+    # Determine institution from user or institution_user relation
+    institution = getattr(request.user, 'institution', None)
+    issuing_user = getattr(request.user, 'institution_user', None)
+    if not institution and issuing_user:
+        institution = issuing_user.institution
+    if not institution:
+        messages.error(request, "No institution associated with this user")
+        return redirect('dashboard')
+
+    if request.method == 'POST':
+        form = BulkIssuanceForm(request.POST, request.FILES, institution=institution)
+        if form.is_valid():
+            job = create_job(
+                institution,
+                source_name=form.cleaned_data['file'].name,
+                source=form.source,
+                certificate_type=form.cleaned_data['certificate_type'],
+                issuing_user=issuing_user,
+            )
+            if job.total_rows <= settings.BULK_ISSUANCE_INLINE_ROWS:
+                # Small files are issued right away, unless a bulk_issuance_worker claimed the job first
+                claimed = claim_job(job.pk)
+                if claimed is None:
+                    messages.info(request, 'The certificates are being issued by the bulk issuance worker')
+                else:
+                    try:
+                        for _ in run_job(claimed):
+                            pass
+                    except Exception as e:
+                        messages.error(request, f'Error issuing certificates: {str(e)}')
+            else:
+                # Larger files are left to the bulk_issuance_worker command
+                messages.info(request, f'{job.total_rows} certificates queued for issuance')
+            return redirect('bulk_issuance_job', job_id=job.pk)
+    else:
+        form = BulkIssuanceForm(institution=institution)
+
+    return render(request, 'certificates/bulk_issue.html', {
+        'form': form,
+        'institution': institution,
+        'jobs': BulkIssuanceJob.objects.filter(institution=institution).defer('source', 'errors')[:20],
+    })
+
+@login_required
+@user_passes_test(is_institution_user)
+def bulk_issuance_job(request, job_id):
+    # Progress and rejected rows of one bulk issuance job of the user's institution
+    institution = getattr(request.user, 'institution', None)
+    if not institution and hasattr(request.user, 'institution_user'):
+        institution = request.user.institution_user.institution
+    job = get_object_or_404(BulkIssuanceJob.objects.defer('source'), pk=job_id, institution=institution)
+    return render(request, 'certificates/bulk_issuance_job.html', {'job': job})
+
 @login_required
 @user_passes_test(is_institution_user)  # Only institution users can review drafts
 def review_draft(request, draft_id):
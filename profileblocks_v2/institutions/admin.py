@@ -1,7 +1,7 @@
 # institutions/admin.py
 
 from django.contrib import admin
-from .models import Institution, InstitutionType, InstitutionUser
+from .models import Institution, InstitutionKey, InstitutionType, InstitutionUser
 from .forms import InstitutionUserCreationForm
 from django.contrib.auth import get_user_model
 
@@ -16,12 +16,12 @@ class InstitutionAdmin(admin.ModelAdmin):
     fields = (
         'name', 'full_name', 'institution_type', 'parent_institution', 'user',
         'unique_identifier', 'ethereum_address', 'ethereum_private_key',
-        'public_key', 'private_key'  # Include both keys in the admin form
+        'public_key', 'private_key', 'key_algorithm'  # Include both keys and their scheme in the admin form
     )
     # Make cryptographic and identifier fields read-only for security
     readonly_fields = (
         'unique_identifier', 'ethereum_address', 'ethereum_private_key',
-        'public_key', 'private_key'  # Prevent accidental edits by making read-only
+        'public_key', 'private_key', 'key_algorithm'  # Prevent accidental edits by making read-only
     )
     # Enable search by institution name and full name in admin list view
     search_fields = ('name', 'full_name')
@@ -75,4 +75,18 @@ class InstitutionUserAdmin(admin.ModelAdmin):
             # Create a new User object with institution user_type
             user = User.objects.create_user(username=username, password=password, user_type='institution')
             obj.user = user  # Link the InstitutionUser to this new User
-        super().save_model(request, obj, form, change)  # Call parent to save normally
\ No newline at end of file
+        super().save_model(request, obj, form, change)  # Call parent to save normally
+
+# Register the append-only key registry as read-only: versions are added by key rotation only
+@admin.register(InstitutionKey)
+class InstitutionKeyAdmin(admin.ModelAdmin):
+    list_display = ('institution', 'version', 'key_algorithm', 'created_at', 'retired_at')
+    list_filter = ('key_algorithm',)
+    search_fields = ('institution__name', 'fingerprint')
+    readonly_fields = ('institution', 'version', 'fingerprint', 'public_key', 'key_algorithm', 'created_at', 'retired_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,40 @@
+# institutions/management/commands/onboard_institutions.py
+
+import time
+from django.core.management.base import BaseCommand
+from institutions.services.bulk_onboarding import load_institution_tree, onboard_institutions
+
+
+class Command(BaseCommand):
+    help = "Create a hierarchy of institutions from a JSON tree file and authorize them on chain in bulk"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSON file with a list of institution nodes (see load_institution_tree)")
+        parser.add_argument('--workers', type=int, default=None, help="Key generation processes (default: CPU count)")
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Addresses per authorizeInstitutions transaction (default CHAIN_AUTHORIZE_CHUNK_SIZE)")
+        parser.add_argument('--no-authorize', action='store_true', help="Create the institutions without authorizing them")
+        parser.add_argument('--authorize-existing', action='store_true',
+                            help="Also authorize institutions from the file that already exist")
+
+    def handle(self, *args, **options):
+        tree = load_institution_tree(options['path'])
+        started = time.perf_counter()
+        result = onboard_institutions(
+            tree,
+            authorize=not options['no_authorize'],
+            authorize_existing=options['authorize_existing'],
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+        )
+        elapsed = time.perf_counter() - started
+
+        for institution in result['created']:
+            self.stdout.write(f"  {institution.unique_identifier}  {institution.ethereum_address}  {institution.full_name}")
+        receipts = result['receipts']
+        failed = [r for r in receipts if r.status != 1]
+        self.stdout.write(
+            f"Created {len(result['created'])} institution(s) in {elapsed:.1f}s; "
+            f"{len(receipts)} authorization transaction(s) in "
+            f"{len({r.blockNumber for r in receipts})} block(s), {len(failed)} failed"
+        )
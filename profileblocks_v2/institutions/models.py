@@ -1,8 +1,11 @@
 # institutions/models.py
 
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
-from institutions.services.key_management import generate_keypair, generate_unique_identifier
+from institutions.services.key_management import generate_unique_identifier
+from accounts.services.key_cache import invalidate_owner, key_owner
+from accounts.services.key_pool import take_keypair
+from accounts.services.signature_schemes import RSA_PSS_SHA256, SIGNATURE_ALGORITHMS, generate_keypair
 from django.core.exceptions import ValidationError
 from eth_account import Account
 
@@ -67,10 +70,12 @@ class Institution(models.Model):
     ethereum_address = models.CharField(max_length=42, unique=True, editable=False)
     # Ethereum private key (hex string, 0x + 64 hex digits), stored blankable for safety
     ethereum_private_key = models.CharField(max_length=66, blank=True)
-    # RSA public key PEM string, optional blank
+    # Public key PEM string (RSA or Ed25519, see key_algorithm), optional blank
     public_key = models.TextField(blank=True)
-    # RSA private key PEM string, optional blank
+    # Private key PEM string, optional blank
     private_key = models.TextField(blank=True)
+    # Signature scheme of public_key/private_key
+    key_algorithm = models.CharField(max_length=20, choices=SIGNATURE_ALGORITHMS, default=RSA_PSS_SHA256)
     # Timestamp when institution was created, auto set on creation
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -123,17 +128,27 @@ class Institution(models.Model):
             self.ethereum_private_key = acct.key.hex()  # Private key as hex string with 0x prefix
             self.ethereum_address = acct.address  # Ethereum address (0x...)
 
-        # Generate RSA keypair if missing
+        # Take a keypair of the configured algorithm if missing (RSA comes from the pre-generated pool)
         if not self.public_key or not self.private_key:
-            self.public_key, self.private_key = generate_keypair()
+            self.key_algorithm = settings.SIGNATURE_ALGORITHM
+            self.public_key, self.private_key = take_keypair(self.key_algorithm)
 
         # Call parent save to persist changes
         super().save(*args, **kwargs)
 
+    @transaction.atomic
     def regenerate_keypair(self):
-        # Generate a new RSA public/private keypair and save
-        self.public_key, self.private_key = generate_keypair()
+        from institutions.services.key_registry import register_key
+        # Keep the outgoing public key in the key registry so certificates signed with it keep verifying
+        register_key(self)
+        # Generate a new public/private keypair of the configured algorithm and save
+        self.key_algorithm = settings.SIGNATURE_ALGORITHM
+        self.public_key, self.private_key = generate_keypair(self.key_algorithm)
         self.save()
+        # Register the new key as the next version, retiring the old one
+        register_key(self)
+        # Drop the parsed old keys so they stop being served from memory
+        invalidate_owner(key_owner(self))
 
     def __str__(self):
         # Display institution name with parent institution if exists
@@ -161,10 +176,12 @@ class InstitutionUser(models.Model):
     )
     # Full name of the institution user, optional but with help text
     full_name = models.CharField(max_length=300, blank=True, help_text="Full name of the user, e.g. C. F. Ho")
-    # Public RSA key PEM string, optional
+    # Public key PEM string (RSA or Ed25519, see key_algorithm), optional
     public_key = models.TextField(blank=True)
-    # Private RSA key PEM string, optional
+    # Private key PEM string, optional
     private_key = models.TextField(blank=True)
+    # Signature scheme of public_key/private_key
+    key_algorithm = models.CharField(max_length=20, choices=SIGNATURE_ALGORITHMS, default=RSA_PSS_SHA256)
     # Unique identifier string for the institution user, uneditable and unique
     unique_identifier = models.CharField(max_length=100, unique=True, editable=False)
 
@@ -191,9 +208,10 @@ class InstitutionUser(models.Model):
         if not self.unique_identifier:
             self.unique_identifier = f"{self.institution.unique_identifier}:{self.user.unique_identifier}"
 
-        # Generate RSA keypair if missing
+        # Take a keypair of the configured algorithm if missing (RSA comes from the pre-generated pool)
         if not self.public_key or not self.private_key:
-            self.public_key, self.private_key = generate_keypair()
+            self.key_algorithm = settings.SIGNATURE_ALGORITHM
+            self.public_key, self.private_key = take_keypair(self.key_algorithm)
 
         # Save the model instance
         super().save(*args, **kwargs)
@@ -205,4 +223,28 @@ class InstitutionUser(models.Model):
     class Meta:
         # Human-readable names in Django admin
         verbose_name = "Institution User"
-        verbose_name_plural = "Institution Users"
\ No newline at end of file
+        verbose_name_plural = "Institution Users"
+
+class InstitutionKey(models.Model):
+    """
+    Append-only registry of every public key an institution has signed with.
+    Rotation adds a new version instead of losing the old key, so certificates
+    keep verifying against the key recorded on them (Certificate.signing_key).
+    """
+    institution = models.ForeignKey(Institution, on_delete=models.CASCADE, related_name='keys')
+    version = models.PositiveIntegerField()  # 1 for the first registered key, +1 per rotation
+    fingerprint = models.CharField(max_length=64)  # SHA-256 of public_key (see key_cache.fingerprint)
+    public_key = models.TextField()  # PEM; private keys stay on the Institution only
+    key_algorithm = models.CharField(max_length=20, choices=SIGNATURE_ALGORITHMS, default=RSA_PSS_SHA256)
+    created_at = models.DateTimeField(auto_now_add=True)
+    retired_at = models.DateTimeField(null=True, blank=True)  # Set when a newer version replaced it
+
+    def __str__(self):
+        return f"{self.institution.name} key v{self.version}"
+
+    class Meta:
+        ordering = ['institution', 'version']
+        constraints = [
+            models.UniqueConstraint(fields=['institution', 'version'], name='unique_institution_key_version'),
+            models.UniqueConstraint(fields=['institution', 'fingerprint'], name='unique_institution_key_fingerprint'),
+        ]
@@ -0,0 +1,147 @@
+# institutions/services/bulk_onboarding.py
+
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+import django
+from django.conf import settings
+from django.db import transaction
+from institutions.models import Institution, InstitutionType
+from institutions.services.key_management import generate_institution_keys, generate_unique_identifier
+from blockchain.services.contract_service import authorize_institutions_on_chain
+
+logger = logging.getLogger(__name__)
+
+
+def load_institution_tree(path):
+    """
+    Read a JSON tree of institutions. The file holds a list of nodes:
+        {"name": "HKU", "full_name": "The University of Hong Kong",
+         "type": "tertiary level", "parent": "<unique_identifier>",
+         "children": [{"name": "ENG", "full_name": "Faculty of Engineering", ...}]}
+    "type" is inherited from the parent node when omitted; "parent" is optional
+    and attaches a top-level node under an existing institution.
+    """
+    with open(path) as f:
+        tree = json.load(f)
+    return tree if isinstance(tree, list) else [tree]
+
+
+def flatten_tree(tree):
+    """
+    Flatten a tree into levels, roots first, so every node is created after its
+    parent. Each entry is (node, parent_node or None, institution type name).
+    """
+    levels = []
+    current = []
+    for node in tree:
+        if not node.get('type'):
+            raise ValueError(f"Top-level institution {node.get('name')!r} has no type")
+        current.append((node, None, node['type']))
+    while current:
+        levels.append(current)
+        current = [
+            (child, node, child.get('type') or type_name)
+            for node, _, type_name in current
+            for child in node.get('children', [])
+        ]
+    return levels
+
+
+def generate_keys(count, algorithm, workers=None):
+    # RSA key generation is CPU-bound: spread it over processes rather than threads
+    if count <= 1 or workers == 1:
+        return [generate_institution_keys(algorithm) for _ in range(count)]
+    # django.setup() configures Django in workers started with spawn rather than fork
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=django.setup) as pool:
+        return list(pool.map(generate_institution_keys, [algorithm] * count, chunksize=max(1, count // 64)))
+
+
+def _build_institution(node, parent, institution_type, keys, key_algorithm):
+    # Mirror Institution.save(), which bulk_create bypasses
+    name = node['name']
+    full_name = node.get('full_name') or name
+    if parent and not full_name.startswith(parent.full_name):
+        full_name = f"{parent.full_name} - {full_name}"
+    public_key, private_key, eth_private_key, eth_address = keys
+    return Institution(
+        name=name,
+        full_name=full_name,
+        institution_type=institution_type,
+        parent_institution=parent,
+        unique_identifier=generate_unique_identifier(name, parent.unique_identifier if parent else None),
+        public_key=public_key,
+        private_key=private_key,
+        key_algorithm=key_algorithm,
+        ethereum_private_key=eth_private_key,
+        ethereum_address=eth_address,
+    )
+
+
+def onboard_institutions(tree, authorize=True, authorize_existing=False, workers=None, chunk_size=None):
+    """
+    Create a whole institution hierarchy in bulk: one bulk_create per tree
+    level (parents first), keys generated in parallel up front, and every new
+    Ethereum address authorized on chain in as few transactions as possible.
+    Institutions whose unique identifier already exists are reused, so an
+    interrupted run can be repeated with the same file; authorize_existing=True
+    also (re-)authorizes them, e.g. after a failed authorization.
+    Returns a dict with the created institutions and the authorization receipts.
+    """
+    levels = flatten_tree(tree)
+    types = {}
+    for level in levels:
+        for _, _, type_name in level:
+            if type_name not in types:
+                types[type_name], _ = InstitutionType.objects.get_or_create(
+                    name=type_name,
+                    defaults={'allowed_certificate_types': InstitutionType.CERTIFICATE_TYPE_MAPPINGS.get(type_name, [])},
+                )
+
+    # Keys for every node up front, of the configured scheme like Institution.save;
+    # nodes that turn out to exist just leave theirs unused
+    key_algorithm = settings.SIGNATURE_ALGORITHM
+    keys = iter(generate_keys(sum(len(level) for level in levels), key_algorithm, workers))
+
+    created = []
+    resolved = {}  # id(node) -> saved Institution, for the children's parent links
+    with transaction.atomic():
+        for depth, level in enumerate(levels):
+            new = []
+            for node, parent_node, type_name in level:
+                if parent_node is not None:
+                    parent = resolved[id(parent_node)]
+                elif node.get('parent'):
+                    parent = Institution.objects.get(unique_identifier=node['parent'])
+                else:
+                    parent = None
+                new.append((node, _build_institution(node, parent, types[type_name], next(keys), key_algorithm)))
+
+            existing = Institution.objects.in_bulk(
+                [institution.unique_identifier for _, institution in new], field_name='unique_identifier'
+            )
+            to_create = [institution for _, institution in new if institution.unique_identifier not in existing]
+            Institution.objects.bulk_create(to_create)
+            if any(institution.pk is None for institution in to_create):
+                # Backends without RETURNING (e.g. MySQL) leave pks unset: re-read them
+                existing = Institution.objects.in_bulk(
+                    [institution.unique_identifier for _, institution in new], field_name='unique_identifier'
+                )
+                to_create = [existing[institution.unique_identifier] for institution in to_create]
+            created.extend(to_create)
+            for node, institution in new:
+                resolved[id(node)] = existing.get(institution.unique_identifier, institution)
+            logger.info("Level %s: created %s of %s institution(s)", depth, len(to_create), len(new))
+
+    receipts = []
+    to_authorize = list(resolved.values()) if authorize_existing else created
+    if authorize and to_authorize:
+        try:
+            receipts = authorize_institutions_on_chain(
+                [institution.ethereum_address for institution in to_authorize], chunk_size=chunk_size
+            )
+        except Exception as e:
+            # The rows are kept, as with create_institution; re-run with authorize_existing=True
+            logger.error("Blockchain authorization of %s institution(s) failed: %s", len(to_authorize), e)
+    return {'created': created, 'receipts': receipts}
@@ -1,7 +1,9 @@
 # institutions/services/institution_management.py
 
 from institutions.models import Institution, InstitutionUser
-from institutions.services.key_management import generate_keypair, generate_unique_identifier
+from django.conf import settings
+from institutions.services.key_management import generate_unique_identifier
+from accounts.services.key_pool import take_keypair
 import secrets
 from blockchain.services.contract_service import authorize_institution_on_chain
 from eth_account import Account
@@ -19,8 +21,9 @@ def create_institution(user, name, institution_type, parent_institution=None):
     # Generate a globally unique identifier for the institution, based on name and parent
     unique_id = generate_unique_identifier(name, parent_identifier)
 
-    # Generate public/private keypair for the institution (non-ethereum)
-    public_key, private_key = generate_keypair()
+    # Take a public/private keypair of the configured algorithm for the institution (non-ethereum)
+    key_algorithm = settings.SIGNATURE_ALGORITHM
+    public_key, private_key = take_keypair(key_algorithm)
 
     # Generate a random hex string (unused in this function but may be for other purposes)
     private_key_hex = secrets.token_hex(32)
@@ -37,6 +40,7 @@ def create_institution(user, name, institution_type, parent_institution=None):
         unique_identifier=unique_id,
         public_key=public_key,
         private_key=private_key,
+        key_algorithm=key_algorithm,
         ethereum_private_key=eth_private_key,
         ethereum_address=ethereum_address,
     )
@@ -52,8 +56,9 @@ def create_institution(user, name, institution_type, parent_institution=None):
 
 # Create a new user associated with an institution, generating keys and unique ID for the user
 def create_institution_user(institution, username, password):
-    # Generate a public/private keypair for the institution user
-    public_key, private_key = generate_keypair()
+    # Take a public/private keypair of the configured algorithm for the institution user
+    key_algorithm = settings.SIGNATURE_ALGORITHM
+    public_key, private_key = take_keypair(key_algorithm)
 
     # Construct a unique identifier for the user combining institution ID and random suffix
     unique_identifier = f"{institution.unique_identifier}:{secrets.token_hex(4)}"
@@ -64,6 +69,7 @@ def create_institution_user(institution, username, password):
         username=username,
         public_key=public_key,
         private_key=private_key,
+        key_algorithm=key_algorithm,
         unique_identifier=unique_identifier
     )
     
@@ -76,13 +82,7 @@ def create_institution_user(institution, username, password):
 
 # Regenerate the keypair for an existing institution (e.g., for key rotation)
 def regenerate_institution_keypair(institution):
-    # Generate new public/private keys
-    public_key, private_key = generate_keypair()
-
-    # Update institution's keys
-    institution.public_key = public_key
-    institution.private_key = private_key
-
-    # Save updated keys to the database
-    institution.save()
-    return institution
\ No newline at end of file
+    # Same as Institution.regenerate_keypair: the old public key stays in the key registry,
+    # the new one is registered as the next version and the key cache is invalidated
+    institution.regenerate_keypair()
+    return institution
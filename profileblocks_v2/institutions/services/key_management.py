@@ -1,8 +1,10 @@
 # institutions/services/key_management.py
 
 import hashlib
+from eth_account import Account
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
+from accounts.services.signature_schemes import generate_keypair as generate_scheme_keypair
 
 # Generate an RSA public/private keypair and return PEM-encoded strings
 def generate_keypair():
@@ -40,4 +42,12 @@ def generate_unique_identifier(name, parent_identifier=None):
         return f"{parent_identifier}:{identifier[0:15]}"
 
     # Otherwise return the first 15 characters of the hash as the unique ID
-    return identifier[0:15]
\ No newline at end of file
+    return identifier[0:15]
+
+# Generate the full key set of a new institution: PEM pair under `algorithm` (see
+# SIGNATURE_ALGORITHM) plus an Ethereum account.
+# Kept free of Django models and settings so process pool workers can run it without app setup.
+def generate_institution_keys(algorithm):
+    public_key, private_key = generate_scheme_keypair(algorithm)
+    acct = Account.create()  # Generate new Ethereum account
+    return public_key, private_key, acct.key.hex(), acct.address
@@ -0,0 +1,71 @@
+# institutions/services/key_registry.py
+
+from functools import lru_cache
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+from accounts.services.key_cache import fingerprint
+from certificates.models import Certificate
+from institutions.models import InstitutionKey
+
+# (institution id, public key fingerprint) -> registry key id; rows never change, so entries never go stale.
+# Filled only once the row is committed: an id cached inside a transaction that rolls back would name a deleted row
+_current = {}
+
+
+def register_key(institution):
+    """
+    Return the registry row for the institution's current public key,
+    appending it as the next version (and retiring older versions) if it is
+    new. The first key registered for an institution also becomes the signing
+    key of its certificates issued before the registry existed.
+    """
+    key_fingerprint = fingerprint(institution.public_key)
+    for _ in range(3):
+        existing = InstitutionKey.objects.filter(institution=institution, fingerprint=key_fingerprint).first()
+        if existing:
+            return existing
+        try:
+            with transaction.atomic():
+                latest = InstitutionKey.objects.filter(institution=institution).aggregate(Max('version'))['version__max']
+                key = InstitutionKey.objects.create(
+                    institution=institution,
+                    version=(latest or 0) + 1,
+                    fingerprint=key_fingerprint,
+                    public_key=institution.public_key,
+                    key_algorithm=institution.key_algorithm,
+                )
+                if latest is None:
+                    Certificate.objects.filter(
+                        issuing_institution=institution, signing_key__isnull=True
+                    ).update(signing_key=key)
+                else:
+                    InstitutionKey.objects.filter(
+                        institution=institution, retired_at__isnull=True
+                    ).exclude(pk=key.pk).update(retired_at=timezone.now())
+                return key
+        except IntegrityError:
+            continue  # A concurrent registration took this version number: re-read
+    raise RuntimeError(f"Could not register the current key of institution {institution.pk}")
+
+
+def current_key_id(institution):
+    # Registry id of the key the institution signs with now, registering it on first use
+    cache_key = (institution.pk, fingerprint(institution.public_key))
+    key_id = _current.get(cache_key)
+    if key_id is None:
+        key_id = register_key(institution).pk
+        # Runs at once outside a transaction, after the outermost commit inside one, and never on rollback
+        transaction.on_commit(lambda: _current.setdefault(cache_key, key_id))
+    return key_id
+
+
+@lru_cache(maxsize=4096)
+def public_key_for(key_id):
+    # (public key PEM, algorithm) of a registry key: one query per key and process
+    return InstitutionKey.objects.values_list('public_key', 'key_algorithm').get(pk=key_id)
+
+
+def registry_key_owner(key_id):
+    # key_cache owner label of a registry key, in the key_owner format
+    return f"institutions.institutionkey:{key_id}"
@@ -1,3 +1,152 @@
-from django.test import TestCase
+# institutions/tests.py
 
-# Create your tests here.
+import datetime
+import multiprocessing
+from unittest import mock
+from django.db import transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from accounts.models import User
+from accounts.services.signature_schemes import sign, verify
+from blockchain.services import contract_service
+from certificates.models import Certificate, Student
+from institutions.models import Institution, InstitutionKey, InstitutionType
+from institutions.services import key_registry
+from institutions.services.bulk_onboarding import flatten_tree, generate_keys, onboard_institutions
+
+
+class KeyRegistryTest(TransactionTestCase):
+    def setUp(self):
+        kind = InstitutionType.objects.create(name='tertiary level', allowed_certificate_types=['certificate'])
+        self.institution = Institution.objects.create(name='HKU', full_name='The University', institution_type=kind)
+        user = User.objects.create_user(username='student', password='x', user_type='student')
+        self.student = Student.objects.create(
+            user=user, firstname='Tai Man', lastname='Chan', hkid_prefix='A123', date_of_birth=datetime.date(2000, 1, 1)
+        )
+        key_registry._current.clear()
+        self.addCleanup(key_registry._current.clear)
+
+    def test_key_id_is_not_cached_from_a_rolled_back_transaction(self):
+        """A key registered in a transaction that rolls back is registered again, not served from the cache"""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                rolled_back_id = key_registry.current_key_id(self.institution)
+                raise RuntimeError("Issuance failed")
+        self.assertFalse(InstitutionKey.objects.filter(pk=rolled_back_id).exists())
+        self.assertEqual(key_registry._current, {})
+
+        # Issuing afterwards signs with a registry row that exists (no foreign key error)
+        cert = Certificate.objects.create(
+            certificate_type='certificate', issuing_institution=self.institution,
+            student=self.student, metadata={'a': 1},
+        )
+        self.assertTrue(InstitutionKey.objects.filter(pk=cert.signing_key_id, institution=self.institution).exists())
+
+    def test_key_id_is_cached_after_commit(self):
+        """Once the registering transaction commits, later lookups come from the cache"""
+        with transaction.atomic():
+            key_id = key_registry.current_key_id(self.institution)
+            self.assertEqual(key_registry._current, {})
+        with self.assertNumQueries(0):
+            self.assertEqual(key_registry.current_key_id(self.institution), key_id)
+
+
+TREE = [{
+    'name': 'HKU', 'full_name': 'The University', 'type': 'tertiary level',
+    'children': [
+        {'name': 'ENG', 'full_name': 'Faculty of Engineering',
+         'children': [{'name': 'CS', 'full_name': 'Computer Science'}]},
+        {'name': 'SCE', 'full_name': 'School of Continuing Education', 'type': 'education business'},
+    ],
+}]
+
+
+class FlattenTreeTest(SimpleTestCase):
+    def test_parents_come_before_children(self):
+        """Each level holds the children of the previous one, and types are inherited unless given"""
+        levels = flatten_tree(TREE)
+        self.assertEqual(
+            [[(node['name'], parent and parent['name'], kind) for node, parent, kind in level] for level in levels],
+            [
+                [('HKU', None, 'tertiary level')],
+                [('ENG', 'HKU', 'tertiary level'), ('SCE', 'HKU', 'education business')],
+                [('CS', 'ENG', 'tertiary level')],
+            ],
+        )
+
+    def test_top_level_node_needs_a_type(self):
+        """A root without a type has nothing to inherit from"""
+        with self.assertRaisesMessage(ValueError, 'has no type'):
+            flatten_tree([{'name': 'HKU'}])
+
+
+class KeyGenerationTest(SimpleTestCase):
+    def test_keys_are_generated_on_spawned_workers(self):
+        """The key pool also works when worker processes are spawned rather than forked"""
+        get_context = multiprocessing.get_context
+        with mock.patch('multiprocessing.get_context', side_effect=lambda method=None: get_context(method or 'spawn')):
+            keys = generate_keys(3, 'ed25519', workers=2)
+        self.assertEqual(len({address for _, _, _, address in keys}), 3)
+        for public_key, private_key, _, _ in keys:
+            self.assertTrue(verify('m', sign('m', private_key, 'ed25519'), public_key, algorithm='ed25519'))
+
+
+@override_settings(
+    CHAIN_BACKEND='simulated', CHAIN_SIM_BLOCK_TIME=0, CHAIN_SIM_LATENCY_MS=0, CHAIN_SIM_JITTER_MS=0,
+    CHAIN_SIM_FAILURE_RATE=0, CHAIN_SIM_SEED=1, CONTRACT_OWNER_ADDRESS=None, CONTRACT_OWNER_PRIVATE_KEY=None,
+    TX_JOURNAL_PATH='', RECEIPT_POLL_INTERVAL=0.05, SIGNATURE_ALGORITHM='ed25519',
+)
+class OnboardingTest(TransactionTestCase):
+    def setUp(self):
+        contract_service.reset_client()
+        self.addCleanup(contract_service.reset_client)
+
+    def _authorized(self, institution):
+        return contract_service.get_contract().functions.authorizedInstitutions(institution.ethereum_address).call()
+
+    def test_hierarchy_is_created_and_authorized(self):
+        """Parents are linked, keys follow SIGNATURE_ALGORITHM, and every new address is authorized on chain"""
+        result = onboard_institutions(TREE, workers=1)
+        self.assertEqual(len(result['created']), 4)
+        self.assertTrue(result['receipts'] and all(receipt.status == 1 for receipt in result['receipts']))
+        cs = Institution.objects.get(name='CS')
+        self.assertEqual(cs.parent_institution.name, 'ENG')
+        self.assertEqual(cs.parent_institution.parent_institution.name, 'HKU')
+        for institution in Institution.objects.all():
+            self.assertTrue(self._authorized(institution))
+            self.assertEqual(institution.key_algorithm, 'ed25519')
+            self.assertTrue(verify('0xabc', sign('0xabc', institution.private_key, 'ed25519'), institution.public_key))
+
+    def test_authorization_is_split_into_chunks(self):
+        """With authorizeInstitutions in the ABI, addresses are de-duplicated and sent chunk_size per transaction"""
+        # The compiled artifact predates authorizeInstitutions: add its ABI entry and capture the calls
+        batch_abi = {
+            'type': 'function', 'name': 'authorizeInstitutions', 'stateMutability': 'nonpayable', 'outputs': [],
+            'inputs': [{'name': 'institutions', 'type': 'address[]', 'internalType': 'address[]'}],
+        }
+        deployed = contract_service.get_contract()
+        contract = contract_service.get_w3().eth.contract(address=deployed.address, abi=[*deployed.abi, batch_abi])
+        addresses = [contract_service.get_w3().eth.account.create().address for _ in range(5)]
+        with override_settings(CONTRACT_ABI=contract.abi), \
+                mock.patch.object(contract_service, 'get_contract', return_value=contract), \
+                mock.patch.object(contract_service, 'send_contract_transaction',
+                                  side_effect=lambda w3, call, *args: (call.args, {})) as send, \
+                mock.patch.object(contract_service, 'wait_for_inclusion',
+                                  side_effect=lambda w3, sent, *args, **kwargs: sent):
+            receipts = contract_service.authorize_institutions_on_chain(addresses + addresses[:1], chunk_size=2)
+        self.assertEqual(receipts, [(addresses[:2],), (addresses[2:4],), (addresses[4:],)])
+        self.assertEqual({call.args[1].fn_name for call in send.call_args_list}, {'authorizeInstitutions'})
+
+    def test_rerun_reuses_existing_institutions(self):
+        """Running the same tree again creates nothing and, by default, sends nothing"""
+        onboard_institutions(TREE, workers=1, authorize=False)
+        keys = dict(Institution.objects.values_list('unique_identifier', 'public_key'))
+        with mock.patch('institutions.services.bulk_onboarding.authorize_institutions_on_chain') as authorize:
+            result = onboard_institutions(TREE, workers=1)
+        self.assertEqual(result, {'created': [], 'receipts': []})
+        authorize.assert_not_called()
+        self.assertEqual(dict(Institution.objects.values_list('unique_identifier', 'public_key')), keys)
+
+        # authorize_existing=True authorizes the reused rows, e.g. after a failed authorization
+        result = onboard_institutions(TREE, workers=1, authorize_existing=True)
+        self.assertEqual(len(result['receipts']), 4)  # One authorizeInstitution per address with this ABI
+        self.assertTrue(all(self._authorized(institution) for institution in Institution.objects.all()))
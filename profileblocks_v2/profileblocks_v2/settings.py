@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 import os
 import json
@@ -29,6 +30,108 @@ CHAIN_ID = int(os.getenv('CHAIN_ID', 11155111))
 CONTRACT_ADDRESS = os.getenv('CONTRACT_ADDRESS')
 CONTRACT_OWNER_ADDRESS = os.getenv('CONTRACT_OWNER_ADDRESS')
 CONTRACT_OWNER_PRIVATE_KEY = os.getenv('CONTRACT_OWNER_PRIVATE_KEY')
+# Chain backend: 'http' talks to WEB3_PROVIDER_URL(S); 'simulated' runs an in-process EVM with the
+# registry artifact deployed at startup, with a block time (0 = mine on arrival), per-request
+# latency and jitter in milliseconds, the fraction of requests failing, and a seed for repeatable runs.
+# Every process gets its own simulated chain and owner account; CONTRACT_OWNER_* are not used
+CHAIN_BACKEND = os.getenv('CHAIN_BACKEND', 'http')
+CHAIN_SIM_BLOCK_TIME = float(os.getenv('CHAIN_SIM_BLOCK_TIME', 0))
+CHAIN_SIM_LATENCY_MS = float(os.getenv('CHAIN_SIM_LATENCY_MS', 0))
+CHAIN_SIM_JITTER_MS = float(os.getenv('CHAIN_SIM_JITTER_MS', 0))
+CHAIN_SIM_FAILURE_RATE = float(os.getenv('CHAIN_SIM_FAILURE_RATE', 0))
+CHAIN_SIM_SEED = int(os.getenv('CHAIN_SIM_SEED')) if os.getenv('CHAIN_SIM_SEED') else None
+# Shared Web3 client: keep-alive pool size per worker process and RPC timeout (seconds)
+WEB3_POOL_CONNECTIONS = int(os.getenv('WEB3_POOL_CONNECTIONS', 4))
+WEB3_POOL_MAXSIZE = int(os.getenv('WEB3_POOL_MAXSIZE', 16))
+WEB3_REQUEST_TIMEOUT = int(os.getenv('WEB3_REQUEST_TIMEOUT', 30))
+# Several comma-separated RPC URLs enable latency-aware routing: rolling window size per endpoint,
+# consecutive failures that open its circuit breaker, seconds before a trial request, and the
+# eth_call hedge delay in milliseconds (0 = the primary endpoint's p99)
+WEB3_PROVIDER_URLS = [url.strip() for url in os.getenv('WEB3_PROVIDER_URLS', '').split(',') if url.strip()] or (
+    [WEB3_PROVIDER_URL] if WEB3_PROVIDER_URL else []
+)
+WEB3_LATENCY_WINDOW = int(os.getenv('WEB3_LATENCY_WINDOW', 200))
+WEB3_BREAKER_FAILURES = int(os.getenv('WEB3_BREAKER_FAILURES', 5))
+WEB3_BREAKER_COOLDOWN = float(os.getenv('WEB3_BREAKER_COOLDOWN', 30))
+WEB3_HEDGE_AFTER_MS = int(os.getenv('WEB3_HEDGE_AFTER_MS', 0))
+# Receipt tracker: websocket endpoint for newHeads subscriptions (unset = poll), seconds between
+# block-number polls, and how long the tracker thread lingers without waiting transactions
+WEB3_WS_URL = os.getenv('WEB3_WS_URL')
+RECEIPT_POLL_INTERVAL = float(os.getenv('RECEIPT_POLL_INTERVAL', 2))
+RECEIPT_TRACKER_IDLE_SECONDS = int(os.getenv('RECEIPT_TRACKER_IDLE_SECONDS', 30))
+# Maximum hashes per verifySignedHashes call / JSON-RPC batch
+CHAIN_BATCH_CHUNK_SIZE = int(os.getenv('CHAIN_BATCH_CHUNK_SIZE', 200))
+# Maximum addresses per authorizeInstitutions transaction during bulk onboarding
+CHAIN_AUTHORIZE_CHUNK_SIZE = int(os.getenv('CHAIN_AUTHORIZE_CHUNK_SIZE', 200))
+# Event indexer: first block to scan, eth_getLogs page size, reorg safety depth,
+# and whether verification may skip the RPC fallback for hashes not yet indexed
+CHAIN_INDEX_START_BLOCK = int(os.getenv('CHAIN_INDEX_START_BLOCK', 0))
+CHAIN_INDEX_PAGE_SIZE = int(os.getenv('CHAIN_INDEX_PAGE_SIZE', 2000))
+CHAIN_INDEX_CONFIRMATIONS = int(os.getenv('CHAIN_INDEX_CONFIRMATIONS', 12))
+CHAIN_INDEX_ONLY = os.getenv('CHAIN_INDEX_ONLY', 'False') == 'True'
+# On-chain verification cache: Django cache alias, TTL for negative results, and how long
+# concurrent misses wait for the first caller's RPC (seconds)
+CHAIN_CACHE_ALIAS = os.getenv('CHAIN_CACHE_ALIAS', 'default')
+CHAIN_CACHE_NEGATIVE_TTL = int(os.getenv('CHAIN_CACHE_NEGATIVE_TTL', 30))
+CHAIN_CACHE_LOCK_TIMEOUT = int(os.getenv('CHAIN_CACHE_LOCK_TIMEOUT', 5))
+# Nonce manager: re-read the pending nonce from the node after this many idle seconds
+NONCE_RESYNC_IDLE_SECONDS = int(os.getenv('NONCE_RESYNC_IDLE_SECONDS', 60))
+# Fee engine: 'latency' bids higher tips and headroom, 'cost' bids close to the market;
+# oracle and gas-estimate cache lifetimes (seconds), gas limit margin, optional maxFeePerGas
+# ceiling (0 = none), and when / how often a pending transaction is replaced with bumped fees
+FEE_STRATEGY = os.getenv('FEE_STRATEGY', 'latency')
+FEE_ORACLE_TTL = int(os.getenv('FEE_ORACLE_TTL', 12))
+FEE_GAS_ESTIMATE_TTL = int(os.getenv('FEE_GAS_ESTIMATE_TTL', 3600))
+FEE_GAS_MARGIN = float(os.getenv('FEE_GAS_MARGIN', 0.2))
+FEE_DEFAULT_GAS_LIMIT = int(os.getenv('FEE_DEFAULT_GAS_LIMIT', 150000))
+FEE_MAX_FEE_GWEI = float(os.getenv('FEE_MAX_FEE_GWEI', 0))
+FEE_STUCK_TIMEOUT = int(os.getenv('FEE_STUCK_TIMEOUT', 120))
+FEE_MAX_REPLACEMENTS = int(os.getenv('FEE_MAX_REPLACEMENTS', 3))
+FEE_REPLACEMENT_BUMP = float(os.getenv('FEE_REPLACEMENT_BUMP', 0.125))
+# Transaction journal: JSONL file of every sent / replaced / mined transaction (blank disables it).
+# All processes share the file, so rotate it externally, e.g. logrotate with `rotate 20`
+# and no compression or copytruncate; TX_JOURNAL_BACKUP_COUNT is how many backups the readers look for.
+TX_JOURNAL_PATH = os.getenv('TX_JOURNAL_PATH', str(BASE_DIR / 'logs' / 'tx_journal.jsonl'))
+TX_JOURNAL_BACKUP_COUNT = int(os.getenv('TX_JOURNAL_BACKUP_COUNT', 20))
+# Anchoring outbox worker: retry policy (seconds) and claim lease for crashed workers
+ANCHOR_MAX_ATTEMPTS = int(os.getenv('ANCHOR_MAX_ATTEMPTS', 8))
+ANCHOR_RETRY_BASE_DELAY = int(os.getenv('ANCHOR_RETRY_BASE_DELAY', 15))
+ANCHOR_RETRY_MAX_DELAY = int(os.getenv('ANCHOR_RETRY_MAX_DELAY', 1800))
+ANCHOR_LEASE_SECONDS = int(os.getenv('ANCHOR_LEASE_SECONDS', 900))
+# Anchoring mode: 'single' sends one addSignedHash per certificate, 'merkle' anchors one root per batch
+ANCHORING_MODE = os.getenv('ANCHORING_MODE', 'single')
+ANCHOR_MERKLE_BATCH_SIZE = int(os.getenv('ANCHOR_MERKLE_BATCH_SIZE', 1024))
+ANCHOR_MERKLE_WINDOW_SECONDS = int(os.getenv('ANCHOR_MERKLE_WINDOW_SECONDS', 300))
+# Anchor reconciler: certificates scanned per chunk and re-anchoring jobs queued per second at most
+ANCHOR_RECONCILE_CHUNK_SIZE = int(os.getenv('ANCHOR_RECONCILE_CHUNK_SIZE', 1000))
+ANCHOR_RECONCILE_RATE = float(os.getenv('ANCHOR_RECONCILE_RATE', 20))
+# resign_certificates: re-signing an institution's certificates after a key rotation
+RESIGN_CHUNK_SIZE = int(os.getenv('RESIGN_CHUNK_SIZE', 500))
+RESIGN_RATE = float(os.getenv('RESIGN_RATE', 1000))  # Most certificates re-signed per second
+RESIGN_DB_DUTY_CYCLE = float(os.getenv('RESIGN_DB_DUTY_CYCLE', 0.5))  # Most share of wall time spent writing
+# Parsed RSA key objects kept in memory per process (LRU), so signing skips PEM parsing
+KEY_CACHE_SIZE = int(os.getenv('KEY_CACHE_SIZE', 256))
+# Pre-generated RSA keypairs kept ready for new students, institutions and users (refill_key_pool)
+KEY_POOL_TARGET_DEPTH = int(os.getenv('KEY_POOL_TARGET_DEPTH', 200))
+KEY_POOL_REFILL_WORKERS = int(os.getenv('KEY_POOL_REFILL_WORKERS', 0))  # 0 = one process per CPU
+# Signature scheme for newly generated keys: 'rsa-pss-sha256' or 'ed25519' (existing keys keep theirs)
+SIGNATURE_ALGORITHM = os.getenv('SIGNATURE_ALGORITHM', 'rsa-pss-sha256')
+if SIGNATURE_ALGORITHM not in ('rsa-pss-sha256', 'ed25519'):
+    # Fail at startup rather than on the first key generation
+    raise ImproperlyConfigured(
+        f"SIGNATURE_ALGORITHM must be 'rsa-pss-sha256' or 'ed25519', not {SIGNATURE_ALGORITHM!r}"
+    )
+# Local signing daemon (signing_daemon command); empty socket path signs inline in the web process
+SIGNING_SOCKET_PATH = os.getenv('SIGNING_SOCKET_PATH', '')
+SIGNING_WORKERS = int(os.getenv('SIGNING_WORKERS', 0))  # Daemon signing processes, 0 = one per CPU
+SIGNING_CHUNK_SIZE = int(os.getenv('SIGNING_CHUNK_SIZE', 64))  # Most messages sent to one worker at a time
+SIGNING_TIMEOUT = float(os.getenv('SIGNING_TIMEOUT', 30))
+SIGNING_FALLBACK_INLINE = os.getenv('SIGNING_FALLBACK_INLINE', 'True') == 'True'  # Sign inline if the daemon is down
+# Bulk student import (import_students command)
+STUDENT_IMPORT_CHUNK_SIZE = int(os.getenv('STUDENT_IMPORT_CHUNK_SIZE', 1000))  # Roster rows per transaction
+# Bulk certificate issuance (bulk_issue_certificates command and upload view)
+BULK_ISSUANCE_CHUNK_SIZE = int(os.getenv('BULK_ISSUANCE_CHUNK_SIZE', 1000))  # Certificates per transaction
+BULK_ISSUANCE_INLINE_ROWS = int(os.getenv('BULK_ISSUANCE_INLINE_ROWS', 200))  # Uploads up to this size run in the request
 ABI_PATH = Path(__file__).resolve().parent.parent.parent / "smart_contracts//artifacts//contracts//CertificateRegistry.sol//CertificateRegistry.json"
 with open(ABI_PATH) as f:
     ARTIFACT = json.load(f)
@@ -141,6 +244,15 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Cache
+# Use a shared backend (e.g. Redis or Memcached) in production so gunicorn workers share entries
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
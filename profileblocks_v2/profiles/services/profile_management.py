@@ -1,25 +1,21 @@
 # profiles/services/profile_management.py
 
 import hashlib
-from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.asymmetric import padding
+import secrets
+from accounts.services.signature_schemes import ED25519
+from accounts.services.signing_client import sign_for
 
-# Sign the given profile JSON string using the provided private key in PEM format
-def sign_profile(profile_json, private_key_pem):
-    # Load the private RSA key from PEM-encoded string (no password)
-    private_key = serialization.load_pem_private_key(
-        private_key_pem.encode(),
-        password=None,
-    )
-    # Sign the profile JSON data using RSA-PSS with SHA256 hash
-    signature = private_key.sign(
-        profile_json.encode(),  # Data to sign (bytes)
-        padding.PSS(            # Probabilistic Signature Scheme padding
-            mgf=padding.MGF1(hashes.SHA256()),  # Mask generation function with SHA256
-            salt_length=padding.PSS.MAX_LENGTH  # Maximum salt length
-        ),
-        hashes.SHA256()         # Hash algorithm used for signing
-    )
+# Sign the given profile JSON string with the student's key
+def sign_profile(profile_json, student):
+    # Students get their keypair on first profile signing
+    student.ensure_keypair()
+    # Sign the profile JSON data under the key's scheme (RSA-PSS/SHA256 or Ed25519),
+    # through the signing daemon when one is configured
+    signature = bytes.fromhex(sign_for(student, profile_json))
+    if student.key_algorithm == ED25519:
+        # Ed25519 is deterministic (PSS is salted): add a nonce so two profiles with the
+        # same certificates still get distinct IDs
+        signature += secrets.token_bytes(16)
     # Hash the signature using SHA256 and take first 15 hex chars as profile ID
     digest = hashlib.sha256(signature).hexdigest()[:15]
     return digest  # Return the truncated hash as unique profile identifier
\ No newline at end of file
@@ -64,7 +64,7 @@ def create_profile_confirm(request):
         profile_json = json.dumps(certs, sort_keys=True)
 
         # Generate a signed profile ID by signing the JSON with student's private key
-        profile_id = sign_profile(profile_json, student.private_key)
+        profile_id = sign_profile(profile_json, student)
         signature = profile_id  # Use 15-char hash as signature/id
 
         # Create CertificateProfile object with generated ID and details
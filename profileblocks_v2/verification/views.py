@@ -1,10 +1,13 @@
+import logging
 from django.shortcuts import render, get_object_or_404
 from profiles.models import CertificateProfile
 from certificates.models import Certificate
-from certificates.services.verification import verify_certificate_full
+from certificates.services.verification import verify_certificate_full, verify_certificates_on_chain_batch
 from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 
+logger = logging.getLogger(__name__)
+
 def public_certificate_verification(request):
     cert = None  # Initialize cert variable to None
     result = None  # Initialize verification result to None
@@ -59,7 +62,16 @@ def verify_profile(request, signed_hash):
     # Retrieve CertificateProfile object or return 404 if not found
     profile = get_object_or_404(CertificateProfile, signed_profile_hash=signed_hash)
     # Get all certificates related to this profile
-    certificates = profile.certificates.all()
+    certificates = list(profile.certificates.all())
+    # One batched on-chain check for the whole profile instead of one lookup per certificate
+    try:
+        on_chain = verify_certificates_on_chain_batch(certificates)
+    except Exception as e:
+        # Chain unreachable: the page still renders, each certificate shows no on-chain status
+        logger.warning("Profile on-chain verification failed: %s", e)
+        on_chain = {}
+    for cert in certificates:
+        cert.on_chain = on_chain.get(cert.certificate_hash)
     # Render template to verify profile, passing profile info and certificates
     return render(request, 'verification/verify_profile.html', {
         'profile': profile,
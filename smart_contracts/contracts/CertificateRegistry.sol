@@ -2,16 +2,21 @@
 pragma solidity ^0.8.19;
 
 import "@openzeppelin/contracts/access/Ownable.sol";
+import "@openzeppelin/contracts/utils/cryptography/MerkleProof.sol";
 
 contract CertificateRegistry is Ownable {
     // Mapping from signed certificate hash to boolean indicating existence
     mapping(bytes32 => bool) private signedHashes;
 
+    // Mapping from Merkle root of a batch of signed hashes to boolean indicating existence
+    mapping(bytes32 => bool) private merkleRoots;
+
     // Mapping to track authorized institutions
     mapping(address => bool) public authorizedInstitutions;
 
     // Events
     event SignedHashAdded(bytes32 indexed signedHash, address indexed institution);
+    event MerkleRootAnchored(bytes32 indexed root, address indexed institution);
     event InstitutionAuthorized(address indexed institution);
     event InstitutionRevoked(address indexed institution);
 
@@ -32,6 +37,14 @@ contract CertificateRegistry is Ownable {
         emit InstitutionAuthorized(institution);
     }
 
+    // Authorize many institutions in one transaction (only owner)
+    function authorizeInstitutions(address[] calldata institutions) external onlyOwner {
+        for (uint256 i = 0; i < institutions.length; i++) {
+            authorizedInstitutions[institutions[i]] = true;
+            emit InstitutionAuthorized(institutions[i]);
+        }
+    }
+
     // Revoke an institution (only owner)
     function revokeInstitution(address institution) external onlyOwner {
         authorizedInstitutions[institution] = false;
@@ -45,8 +58,33 @@ contract CertificateRegistry is Ownable {
         emit SignedHashAdded(signedHash, msg.sender);
     }
 
+    // Add the Merkle root of a batch of signed certificate hashes (only authorized institution)
+    function anchorMerkleRoot(bytes32 root) external onlyAuthorizedInstitution {
+        require(!merkleRoots[root], "Merkle root already exists");
+        merkleRoots[root] = true;
+        emit MerkleRootAnchored(root, msg.sender);
+    }
+
     // Query if a signed hash exists
     function verifySignedHash(bytes32 signedHash) external view returns (bool) {
         return signedHashes[signedHash];
     }
+
+    // Query existence of many signed hashes in one call (results in input order)
+    function verifySignedHashes(bytes32[] calldata hashes) external view returns (bool[] memory results) {
+        results = new bool[](hashes.length);
+        for (uint256 i = 0; i < hashes.length; i++) {
+            results[i] = signedHashes[hashes[i]];
+        }
+    }
+
+    // Query if a Merkle root exists
+    function verifyMerkleRoot(bytes32 root) external view returns (bool) {
+        return merkleRoots[root];
+    }
+
+    // Query if a leaf belongs to an anchored batch, given its sorted-pair inclusion proof
+    function verifyMerkleProof(bytes32 leaf, bytes32[] calldata proof) external view returns (bool) {
+        return merkleRoots[MerkleProof.processProofCalldata(proof, leaf)];
+    }
 }
\ No newline at end of file
@@ -27,4 +27,113 @@ describe("CertificateRegistry", function () {
     await registry.connect(institution).addCertificate(certificateHash);
     expect(await registry.verifyCertificate(certificateHash)).to.be.true;
   });
-});
\ No newline at end of file
+
+  describe("Merkle root anchoring", function () {
+    const root = ethers.utils.keccak256(ethers.utils.toUtf8Bytes("batch root"));
+
+    it("Should let an authorized institution anchor a Merkle root", async function () {
+      await registry.authorizeInstitution(institution.address);
+      await expect(registry.connect(institution).anchorMerkleRoot(root))
+        .to.emit(registry, "MerkleRootAnchored")
+        .withArgs(root, institution.address);
+      expect(await registry.verifyMerkleRoot(root)).to.be.true;
+    });
+
+    it("Should report roots that were never anchored as missing", async function () {
+      expect(await registry.verifyMerkleRoot(root)).to.be.false;
+    });
+
+    it("Should reject roots from unauthorized accounts", async function () {
+      await expect(registry.connect(other).anchorMerkleRoot(root)).to.be.revertedWith("Not authorized institution");
+      expect(await registry.verifyMerkleRoot(root)).to.be.false;
+    });
+
+    it("Should reject anchoring the same root twice", async function () {
+      await registry.authorizeInstitution(institution.address);
+      await registry.connect(institution).anchorMerkleRoot(root);
+      await expect(registry.connect(institution).anchorMerkleRoot(root)).to.be.revertedWith("Merkle root already exists");
+    });
+
+    it("Should keep Merkle roots and signed hashes apart", async function () {
+      await registry.authorizeInstitution(institution.address);
+      await registry.connect(institution).anchorMerkleRoot(root);
+      expect(await registry.verifySignedHash(root)).to.be.false;
+    });
+  });
+
+  describe("Merkle proof verification", function () {
+    // Tree over keccak256("certificate 0".."certificate 4") built by blockchain/services/merkle.py;
+    // the same root is pinned in blockchain/tests.py
+    const leaves = [0, 1, 2, 3, 4].map((i) => ethers.utils.keccak256(ethers.utils.toUtf8Bytes(`certificate ${i}`)));
+    const root = "0xab126bf3dc3543eef5c256f95cf181261bb4a1e51e8bbf3cb7bd88d9085e505b";
+    const proof = [
+      "0xeefea50655540c0e9317fa9b85a71820d1242ddf480edca7515b588e3071e970",
+      "0x8cd1c73dc30846ef49ce85b83c1748f52ec8291684825592d443787c87a4fda6",
+      "0x5e8892abbbfa4bb944fd44b62663220e7d66b5ee6b05324304de23f01a1e5dbf",
+    ];
+    const promotedProof = ["0x90b4c32ed0ec308ed67bc6e549e325a5e6ae9055895346349cfed82645a84e71"];
+
+    beforeEach(async function () {
+      await registry.authorizeInstitution(institution.address);
+      await registry.connect(institution).anchorMerkleRoot(root);
+    });
+
+    it("Should accept a proof built by the Python tree", async function () {
+      expect(await registry.verifyMerkleProof(leaves[1], proof)).to.be.true;
+    });
+
+    it("Should accept the proof of a promoted unpaired leaf", async function () {
+      expect(await registry.verifyMerkleProof(leaves[4], promotedProof)).to.be.true;
+    });
+
+    it("Should reject a tampered proof or a leaf from another batch", async function () {
+      expect(await registry.verifyMerkleProof(leaves[2], proof)).to.be.false;
+      expect(await registry.verifyMerkleProof(leaves[1], [proof[0], ethers.constants.HashZero, proof[2]])).to.be.false;
+      expect(await registry.verifyMerkleProof(leaves[1], proof.slice(0, 2))).to.be.false;
+    });
+  });
+
+  describe("Batch authorization", function () {
+    it("Should authorize every institution in one call", async function () {
+      await expect(registry.authorizeInstitutions([institution.address, other.address]))
+        .to.emit(registry, "InstitutionAuthorized").withArgs(institution.address)
+        .and.to.emit(registry, "InstitutionAuthorized").withArgs(other.address);
+      expect(await registry.authorizedInstitutions(institution.address)).to.be.true;
+      expect(await registry.authorizedInstitutions(other.address)).to.be.true;
+    });
+
+    it("Should accept an empty array", async function () {
+      await expect(registry.authorizeInstitutions([])).not.to.emit(registry, "InstitutionAuthorized");
+    });
+
+    it("Should only let the owner authorize institutions", async function () {
+      await expect(registry.connect(institution).authorizeInstitutions([institution.address]))
+        .to.be.revertedWithCustomError(registry, "OwnableUnauthorizedAccount")
+        .withArgs(institution.address);
+      expect(await registry.authorizedInstitutions(institution.address)).to.be.false;
+    });
+  });
+
+  describe("Batch verification", function () {
+    const anchored = ethers.utils.keccak256(ethers.utils.toUtf8Bytes("anchored certificate"));
+    const missing = ethers.utils.keccak256(ethers.utils.toUtf8Bytes("missing certificate"));
+
+    beforeEach(async function () {
+      await registry.authorizeInstitution(institution.address);
+      await registry.connect(institution).addSignedHash(anchored);
+    });
+
+    it("Should report each hash in input order", async function () {
+      expect(await registry.verifySignedHashes([missing, anchored, missing])).to.deep.equal([false, true, false]);
+    });
+
+    it("Should return an empty array for no hashes", async function () {
+      expect(await registry.verifySignedHashes([])).to.deep.equal([]);
+    });
+
+    it("Should not count Merkle roots as signed hashes", async function () {
+      await registry.connect(institution).anchorMerkleRoot(missing);
+      expect(await registry.verifySignedHashes([missing])).to.deep.equal([false]);
+    });
+  });
+});